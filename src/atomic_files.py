@@ -0,0 +1,234 @@
+"""
+Write files atomically, and read the checkpoint files written that way.
+
+The hub's scripts publish target data, scoring inputs, model output, and job state
+that other jobs (and the S3 upload) read, and some of them run on schedules that can
+time out or be cancelled. Every file is written with write_atomic: the data is written
+to a temporary file in the destination directory, which is then renamed over the
+destination, so readers never see a partially-written file.
+
+This module has no import-time side effects, so scripts (and worker processes) can
+import it without importing get_target_data.py.
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/atomic_files.py
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+# rows per row group in Parquet files written by sink_parquet_atomic
+default_row_group_size = 256 * 1024
+
+
+def write_atomic(path: Path, write: Callable[[Path], object]) -> Path:
+    """
+    Call write with a temporary path in path's directory and then rename the
+    temporary file to path. Readers never see a partially-written file, and an
+    interrupted write leaves any existing file at path intact.
+
+    The file keeps the mode of the file it replaces; a new file gets the mode
+    that open() would give it (0o666 less the umask), rather than mkstemp's 0o600.
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        write(tmp_path)
+        try:
+            mode = path.stat().st_mode & 0o7777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return path
+
+
+def read_checkpoint(path: Path) -> pl.LazyFrame:
+    """Return a LazyFrame backed by a memory-mapped checkpoint parquet file."""
+    return pl.from_arrow(pq.read_table(path, memory_map=True)).lazy()  # type: ignore
+
+
+def sink_parquet_atomic(
+    lf: pl.LazyFrame,
+    path: Path,
+    schema: pa.Schema,
+    dictionary_columns: list[str],
+    row_group_size: int = default_row_group_size,
+) -> Path:
+    """
+    Stream a LazyFrame to a Parquet file with exactly the given arrow schema.
+
+    Columns are cast to the schema's types in the Polars plan, which Polars'
+    streaming engine writes to a temporary Arrow IPC file. The IPC file is
+    then copied to Parquet one row group at a time (casting Polars'
+    large_string columns to string), so only about one row group is in memory
+    at once. The Parquet file is written with write_atomic.
+
+    Polars' own sink_parquet isn't used because it always writes strings as
+    large_string, which doesn't match the schema of the hub's existing target data.
+    """
+    polars_types = {
+        pa.date32(): pl.Date,
+        pa.string(): pl.String,
+        pa.int32(): pl.Int32,
+        pa.int64(): pl.Int64,
+        pa.float64(): pl.Float64,
+    }
+    plan_schema = lf.collect_schema()
+    columns = []
+    for field in schema:
+        column = pl.col(field.name)
+        if plan_schema[field.name] == pl.String and field.type == pa.date32():
+            # with an explicit format (rather than one inferred from the
+            # data), the conversion can be streamed
+            column = column.str.to_date("%Y-%m-%d")
+        columns.append(column.cast(polars_types[field.type]))
+
+    with tempfile.TemporaryDirectory(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    ) as tmp_dir:
+        ipc_path = Path(tmp_dir) / "data.arrow"
+        lf.select(columns).sink_ipc(ipc_path, compression=None)
+
+        def write(tmp_path: Path):
+            with pa.OSFile(str(ipc_path)) as source:
+                reader = pa.ipc.open_file(source)
+                with pq.ParquetWriter(
+                    tmp_path, schema, use_dictionary=dictionary_columns
+                ) as writer:
+                    batches: list[pa.RecordBatch] = []
+                    rows = 0
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i).cast(schema)
+                        batches.append(batch)
+                        rows += batch.num_rows
+                        if rows >= row_group_size:
+                            # write full row groups and keep the remainder
+                            table = pa.Table.from_batches(batches)
+                            full_rows = rows - rows % row_group_size
+                            writer.write_table(
+                                table.slice(0, full_rows), row_group_size=row_group_size
+                            )
+                            batches = table.slice(full_rows).to_batches()
+                            rows -= full_rows
+                    if rows:
+                        writer.write_table(pa.Table.from_batches(batches))
+
+        write_atomic(path, write)
+
+    return path
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_write_atomic(tmp_path):
+    """An interrupted write leaves the existing file intact and no temp files."""
+    path = tmp_path / "test.parquet"
+    write_atomic(path, pl.DataFrame({"a": [1, 2]}).write_parquet)
+    assert pl.read_parquet(path).height == 2
+
+    def interrupted_write(tmp_path: Path):
+        tmp_path.write_text("half-written")
+        raise RuntimeError("runner timeout")
+
+    try:
+        write_atomic(path, interrupted_write)
+    except RuntimeError:
+        pass
+    assert pl.read_parquet(path).height == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["test.parquet"]
+
+
+def test_write_atomic_mode(tmp_path):
+    """Written files get the umask's default mode, or keep the mode of the file they replace."""
+    umask = os.umask(0o022)
+    try:
+        path = write_atomic(tmp_path / "test.txt", lambda path: path.write_text("1"))
+        assert path.stat().st_mode & 0o7777 == 0o644
+
+        path.chmod(0o640)
+        write_atomic(path, lambda path: path.write_text("2"))
+        assert path.stat().st_mode & 0o7777 == 0o640
+        assert path.read_text() == "2"
+    finally:
+        os.umask(umask)
+
+
+def test_sink_parquet_atomic(tmp_path):
+    """A LazyFrame is streamed to Parquet with the exact schema, in full row groups."""
+    schema = pa.schema(
+        [
+            ("target_date", pa.date32()),
+            ("location", pa.string()),
+            ("clade", pa.string()),
+            ("observation", pa.int64()),
+            ("nowcast_date", pa.date32()),
+            ("as_of", pa.date32()),
+        ]
+    )
+    location_enum = pl.Enum(["MA", "NY", "PR"])
+    clade_enum = pl.Enum(["AA", "other"])
+    lf = pl.LazyFrame(
+        {
+            "target_date": [
+                date(2024, 12, 1) + timedelta(days=i % 30) for i in range(1000)
+            ],
+            "location": pl.Series(
+                ["MA", "NY", "PR"] * 333 + ["MA"], dtype=location_enum
+            ),
+            "clade": pl.Series(["AA", "other"] * 500, dtype=clade_enum),
+            "observation": pl.Series(range(1000), dtype=pl.UInt32),
+            "nowcast_date": "2024-12-04",
+            "as_of": "2024-12-17",
+        }
+    )
+    path = tmp_path / "timeseries.parquet"
+    sink_parquet_atomic(
+        lf,
+        path,
+        schema,
+        dictionary_columns=["location", "clade"],
+        row_group_size=300,
+    )
+
+    assert pq.read_schema(path).remove_metadata() == schema
+    metadata = pq.read_metadata(path)
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [
+        300,
+        300,
+        300,
+        100,
+    ]
+    assert metadata.row_group(0).column(1).has_dictionary_page
+    assert not metadata.row_group(0).column(3).has_dictionary_page
+    assert pl.read_parquet(path).equals(
+        lf.with_columns(
+            pl.col("location", "clade").cast(pl.String),
+            pl.col("observation").cast(pl.Int64),
+            pl.col("nowcast_date", "as_of").str.to_date(),
+        ).collect()
+    )
+    assert [p.name for p in tmp_path.iterdir()] == ["timeseries.parquet"]
+
+    # an empty plan writes a file with the schema and no rows
+    sink_parquet_atomic(lf.head(0), path, schema, dictionary_columns=[])
+    assert pq.read_table(path).schema.remove_metadata() == schema
+    assert pq.read_metadata(path).num_rows == 0
@@ -0,0 +1,350 @@
+"""
+Benchmark target data creation for a hub with thousands of locations.
+
+The benchmark builds a synthetic location registry (national -> the hub's states ->
+--locations county-level locations) and a synthetic, sparse clade summary, then
+creates and writes time series target data, oracle output, and rollups the same way
+get_target_data.py does. Each --chunk-rows setting runs in a new process, plus one run
+that builds the whole location/date/clade grid in a single chunk (how target data was
+built before chunking). The script reports the rows written, run time, and peak memory
+of each run, and checks that every run wrote the same data.
+
+To run the benchmark:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo: uv run --with-requirements src/requirements.txt src/benchmark_target_data.py
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/benchmark_target_data.py
+"""
+
+import logging
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import click
+import polars as pl
+import pyarrow.parquet as pq  # type: ignore
+from cladetime import Clade  # type: ignore
+
+from get_target_data import (
+    create_rollups,
+    create_target_data,
+    target_data_chunk_rows,
+    write_rollups,
+    write_target_data,
+)
+from location_registry import LocationRegistry, location_schema
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+nowcast_string = "2025-01-15"
+sequence_as_of_string = "2025-01-28"
+
+
+def get_benchmark_registry(locations: int) -> LocationRegistry:
+    """
+    Return a registry with a national level, the hub's states, and a county level.
+
+    The county level has the given number of locations, assigned to states in turn,
+    and is the registry's target level.
+    """
+    states = LocationRegistry.from_file().target_locations
+    rows = [("US", "United States", "national", None)]
+    rows.extend((state, state, "state", "US") for state in states)
+    for i in range(locations):
+        state = states[i % len(states)]
+        county = f"{state}-{i // len(states):04d}"
+        rows.append((county, county, "county", state))
+    return LocationRegistry(
+        ["national", "state", "county"],
+        pl.DataFrame(rows, schema=location_schema, orient="row"),
+    )
+
+
+def get_benchmark_assignments(
+    locations: list[str], clade_list: list[str], days: int, sequences: int
+) -> Clade:
+    """
+    Return a synthetic clade summary of the given number of sequences.
+
+    Sequences are spread pseudo-randomly over locations, the days before the
+    nowcast date, and clade_list plus one clade that isn't on it (so some
+    sequences are counted as "other").
+    """
+    max_date = datetime.fromisoformat(nowcast_string).date()
+    clades = clade_list + ["not-modeled"]
+    index = pl.int_range(sequences, dtype=pl.UInt64)
+    summary = (
+        pl.LazyFrame()
+        .select(
+            location=pl.lit(pl.Series(locations)).gather(
+                index.hash(1) % len(locations)
+            ),
+            date=pl.lit(max_date)
+            - pl.duration(days=(index.hash(2) % days).cast(pl.Int64)),
+            clade_nextstrain=pl.lit(pl.Series(clades)).gather(
+                index.hash(3) % len(clades)
+            ),
+        )
+        .group_by(["location", "date", "clade_nextstrain"])
+        .agg(count=pl.len().cast(pl.UInt32))
+        .collect()
+    )
+    return Clade(meta={}, detail=pl.LazyFrame(), summary=summary.lazy())
+
+
+def get_memory_mb(field: str) -> float:
+    """Return a memory field of /proc/self/status (e.g., VmRSS or VmHWM), in MB."""
+    status = Path("/proc/self/status").read_text()
+    kb = next(line for line in status.splitlines() if line.startswith(f"{field}:"))
+    return int(kb.split()[1]) / 1024
+
+
+def reset_peak_memory() -> float:
+    """
+    Reset this process's peak resident memory (VmHWM) and return its current size.
+
+    Writing 5 to /proc/self/clear_refs resets the peak (Linux 4.0+), so building
+    the synthetic inputs doesn't hide the memory used by the code being measured.
+    """
+    Path("/proc/self/clear_refs").write_text("5")
+    return get_memory_mb("VmRSS")
+
+
+def run_benchmark(
+    locations: int,
+    days: int,
+    clades: int,
+    sequences: int,
+    chunk_rows: int,
+    output_dir: Path,
+    rollups: bool = True,
+) -> dict:
+    """
+    Create and write target data and rollups for a synthetic registry.
+
+    Returns the run's settings, the number of target data and rollup rows, and the
+    run time and peak memory of writing target data (time series and oracle output)
+    and of writing rollups (if rollups is True). Peak memory is measured from the memory held when each
+    step starts, and is read from /proc, so the benchmark runs on Linux only.
+    """
+    registry = get_benchmark_registry(locations)
+    clade_list = [f"{24 + i // 26}{chr(ord('A') + i % 26)}" for i in range(clades)]
+    clade_list.append("other")
+    assignments = get_benchmark_assignments(
+        registry.target_locations, clade_list[:-1], days, sequences
+    )
+    collection_max_date = datetime.fromisoformat(nowcast_string).replace(
+        tzinfo=timezone.utc
+    )
+    collection_min_date = collection_max_date - timedelta(days=days - 1)
+    target_data = create_target_data(
+        assignments,
+        clade_list,
+        nowcast_string,
+        sequence_as_of_string,
+        collection_min_date,
+        collection_max_date,
+        locations=registry.target_locations,
+        chunk_rows=chunk_rows,
+    )
+    result = {"chunk_rows": chunk_rows}
+
+    baseline_mb = reset_peak_memory()
+    start = time.perf_counter()
+    ts_path, _ = write_target_data(
+        nowcast_string, sequence_as_of_string, target_data, output_dir
+    )
+    result["rows"] = pq.read_metadata(ts_path).num_rows
+    result["seconds"] = round(time.perf_counter() - start, 1)
+    result["peak_mb"] = round(get_memory_mb("VmHWM") - baseline_mb)
+    if not rollups:
+        return result
+
+    baseline_mb = reset_peak_memory()
+    start = time.perf_counter()
+    rollup_paths = write_rollups(
+        nowcast_string,
+        sequence_as_of_string,
+        create_rollups(target_data[0], registry),
+        output_dir,
+        registry,
+    )
+    result["rollup_rows"] = sum(pq.read_metadata(p).num_rows for p in rollup_paths)
+    result["rollup_seconds"] = round(time.perf_counter() - start, 1)
+    result["rollup_peak_mb"] = round(get_memory_mb("VmHWM") - baseline_mb)
+
+    return result
+
+
+def same_output(dir_1: Path, dir_2: Path) -> bool:
+    """
+    Return True if two runs wrote the same Parquet files with the same data.
+
+    Files are compared one row group at a time, so large target data files aren't
+    read into memory (files with the same data have the same row groups).
+    """
+    paths = sorted(path.relative_to(dir_1) for path in dir_1.rglob("*.parquet"))
+    if paths != sorted(path.relative_to(dir_2) for path in dir_2.rglob("*.parquet")):
+        return False
+    for path in paths:
+        file_1 = pq.ParquetFile(dir_1 / path)
+        file_2 = pq.ParquetFile(dir_2 / path)
+        if file_1.schema_arrow != file_2.schema_arrow:
+            return False
+        if file_1.metadata.num_row_groups != file_2.metadata.num_row_groups:
+            return False
+        for i in range(file_1.metadata.num_row_groups):
+            if not file_1.read_row_group(i).equals(file_2.read_row_group(i)):
+                return False
+    return True
+
+
+@click.command()
+@click.option(
+    "--locations",
+    type=click.IntRange(min=1),
+    default=3000,
+    show_default=True,
+    help="Number of target level (county) locations.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=90,
+    show_default=True,
+    help="Number of target dates.",
+)
+@click.option(
+    "--clades",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help='Number of modeled clades (not counting "other").',
+)
+@click.option(
+    "--sequences",
+    type=click.IntRange(min=1),
+    default=1_000_000,
+    show_default=True,
+    help="Number of synthetic sequences.",
+)
+@click.option(
+    "--chunk-rows",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[target_data_chunk_rows],
+    show_default=True,
+    help="Target data chunk size to benchmark (can be repeated).",
+)
+@click.option(
+    "--rollups/--no-rollups",
+    default=True,
+    show_default=True,
+    help="Also benchmark rollups, which use memory in proportion to the rollup rows.",
+)
+def main(
+    locations: int,
+    days: int,
+    clades: int,
+    sequences: int,
+    chunk_rows: tuple,
+    rollups: bool,
+):
+    grid_rows = locations * days * (clades + 1)
+    logger.info(
+        f"Benchmarking target data for {locations} locations ({grid_rows:,} rows)"
+    )
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dirs = []
+        for rows in [grid_rows, *chunk_rows]:
+            output_dir = Path(tmp_dir) / f"chunk_rows={rows}"
+            # a new process per run, so peak memory isn't carried over between runs
+            # https://docs.pola.rs/user-guide/misc/multiprocessing/
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(
+                    run_benchmark,
+                    locations,
+                    days,
+                    clades,
+                    sequences,
+                    rows,
+                    output_dir,
+                    rollups,
+                ).result()
+            result["same_output"] = not output_dirs or same_output(
+                output_dirs[0], output_dir
+            )
+            logger.info(result)
+            results.append(result)
+            output_dirs.append(output_dir)
+
+    if not all(result["same_output"] for result in results):
+        raise click.ClickException(
+            "Runs with different chunk_rows wrote different data"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+def test_benchmark_registry():
+    registry = get_benchmark_registry(60)
+    assert registry.levels == ["national", "state", "county"]
+    assert len(registry.target_locations) == 60
+    assert registry.target_locations[:2] == ["AL-0000", "AK-0000"]
+    assert registry.target_locations[-1] == "DE-0001"
+    geographies = registry.get_geographies().filter(location="DE-0001")
+    assert geographies.sort("geography").rows() == [
+        ("DE-0001", "county", "DE-0001"),
+        ("DE-0001", "national", "US"),
+        ("DE-0001", "state", "DE"),
+    ]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 1000])
+def test_main(chunk_rows):
+    """Chunked runs write the same data as a single-chunk run."""
+    results = main(
+        [
+            "--locations",
+            "100",
+            "--days",
+            "10",
+            "--clades",
+            "3",
+            "--sequences",
+            "5000",
+            "--chunk-rows",
+            str(chunk_rows),
+        ],
+        standalone_mode=False,
+    )
+    assert [result["chunk_rows"] for result in results] == [4000, chunk_rows]
+    assert all(result["rows"] == 4000 for result in results)
+    assert all(result["same_output"] for result in results)
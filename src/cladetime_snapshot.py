@@ -0,0 +1,367 @@
+"""
+Record and replay a trimmed snapshot of the CladeTime data used by this
+folder's tests.
+
+Several scripts in src/ use cladetime's CladeTime class, which reads Nextstrain
+sequence metadata from S3 and runs Nextclade (via Docker) to assign clades.
+Tests that use the real class are slow, depend on the network, and can fail
+when Nextstrain's data changes. This module provides:
+
+- SnapshotCladeTime: a stand-in for CladeTime with the same interface used by
+  the scripts (sequence_metadata, ncov_metadata, url_* attributes, and
+  assign_clades). Instead of reading from S3 and running Nextclade, it replays
+  files saved in a snapshot directory, so sequence metadata still goes through
+  cladetime's sequence.filter_metadata and summarize_clades functions.
+- record_snapshot: creates a snapshot from live Nextstrain data, trimmed to a
+  sample of sequences collected in a date range (requires network access and
+  Docker).
+
+A snapshot directory contains:
+
+    snapshot.json           as_of dates and URLs of the snapshot, and how it was made
+    metadata.tsv            Nextstrain sequence metadata (trimmed)
+    ncov_metadata.json      Nextstrain ncov pipeline metadata
+    nextclade.tsv           Nextclade clade assignments for the sequences in metadata.tsv
+
+snapshot.json's "synthetic" field says whether the snapshot was recorded from
+Nextstrain by record_snapshot (which also saves "recorded_at") or is synthetic
+fixture data (described by its "source" field). The snapshot in
+src/testdata/cladetime is synthetic: it was assembled from the hub's target data
+and modeled-clades files, with made-up strain names, rather than recorded from
+CladeTime. Re-recording it replaces it with Nextstrain data.
+
+Tests use the snapshot in src/testdata/cladetime via the cladetime_snapshot
+fixture in src/conftest.py. Tests marked "live" use the real CladeTime class
+and only run when pytest is invoked with --live.
+
+To re-record the test snapshot (from the root of this repo):
+uv run --with-requirements src/requirements.txt src/cladetime_snapshot.py --sequence-as-of=2025-12-02
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/cladetime_snapshot.py
+"""
+
+import json
+import logging
+import shutil
+import tempfile
+import warnings
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import click
+import polars as pl
+from cladetime import Clade, CladeTime, sequence  # type: ignore
+from cladetime.exceptions import CladeTimeSequenceWarning  # type: ignore
+from cladetime.util.config import Config  # type: ignore
+from cladetime.util.reference import _get_date  # type: ignore
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+default_snapshot_dir = Path(__file__).parent / "testdata" / "cladetime"
+
+# sequence metadata columns saved in a snapshot (the columns used by
+# sequence.filter_metadata)
+metadata_columns = ["strain", "date", "country", "division", "host", "clade_nextstrain"]
+
+# Nextclade output columns saved in a snapshot
+nextclade_columns = ["seqName", "clade", "clade_nextstrain", "Nextclade_pango"]
+
+
+class SnapshotCladeTime:
+    """
+    A CladeTime stand-in that replays a snapshot.
+
+    sequence_as_of and tree_as_of are kept (so they can be logged and used in
+    output metadata), but the sequence metadata and clade assignments are always
+    the snapshot's.
+    """
+
+    snapshot_dir = default_snapshot_dir
+
+    def __init__(self, sequence_as_of=None, tree_as_of=None):
+        # as_of dates are validated the same way CladeTime validates them
+        self.sequence_as_of = _get_date(sequence_as_of)
+        self.tree_as_of = (
+            self.sequence_as_of if tree_as_of is None else _get_date(tree_as_of)
+        )
+        snapshot = json.loads((self.snapshot_dir / "snapshot.json").read_text())
+        self.url_sequence = snapshot["url_sequence"]
+        self.url_sequence_metadata = snapshot["url_sequence_metadata"]
+        self.url_ncov_metadata = snapshot["url_ncov_metadata"]
+
+    def __repr__(self):
+        return f"SnapshotCladeTime(sequence_as_of={self.sequence_as_of}, tree_as_of={self.tree_as_of})"
+
+    @property
+    def sequence_metadata(self) -> pl.LazyFrame:
+        """The snapshot's sequence metadata."""
+        return sequence.get_metadata(metadata_path=self.snapshot_dir / "metadata.tsv")
+
+    @property
+    def ncov_metadata(self) -> dict:
+        """The snapshot's ncov pipeline metadata."""
+        return json.loads((self.snapshot_dir / "ncov_metadata.json").read_text())
+
+    def assign_clades(
+        self, sequence_metadata: pl.LazyFrame, output_file: Path | str | None = None
+    ) -> Clade:
+        """
+        Return the snapshot's clade assignments for the sequences in sequence_metadata.
+
+        Follows the steps of CladeTime.assign_clades, with the snapshot's Nextclade
+        output in place of a Nextclade run. If output_file is specified, the
+        snapshot's Nextclade output for the assigned sequences is saved there.
+        """
+        standard_fields = Config().nextstrain_standard_metadata_fields
+        sequence_metadata = sequence_metadata.drop(
+            [
+                col
+                for col in sequence_metadata.collect_schema().names()
+                if col not in standard_fields
+            ]
+        )
+        ids = sequence.get_metadata_ids(sequence_metadata)
+        if len(ids) == 0:
+            warnings.warn(
+                "Sequence_metadata is empty or missing 'strain' columns \n"
+                "Stopping clade assignment....",
+                category=CladeTimeSequenceWarning,
+            )
+            return Clade(meta={}, detail=pl.LazyFrame(), summary=pl.LazyFrame())
+
+        assigned_clades_df = pl.read_csv(
+            self.snapshot_dir / "nextclade.tsv", separator="\t"
+        ).filter(pl.col("seqName").is_in(list(ids)))
+        if output_file is not None:
+            assigned_clades_df.write_csv(output_file, separator="\t")
+
+        assigned_clades = sequence_metadata.join(
+            assigned_clades_df.lazy(), left_on="strain", right_on="seqName", how="left"
+        )
+        summarized_clades = sequence.summarize_clades(
+            assigned_clades,
+            group_by=["location", "date", "host", "clade_nextstrain", "country"],
+        )
+
+        ncov_metadata = self.ncov_metadata
+        metadata = {
+            "sequences_to_assign": len(ids),
+            "sequences_assigned": assigned_clades_df["clade_nextstrain"].count(),
+            "sequence_as_of": self.sequence_as_of,
+            "tree_as_of": self.tree_as_of,
+            "nextclade_dataset_version": ncov_metadata.get("nextclade_dataset_version"),
+            "nextclade_dataset_name": ncov_metadata.get("nextclade_dataset_name"),
+            "nextclade_version_num": ncov_metadata.get("nextclade_version_num"),
+            "assignment_as_of": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M"),
+        }
+
+        return Clade(meta=metadata, detail=assigned_clades, summary=summarized_clades)
+
+
+@click.command()
+@click.option(
+    "--sequence-as-of",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=True,
+    help="Date of the Nextstrain sequence metadata to record (YYYY-MM-DD).",
+)
+@click.option(
+    "--tree-as-of",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Date of the reference tree used for clade assignments (YYYY-MM-DD). Default is sequence_as_of.",
+)
+@click.option(
+    "--collection-min-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Earliest sequence collection date to record (YYYY-MM-DD). Default is sequence_as_of - 180 days.",
+)
+@click.option(
+    "--max-sequences",
+    type=click.IntRange(min=1),
+    default=5000,
+    show_default=True,
+    help="Maximum number of sequences to record.",
+)
+@click.option(
+    "--snapshot-dir",
+    type=click.Path(path_type=Path),
+    default=default_snapshot_dir,
+    show_default=True,
+    help="Directory where the snapshot is saved.",
+)
+def main(
+    sequence_as_of: datetime,
+    tree_as_of: datetime | None,
+    collection_min_date: datetime | None,
+    max_sequences: int,
+    snapshot_dir: Path,
+) -> Path:
+    if tree_as_of is None:
+        tree_as_of = sequence_as_of
+    if collection_min_date is None:
+        collection_min_date = sequence_as_of - timedelta(days=180)
+    return record_snapshot(
+        snapshot_dir,
+        CladeTime(sequence_as_of=sequence_as_of, tree_as_of=tree_as_of),
+        collection_min_date,
+        max_sequences,
+    )
+
+
+def record_snapshot(
+    snapshot_dir: Path,
+    ct: CladeTime,
+    collection_min_date: datetime,
+    max_sequences: int,
+) -> Path:
+    """
+    Save a snapshot of a CladeTime object's data to snapshot_dir.
+
+    Records a random sample of up to max_sequences US human sequences collected
+    on or after collection_min_date, the ncov pipeline metadata, and Nextclade
+    assignments for the sampled sequences.
+    """
+    logger.info(f"Recording snapshot of {ct}")
+    filtered = sequence.filter_metadata(
+        ct.sequence_metadata, collection_min_date=collection_min_date
+    )
+    strains = filtered.select("strain").collect()
+    strains = strains.sample(min(max_sequences, strains.height), seed=0)
+    metadata = (
+        ct.sequence_metadata.select(metadata_columns)
+        .join(strains.lazy(), on="strain", how="semi")
+        .sort("date", "strain")
+        .collect()
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        nextclade_file = Path(tmpdir) / "nextclade.tsv"
+        ct.assign_clades(
+            sequence.filter_metadata(metadata.lazy()), output_file=nextclade_file
+        )
+        nextclade = pl.read_csv(
+            nextclade_file, separator="\t", infer_schema_length=100000
+        ).select(nextclade_columns)
+
+        snapshot_tmp = Path(tmpdir) / "snapshot"
+        snapshot_tmp.mkdir()
+        metadata.write_csv(snapshot_tmp / "metadata.tsv", separator="\t")
+        nextclade.sort("seqName").write_csv(
+            snapshot_tmp / "nextclade.tsv", separator="\t"
+        )
+        (snapshot_tmp / "ncov_metadata.json").write_text(
+            json.dumps(ct.ncov_metadata, indent=4)
+        )
+        snapshot = {
+            "sequence_as_of": ct.sequence_as_of.isoformat(),
+            "tree_as_of": ct.tree_as_of.isoformat(),
+            "collection_min_date": collection_min_date.strftime("%Y-%m-%d"),
+            "synthetic": False,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "url_sequence": ct.url_sequence,
+            "url_sequence_metadata": ct.url_sequence_metadata,
+            "url_ncov_metadata": ct.url_ncov_metadata,
+            "sequences": metadata.height,
+        }
+        (snapshot_tmp / "snapshot.json").write_text(json.dumps(snapshot, indent=4))
+
+        # replace any existing snapshot only after every file is written
+        if snapshot_dir.exists():
+            shutil.rmtree(snapshot_dir)
+        snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(snapshot_tmp, snapshot_dir)
+
+    logger.info(f"Snapshot of {metadata.height} sequences saved to {snapshot_dir}")
+    return snapshot_dir
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_snapshot_provenance():
+    """The test snapshot says whether it was recorded from Nextstrain or is synthetic."""
+    snapshot = json.loads((default_snapshot_dir / "snapshot.json").read_text())
+    if snapshot["synthetic"]:
+        assert "recorded_at" not in snapshot
+        assert snapshot["source"]
+    else:
+        assert datetime.fromisoformat(snapshot["recorded_at"])
+
+
+def test_snapshot_metadata():
+    """Snapshot sequence metadata works with cladetime's filters."""
+    ct = SnapshotCladeTime(sequence_as_of="2025-12-02")
+    assert ct.sequence_as_of == datetime(2025, 12, 2, 11, 59, 59, tzinfo=timezone.utc)
+    assert ct.tree_as_of == ct.sequence_as_of
+    assert ct.ncov_metadata.get("nextclade_dataset_version") is not None
+
+    filtered = sequence.filter_metadata(
+        ct.sequence_metadata, collection_min_date=datetime(2025, 10, 1)
+    ).collect()
+    assert filtered.height > 0
+    assert filtered["date"].min() >= datetime(2025, 10, 1).date()
+    assert set(filtered.columns) == {
+        "clade",
+        "country",
+        "date",
+        "strain",
+        "host",
+        "location",
+    }
+
+
+def test_snapshot_assign_clades(tmp_path):
+    """Snapshot clade assignments are returned like CladeTime.assign_clades."""
+    ct = SnapshotCladeTime(sequence_as_of="2025-12-02", tree_as_of="2025-10-13")
+    filtered = sequence.filter_metadata(
+        ct.sequence_metadata,
+        collection_min_date=datetime(2025, 9, 1),
+        collection_max_date=datetime(2025, 9, 30),
+    )
+    output_file = tmp_path / "assignments.tsv"
+    assignments = ct.assign_clades(filtered, output_file=output_file)
+
+    sequence_count = filtered.collect().height
+    assert assignments.meta["sequences_to_assign"] == sequence_count
+    assert assignments.meta["sequences_assigned"] == sequence_count
+    assert assignments.meta["tree_as_of"] == datetime(
+        2025, 10, 13, 11, 59, 59, tzinfo=timezone.utc
+    )
+    assert assignments.detail.collect().height == sequence_count
+    summary = assignments.summary.collect()
+    assert summary.columns == [
+        "location",
+        "date",
+        "host",
+        "clade_nextstrain",
+        "country",
+        "count",
+    ]
+    assert summary.schema["count"] == pl.UInt32
+    assert summary["count"].sum() == sequence_count
+    assert pl.read_csv(output_file, separator="\t").height == sequence_count
+
+    # no sequences to assign
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter("always")
+        empty = ct.assign_clades(filtered.filter(pl.col("strain") == ""))
+    assert empty.meta == {}
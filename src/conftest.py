@@ -0,0 +1,61 @@
+"""
+pytest configuration shared by the tests in this folder's scripts.
+
+Tests that need CladeTime data use the cladetime_snapshot fixture, which
+replays the snapshot in src/testdata/cladetime (see cladetime_snapshot.py) so
+they run without network access. Tests that use Nextstrain data on S3 take the
+live fixture, which marks them "live"; they're skipped unless pytest is run
+with --live:
+
+uv run --with-requirements src/requirements.txt --module pytest src/get_target_data.py --live
+"""
+
+import pytest
+
+from cladetime_snapshot import SnapshotCladeTime
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--live",
+        action="store_true",
+        default=False,
+        help="run tests that use Nextstrain data on S3",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "live: test uses Nextstrain data on S3 (run with --live)"
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    # mark tests that use the live fixture before -m selects tests by marker
+    for item in items:
+        if "live" in getattr(item, "fixturenames", []):
+            item.add_marker(pytest.mark.live)
+    if config.getoption("--live"):
+        return
+    skip_live = pytest.mark.skip(reason="uses Nextstrain data on S3 (run with --live)")
+    for item in items:
+        if "live" in item.keywords:
+            item.add_marker(skip_live)
+
+
+@pytest.fixture
+def live():
+    """
+    Mark a test as using Nextstrain data on S3.
+
+    The scripts' tests take this fixture instead of using @pytest.mark.live, so
+    that the scripts don't import pytest when they're run or imported.
+    """
+
+
+@pytest.fixture
+def cladetime_snapshot(request, monkeypatch):
+    """Replace CladeTime in the test's module with SnapshotCladeTime."""
+    monkeypatch.setattr(request.module, "CladeTime", SnapshotCladeTime)
+    return SnapshotCladeTime
@@ -33,6 +33,8 @@ from typing import TypedDict
 import polars as pl
 from cladetime import CladeTime, sequence  # type: ignore
 
+from run_history import RunRecorder
+
 # Log to stdout
 logger = logging.getLogger(__name__)
 handler = logging.StreamHandler()
@@ -67,8 +69,13 @@ def get_clades(
     The LazyFrame is returned so we can use it to capture some metadata.
     """
 
+    # clade and location have few distinct values, so summarize them as
+    # Categoricals (clade is decoded back to a string after the weekly rollup)
     clade_counts = sequence.summarize_clades(
-        filtered_metadata, group_by=["clade", "date", "location"]
+        filtered_metadata.with_columns(
+            pl.col("clade", "location").cast(pl.Categorical)
+        ),
+        group_by=["clade", "date", "location"],
     )
 
     # Based on the most recent sequence collection date and the threshold_weeks parameter,
@@ -88,16 +95,39 @@ def get_clades(
         .sort("date")
         .group_by_dynamic("date", every="1w", start_by="sunday", group_by="clade")
         .agg(pl.col("count").sum())
+        .with_columns(pl.col("clade").cast(pl.String))
     )
 
+    prop_dat = get_clade_proportions(lf)
+    variants = select_clades(prop_dat, threshold, max_clades)
+
+    return variants, prop_dat
+
+
+def get_clade_proportions(weekly_counts: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Add weekly total counts and clade proportions to a LazyFrame of weekly clade counts
+    (clade, date, count).
+    """
+
     # create a separate frame that combines clades and summarizes total sequence counts per week
-    total_counts = lf.group_by("date").agg(pl.col("count").sum().alias("total_count"))
+    total_counts = weekly_counts.group_by("date").agg(
+        pl.col("count").sum().alias("total_count")
+    )
 
     # join with count data to add a total counts per day column
-    prop_dat = lf.join(total_counts, on="date").with_columns(
+    prop_dat = weekly_counts.join(total_counts, on="date").with_columns(
         (pl.col("count") / pl.col("total_count")).alias("proportion")
     )
 
+    return prop_dat
+
+
+def select_clades(
+    prop_dat: pl.LazyFrame, threshold: float, max_clades: int
+) -> list[str]:
+    """Return the sorted list of clades to model from weekly clade proportions."""
+
     # Filter clades that appear at least twice in last threshold_sundays_ago weeks
     filtered_clades = (
         prop_dat.group_by("clade")
@@ -138,7 +168,7 @@ def get_clades(
     # sort clade list before returning
     variants.sort()
 
-    return variants, prop_dat
+    return variants
 
 
 def get_metadata(ct: CladeTime, sequence_counts: pl.LazyFrame) -> dict[str, dict | str]:
@@ -184,33 +214,47 @@ def main(
         clades: list[str]
         meta: dict[str, dict | str]
 
-    # Get the clade list
-    logger.info("Getting clade list")
-    ct = CladeTime()
-    lf_metadata = ct.sequence_metadata
-    lf_metadata_filtered = sequence.filter_metadata(lf_metadata)
-
-    clade_list, sequence_counts = get_clades(
-        lf_metadata_filtered, threshold, threshold_weeks, max_clades
-    )
-
-    # Sort clade list and add "other"
-    clade_list.append("other")
-    logger.info(f"Clade list: {clade_list}")
-
-    # Get metadata about the Nextstrain ncov pipeline run that
-    # the clade list is based on
-    metadata = get_metadata(ct, sequence_counts)
-    logger.info(f"Round open metadata: {metadata}")
-
-    round_data: RoundData = {
-        "clades": clade_list,
-        "meta": metadata,
+    run_params = {
+        "round_id": round_id,
+        "threshold": threshold,
+        "threshold_weeks": threshold_weeks,
+        "max_clades": max_clades,
     }
+    with RunRecorder("get_clades_to_model", params=run_params) as run:
+        # Get the clade list
+        logger.info("Getting clade list")
+        with run.stage("get_clades"):
+            ct = CladeTime()
+            lf_metadata = ct.sequence_metadata
+            lf_metadata_filtered = sequence.filter_metadata(lf_metadata)
+
+            clade_list, sequence_counts = get_clades(
+                lf_metadata_filtered, threshold, threshold_weeks, max_clades
+            )
+
+        # Sort clade list and add "other"
+        clade_list.append("other")
+        logger.info(f"Clade list: {clade_list}")
+
+        # Get metadata about the Nextstrain ncov pipeline run that
+        # the clade list is based on
+        with run.stage("get_metadata"):
+            metadata = get_metadata(ct, sequence_counts)
+        logger.info(f"Round open metadata: {metadata}")
+        run.count(
+            "sequences_last_3_weeks",
+            metadata["sequence_counts"]["total_sequences_last_3_weeks"],  # type: ignore
+        )
+        run.count("clades", len(clade_list))
 
-    clade_file = clade_output_path / f"{round_id}.json"
-    with open(clade_file, "w") as f:
-        json.dump(round_data, f, indent=4)
+        round_data: RoundData = {
+            "clades": clade_list,
+            "meta": metadata,
+        }
+
+        clade_file = clade_output_path / f"{round_id}.json"
+        with open(clade_file, "w") as f:
+            json.dump(round_data, f, indent=4)
 
     logger.info(f"Clade list saved: {clade_file}")
     return clade_file
@@ -300,7 +344,7 @@ def test_get_clades_adjust_threshold():
     assert clade_list == ["24E", "24F", "25A"]
 
 
-def test_metadata():
+def test_metadata(live):
     """Test that round open metadata is correct."""
     # Updated to use date >= 2025-09-29 (CladeTime 0.4.0 minimum)
     ct = CladeTime(datetime(2025, 10, 15, 2, 16, 22))
@@ -331,6 +375,21 @@ def test_metadata():
     assert total_sequences == sum(sequences_by_clade.values())
 
 
+def test_metadata_snapshot(cladetime_snapshot):
+    """Test round open metadata using the CladeTime test snapshot."""
+    ct = CladeTime(datetime(2025, 10, 15, 2, 16, 22))
+
+    clade_list, sequence_counts = get_clades(get_test_data(), 0.01, 3, 9)
+    meta = get_metadata(ct, sequence_counts)
+
+    assert meta.get("created_at") == "2025-10-15T02:16:22+00:00"
+    ncov_metadata = meta.get("ncov", {})
+    assert ncov_metadata.get("nextclade_dataset_version") == "2025-09-19--14-53-06Z"
+    assert ncov_metadata.get("nextclade_version_num") == "3.18.0"
+    assert ncov_metadata.get("metadata_version_url") == ct.url_ncov_metadata
+    assert meta["sequence_counts"]["total_sequences_last_3_weeks"] == 15
+
+
 def test_unavailable_date_error():
     """Test that CladeTime raises error for dates before data availability window."""
     import pytest
@@ -347,7 +406,7 @@ def test_unavailable_date_error():
     assert "2024-10-15" in error_message
 
 
-def test_end_to_end(monkeypatch, tmp_path):
+def test_end_to_end(live, monkeypatch, tmp_path):
     """Test end-to-end functionality."""
     round_id = "2025-02-26"
     clade_file = main(round_id, tmp_path)
@@ -363,3 +422,30 @@ def test_end_to_end(monkeypatch, tmp_path):
 
     # last item on list of clades to model should be "other"
     assert clade_list[-1] == "other"
+
+
+def test_end_to_end_snapshot(cladetime_snapshot, monkeypatch, tmp_path):
+    """Test end-to-end functionality using the CladeTime test snapshot."""
+    monkeypatch.setenv("RUN_HISTORY_DIR", str(tmp_path / "run-history"))
+    round_id = "2025-10-29"
+    clade_file = main(round_id, tmp_path)
+
+    assert clade_file.name == f"{round_id}.json"
+    clade_dict = json.loads(clade_file.read_text(encoding="utf-8"))
+    clade_list = clade_dict["clades"]
+    assert clade_list[-1] == "other"
+
+    recorded_clades = (
+        sequence.filter_metadata(cladetime_snapshot().sequence_metadata)
+        .select(pl.col("clade").unique())
+        .collect()["clade"]
+        .to_list()
+    )
+    assert set(clade_list[:-1]) <= set(recorded_clades)
+    assert clade_list[:-1] == sorted(clade_list[:-1])
+
+    sequence_counts = clade_dict["meta"]["sequence_counts"]
+    assert sequence_counts["total_sequences_last_3_weeks"] == sum(
+        sequence_counts["sequences_by_clade"].values()
+    )
+    assert sequence_counts["total_sequences_last_3_weeks"] > 0
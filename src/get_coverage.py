@@ -0,0 +1,719 @@
+"""
+Compute interval coverage of a round's sample nowcasts against oracle counts.
+
+For each location/target_date in a round's scoring inputs, a model's sample
+nowcasts are converted to predicted clade counts by drawing multinomial
+samples: each clade-proportion sample is used to draw --draws multinomial
+samples of size N, where N is the total number of sequences in the oracle
+output for that location and target date. Quantiles of the predicted counts
+are compared to the observed counts, giving the same columns as the hub's
+R-based coverage output (auxiliary-data/scores/coverage.parquet):
+
+- interval_coverage: TRUE if the observed count is within the central
+  prediction interval (endpoints included)
+- quantile_coverage: TRUE if the observed count is less than or equal to
+  the predicted quantile
+- quantile_coverage_deviation: quantile_coverage - quantile_level
+
+Submissions are read into dense (location/target_date, sample, clade)
+arrays and multinomial draws are made in batches of location/target_date
+cells, so the per-draw data is never materialized as a data frame. Quantiles
+use the same interpolation as R's default quantile type (type 7).
+
+By default, the random seed is the nowcast date as an integer (YYYYMMDD),
+following the R scoring code. The draws themselves will differ from R's, so
+results match the R output within Monte Carlo error rather than exactly. The
+tests check exact agreement with the R code for a case where the draws are
+deterministic.
+
+The R code uses scoringutils' default quantile levels (interval ranges of 0,
+50, and 90); this script defaults to 50, 80, and 95% intervals. Use
+--interval-range (once per range) to request other ranges.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/get_coverage.py --nowcast-date=2025-06-25
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/get_coverage.py
+"""
+
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+import click
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq  # type: ignore
+
+from atomic_files import write_atomic
+from get_scoring_inputs import (
+    create_scoring_inputs,
+    read_unscored_location_dates,
+    set_unscored_dir,
+)
+from get_target_data import set_target_data_dir
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+# upper bound on the number of multinomial draws (times clades) held in memory
+max_batch_draws = 4_000_000
+
+coverage_columns = [
+    "model_id",
+    "nowcast_date",
+    "target_date",
+    "location",
+    "clade",
+    "quantile_level",
+    "interval_range",
+    "interval_coverage",
+    "quantile_coverage",
+    "quantile_coverage_deviation",
+    "scored",
+    "status",
+]
+
+
+def set_model_output_dir(ctx, param, value):
+    """Set the model_output_dir default value to the hub's model-output directory."""
+    if value is None:
+        value = Path(__file__).parents[1] / "model-output"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=True,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--model-output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_output_dir,
+    help="Directory of model output submissions. Default is the hub's model-output directory.",
+)
+@click.option(
+    "--target-data-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_target_data_dir,
+    help=(
+        "Directory that contains the round's scoring inputs or oracle output. "
+        "Default is the hub's target-data directory."
+    ),
+)
+@click.option(
+    "--unscored-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_unscored_dir,
+    help=(
+        "Directory of unscored-location-dates files, used when the round has no scoring inputs. "
+        "Default is the hub's auxiliary-data/unscored-location-dates."
+    ),
+)
+@click.option(
+    "--interval-range",
+    type=click.IntRange(min=0, max=99),
+    multiple=True,
+    default=[50, 80, 95],
+    show_default=True,
+    help="Central prediction interval range (percent). Can be specified more than once.",
+)
+@click.option(
+    "--draws",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Number of multinomial draws per sample.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    required=False,
+    default=None,
+    help="Random seed. Default is the nowcast date as an integer (YYYYMMDD).",
+)
+@click.option(
+    "--output-file",
+    type=str,
+    required=False,
+    default=None,
+    help="Where to save coverage results. Default is coverage_[round_id].parquet in the current directory.",
+)
+def main(
+    nowcast_date: datetime,
+    model_output_dir: Path,
+    target_data_dir: Path,
+    unscored_dir: Path,
+    interval_range: tuple[int, ...],
+    draws: int,
+    seed: int | None,
+    output_file: str | None,
+) -> Path:
+    nowcast_string = nowcast_date.strftime("%Y-%m-%d")
+    if seed is None:
+        seed = int(nowcast_date.strftime("%Y%m%d"))
+    output_path = (
+        Path(output_file) if output_file else Path(f"coverage_{nowcast_string}.parquet")
+    )
+
+    scoring_inputs = read_round_scoring_inputs(
+        nowcast_string, target_data_dir, unscored_dir
+    )
+
+    model_coverage = []
+    for model_output_file in sorted(
+        model_output_dir.glob(f"*/{nowcast_string}-*.parquet")
+    ):
+        model_id = model_output_file.parent.name
+        samples = read_samples(model_output_file)
+        if samples.height == 0:
+            logger.info(f"Skipping {model_id}: no sample output")
+            continue
+        try:
+            coverage = calc_coverage(
+                samples, scoring_inputs, interval_range, draws=draws, seed=seed
+            ).with_columns(status=pl.lit("success"))
+        except ValueError as e:
+            logger.warning(f"Unable to compute coverage for {model_id}: {e}")
+            coverage = pl.DataFrame({"status": ["error"]})
+        model_coverage.append(
+            coverage.with_columns(
+                model_id=pl.lit(model_id), nowcast_date=pl.lit(nowcast_string)
+            )
+        )
+
+    if model_coverage:
+        coverage = pl.concat(model_coverage, how="diagonal_relaxed")
+    else:
+        coverage = pl.DataFrame(
+            schema={column: pl.String for column in coverage_columns}
+        )
+    coverage = coverage.select(
+        pl.col(column) if column in coverage.columns else pl.lit(None).alias(column)
+        for column in coverage_columns
+    )
+
+    write_atomic(output_path, lambda path: coverage.write_parquet(path))
+    logger.info(f"Coverage for {len(model_coverage)} models saved to {output_path}")
+
+    return output_path
+
+
+def read_round_scoring_inputs(
+    nowcast_string: str, target_data_dir: Path, unscored_dir: Path
+) -> pl.DataFrame:
+    """
+    Return a round's scoring inputs, reading them from the scoring-inputs
+    directory when available and creating them from oracle output otherwise.
+    """
+    scoring_inputs_path = (
+        target_data_dir
+        / "scoring-inputs"
+        / f"nowcast_date={nowcast_string}"
+        / "scoring_inputs.parquet"
+    )
+    if scoring_inputs_path.is_file():
+        return pl.from_arrow(
+            pq.read_table(scoring_inputs_path, memory_map=True, partitioning=None)
+        )
+
+    oracle_path = (
+        target_data_dir
+        / "oracle-output"
+        / f"nowcast_date={nowcast_string}"
+        / "oracle.parquet"
+    )
+    return create_scoring_inputs(
+        pl.scan_parquet(oracle_path, hive_partitioning=False),
+        read_unscored_location_dates(unscored_dir / f"{nowcast_string}.csv"),
+        date.fromisoformat(nowcast_string),
+    ).collect()
+
+
+def read_samples(model_output_file: Path) -> pl.DataFrame:
+    """Return the sample output from a model output file."""
+    return (
+        pl.scan_parquet(model_output_file, hive_partitioning=False)
+        .filter(pl.col("output_type") == "sample")
+        .select(
+            "location",
+            "target_date",
+            "clade",
+            pl.col("output_type_id").cast(pl.String),
+            pl.col("value").cast(pl.Float64),
+        )
+        .collect()
+    )
+
+
+def get_quantile_levels(interval_ranges: tuple[int, ...] | list[int]) -> list[float]:
+    """Return the sorted quantile levels that bound a set of central intervals."""
+    levels = set()
+    for interval_range in interval_ranges:
+        lower = round((100 - interval_range) / 200, 6)
+        levels.update([lower, round(1 - lower, 6)])
+    return sorted(levels)
+
+
+def get_sample_arrays(
+    samples: pl.DataFrame, scoring_inputs: pl.DataFrame
+) -> tuple[pl.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Return dense arrays of sample proportions and observed counts.
+
+    Returns a data frame of location/target_date cells (one row per cell, in the
+    order of the arrays), an array of clade proportions with shape
+    (cell, sample, clade), and an array of observed counts with shape
+    (cell, clade). Clades are in the order of scoring_inputs. Proportions for
+    each sample are normalized to sum to 1.
+
+    Every cell in scoring_inputs for a location that appears in samples must have
+    the same number of samples, and every sample must include every clade.
+    """
+    clades = scoring_inputs["clade"].unique(maintain_order=True).sort()
+    clade_enum = pl.Enum(clades)
+    observed = scoring_inputs.filter(
+        pl.col("location").is_in(samples["location"].unique().implode())
+    ).sort("location", "target_date", "clade")
+    cells = observed.select("location", "target_date", "scored").unique(
+        ["location", "target_date"], maintain_order=True
+    )
+    n_cells, n_clades = cells.height, clades.len()
+    if observed.height != n_cells * n_clades:
+        raise ValueError("scoring inputs do not have one row per clade for every cell")
+
+    samples = (
+        samples.filter(pl.col("clade").is_in(clades.implode()))
+        .with_columns(pl.col("clade").cast(clade_enum))
+        .join(
+            cells.select("location", "target_date"),
+            on=["location", "target_date"],
+            how="semi",
+        )
+        .sort("location", "target_date", "output_type_id", "clade")
+    )
+    if samples.height == 0 or samples.height % (n_cells * n_clades) != 0:
+        raise ValueError(
+            "samples must include every clade for every location and target date scored"
+        )
+    n_samples = samples.height // (n_cells * n_clades)
+    shape_check = samples.group_by("location", "target_date").agg(
+        samples=pl.col("output_type_id").n_unique(), rows=pl.len()
+    )
+    if (
+        shape_check.height != n_cells
+        or (shape_check["samples"] != n_samples).any()
+        or (shape_check["rows"] != n_samples * n_clades).any()
+    ):
+        raise ValueError(
+            "samples must include every clade for every location and target date scored"
+        )
+
+    proportions = samples["value"].to_numpy().reshape(n_cells, n_samples, n_clades)
+    proportions = proportions / proportions.sum(axis=2, keepdims=True)
+    observed_counts = (
+        observed["oracle_value"].to_numpy().astype(np.int64).reshape(n_cells, n_clades)
+    )
+
+    return cells, proportions, observed_counts
+
+
+def sample_count_quantiles(
+    proportions: np.ndarray,
+    totals: np.ndarray,
+    quantile_levels: list[float],
+    draws: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Return quantiles of multinomial clade counts, with shape (cell, quantile, clade).
+
+    For each cell, each of the cell's proportion samples is used to draw
+    `draws` multinomial samples of size totals[cell]. Cells are processed in
+    batches so that no more than max_batch_draws counts are held in memory.
+    """
+    n_cells, n_samples, n_clades = proportions.shape
+    batch_size = max(1, max_batch_draws // (n_samples * draws * n_clades))
+    quantiles = np.empty((n_cells, len(quantile_levels), n_clades))
+
+    for start in range(0, n_cells, batch_size):
+        stop = min(start + batch_size, n_cells)
+        counts = rng.multinomial(
+            totals[start:stop, None, None],
+            proportions[start:stop, :, None, :],
+            size=(stop - start, n_samples, draws),
+        )
+        quantiles[start:stop] = np.moveaxis(
+            np.quantile(
+                counts.reshape(stop - start, n_samples * draws, n_clades),
+                quantile_levels,
+                axis=1,
+                method="linear",
+            ),
+            0,
+            1,
+        )
+
+    return quantiles
+
+
+def calc_coverage(
+    samples: pl.DataFrame,
+    scoring_inputs: pl.DataFrame,
+    interval_ranges: tuple[int, ...] | list[int],
+    draws: int = 100,
+    seed: int | None = None,
+) -> pl.DataFrame:
+    """
+    Return interval and quantile coverage for each location, target_date,
+    clade, and quantile level.
+
+    Only locations included in samples are evaluated.
+    """
+    cells, proportions, observed = get_sample_arrays(samples, scoring_inputs)
+    quantile_levels = get_quantile_levels(interval_ranges)
+    quantiles = sample_count_quantiles(
+        proportions,
+        observed.sum(axis=1),
+        quantile_levels,
+        draws,
+        np.random.default_rng(seed),
+    )
+
+    levels = np.array(quantile_levels)
+    level_ranges = np.round(np.abs(1 - 2 * levels) * 100, 6)
+    level_index = {level: i for i, level in enumerate(quantile_levels)}
+    interval_coverage = np.empty_like(quantiles, dtype=bool)
+    for i, level in enumerate(quantile_levels):
+        lower = level_index[min(level, round(1 - level, 6))]
+        upper = level_index[max(level, round(1 - level, 6))]
+        interval_coverage[:, i, :] = (quantiles[:, lower, :] <= observed) & (
+            observed <= quantiles[:, upper, :]
+        )
+    quantile_coverage = observed[:, None, :] <= quantiles
+
+    n_cells, n_levels, n_clades = quantiles.shape
+    clades = scoring_inputs["clade"].unique(maintain_order=True).sort()
+    cell_index = np.repeat(np.arange(n_cells), n_levels * n_clades)
+    return pl.DataFrame(
+        {
+            "target_date": cells["target_date"].gather(cell_index),
+            "location": cells["location"].gather(cell_index),
+            "clade": np.tile(clades.to_numpy(), n_cells * n_levels),
+            "quantile_level": np.tile(np.repeat(levels, n_clades), n_cells),
+            "interval_range": np.tile(np.repeat(level_ranges, n_clades), n_cells),
+            "interval_coverage": interval_coverage.ravel(),
+            "quantile_coverage": quantile_coverage.ravel(),
+            "quantile_coverage_deviation": quantile_coverage.ravel()
+            - np.tile(np.repeat(levels, n_clades), n_cells),
+            "scored": cells["scored"].gather(cell_index),
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def make_test_inputs(
+    locations: list[str], target_dates: list[date], clades: list[str], samples: int
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Return random sample output and scoring inputs for tests."""
+    rng = np.random.default_rng(1)
+    cells = [(loc, d) for loc in locations for d in target_dates]
+    scoring_inputs = pl.DataFrame(
+        {
+            "location": [loc for loc, _ in cells for _ in clades],
+            "target_date": [d for _, d in cells for _ in clades],
+            "clade": clades * len(cells),
+            "oracle_value": rng.integers(0, 20, len(cells) * len(clades)),
+            "scored": [True] * len(cells) * len(clades),
+        }
+    )
+    proportions = rng.dirichlet([1] * len(clades), size=len(cells) * samples).ravel()
+    samples_df = pl.DataFrame(
+        {
+            "location": [loc for loc, _ in cells for _ in range(samples * len(clades))],
+            "target_date": [d for _, d in cells for _ in range(samples * len(clades))],
+            "clade": clades * len(cells) * samples,
+            "output_type_id": [
+                f"{loc}{s:02}"
+                for loc, _ in cells
+                for s in range(samples)
+                for _ in clades
+            ],
+            "value": proportions,
+        }
+    )
+    return samples_df, scoring_inputs
+
+
+def test_quantile_levels():
+    assert get_quantile_levels([50, 80, 95]) == [0.025, 0.1, 0.25, 0.75, 0.9, 0.975]
+    assert get_quantile_levels([0, 50, 90]) == [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+def test_sample_arrays():
+    """Samples are arranged as (cell, sample, clade) arrays in clade order."""
+    target_dates = [date(2025, 1, 1), date(2025, 1, 2)]
+    samples, scoring_inputs = make_test_inputs(
+        ["PA", "MA"], target_dates, ["B", "A"], 3
+    )
+    # a location without samples is not evaluated
+    scoring_inputs = pl.concat(
+        [
+            scoring_inputs,
+            scoring_inputs.filter(location="PA").with_columns(location=pl.lit("NY")),
+        ]
+    )
+    cells, proportions, observed = get_sample_arrays(samples.reverse(), scoring_inputs)
+
+    assert cells.select("location", "target_date").rows() == [
+        ("MA", target_dates[0]),
+        ("MA", target_dates[1]),
+        ("PA", target_dates[0]),
+        ("PA", target_dates[1]),
+    ]
+    assert proportions.shape == (4, 3, 2)
+    assert np.allclose(proportions.sum(axis=2), 1)
+    expected = samples.filter(
+        location="PA", target_date=target_dates[1], output_type_id="PA01"
+    )
+    assert proportions[3, 1, 0] == expected.filter(clade="A")["value"].item()
+    assert observed[0, 1] == (
+        scoring_inputs.filter(location="MA", target_date=target_dates[0], clade="B")[
+            "oracle_value"
+        ].item()
+    )
+
+    # missing samples are an error
+    try:
+        get_sample_arrays(samples.slice(1), scoring_inputs)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("incomplete samples should raise a ValueError")
+
+
+def test_sample_count_quantiles():
+    """Batched quantiles agree with a per-cell loop over multinomial draws."""
+    target_dates = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    samples, scoring_inputs = make_test_inputs(
+        ["PA", "MA"], target_dates, ["A", "B", "C"], 20
+    )
+    scoring_inputs = scoring_inputs.with_columns(oracle_value=pl.lit(500))
+    _, proportions, observed = get_sample_arrays(samples, scoring_inputs)
+    totals = observed.sum(axis=1)
+    levels = get_quantile_levels([50, 80, 95])
+
+    quantiles = sample_count_quantiles(
+        proportions, totals, levels, 200, np.random.default_rng(1)
+    )
+    assert quantiles.shape == (6, len(levels), 3)
+
+    rng = np.random.default_rng(2)
+    for cell in range(proportions.shape[0]):
+        counts = np.concatenate(
+            [rng.multinomial(totals[cell], p, size=200) for p in proportions[cell]]
+        )
+        expected = np.quantile(counts, levels, axis=0)
+        assert np.allclose(quantiles[cell], expected, atol=0.03 * totals[cell])
+
+    # degenerate proportions give exact quantiles
+    proportions = np.zeros((2, 4, 3))
+    proportions[:, :, 1] = 1
+    quantiles = sample_count_quantiles(
+        proportions, np.array([7, 0]), levels, 5, np.random.default_rng(1)
+    )
+    assert (quantiles[0, :, 1] == 7).all()
+    assert (quantiles[:, :, [0, 2]] == 0).all()
+    assert (quantiles[1] == 0).all()
+
+
+def test_calc_coverage():
+    """Coverage is reproducible, nested, and follows quantile definitions."""
+    target_dates = [date(2025, 1, 1), date(2025, 1, 2)]
+    samples, scoring_inputs = make_test_inputs(
+        ["PA", "MA"], target_dates, ["A", "B"], 10
+    )
+    scoring_inputs = scoring_inputs.with_columns(scored=pl.col("location") == "PA")
+
+    coverage = calc_coverage(samples, scoring_inputs, [50, 95], draws=20, seed=7)
+    assert coverage.height == 4 * 2 * 4
+    assert coverage.equals(
+        calc_coverage(samples, scoring_inputs, [50, 95], draws=20, seed=7)
+    )
+    assert coverage.filter(location="PA")["scored"].all()
+    assert not coverage.filter(location="MA")["scored"].any()
+    assert sorted(coverage["interval_range"].unique().to_list()) == [50, 95]
+    assert coverage.filter(quantile_level=0.975)["interval_range"].unique().item() == 95
+    assert (
+        coverage["quantile_coverage_deviation"]
+        == coverage["quantile_coverage"].cast(pl.Float64) - coverage["quantile_level"]
+    ).all()
+
+    # a 95% interval covers whatever the 50% interval covers
+    nested = coverage.filter(quantile_level=0.025).join(
+        coverage.filter(quantile_level=0.25),
+        on=["location", "target_date", "clade"],
+        suffix="_50",
+    )
+    assert (nested["interval_coverage"] >= nested["interval_coverage_50"]).all()
+    # lower and upper quantiles of an interval share its interval coverage
+    bounds = coverage.filter(quantile_level=0.025).join(
+        coverage.filter(quantile_level=0.975),
+        on=["location", "target_date", "clade"],
+        suffix="_upper",
+    )
+    assert (bounds["interval_coverage"] == bounds["interval_coverage_upper"]).all()
+
+
+def test_coverage_matches_r():
+    """
+    Coverage matches the R scoring code for a case with deterministic draws.
+
+    Each sample puts all of its proportion on one clade, so rmultinom (and
+    numpy's multinomial) always draws N sequences of that clade, and the R
+    output of calc_coverage in model_scoring_functions.R (100 draws per sample,
+    scoringutils' default quantile levels, type 7 quantiles) is fixed. With 4
+    samples, 1 for clade A and 3 for clade B, the 400 predicted counts for A are
+    300 zeros and 100 eights, so the type 7 0.75 quantile interpolates between
+    them: 0 + 0.25 * 8 = 2.
+    """
+    target_date = date(2025, 1, 1)
+    clades = ["A", "B", "C"]
+    one_hot = {"s0": "A", "s1": "B", "s2": "B", "s3": "B"}
+    samples = pl.DataFrame(
+        {
+            "location": "MA",
+            "target_date": target_date,
+            "clade": clades * len(one_hot),
+            "output_type_id": [s for s in one_hot for _ in clades],
+            "value": [float(one_hot[s] == c) for s in one_hot for c in clades],
+        }
+    )
+    scoring_inputs = pl.DataFrame(
+        {
+            "location": "MA",
+            "target_date": target_date,
+            "clade": clades,
+            "oracle_value": [2, 6, 0],
+            "scored": True,
+        }
+    )
+    # clade, quantile_level, predicted, interval_range, interval_coverage,
+    # quantile_coverage; from R's quantile(type = 7) and
+    # scoringutils::get_coverage for the counts above
+    r_output = pl.DataFrame(
+        [
+            ("A", 0.05, 0.0, 90.0, True, False),
+            ("A", 0.25, 0.0, 50.0, True, False),
+            ("A", 0.5, 0.0, 0.0, False, False),
+            ("A", 0.75, 2.0, 50.0, True, True),
+            ("A", 0.95, 8.0, 90.0, True, True),
+            ("B", 0.05, 0.0, 90.0, True, False),
+            ("B", 0.25, 6.0, 50.0, True, True),
+            ("B", 0.5, 8.0, 0.0, False, True),
+            ("B", 0.75, 8.0, 50.0, True, True),
+            ("B", 0.95, 8.0, 90.0, True, True),
+            ("C", 0.05, 0.0, 90.0, True, True),
+            ("C", 0.25, 0.0, 50.0, True, True),
+            ("C", 0.5, 0.0, 0.0, True, True),
+            ("C", 0.75, 0.0, 50.0, True, True),
+            ("C", 0.95, 0.0, 90.0, True, True),
+        ],
+        schema=[
+            "clade",
+            "quantile_level",
+            "predicted",
+            "interval_range",
+            "interval_coverage",
+            "quantile_coverage",
+        ],
+        orient="row",
+    )
+    levels = get_quantile_levels([0, 50, 90])
+
+    _, proportions, observed = get_sample_arrays(samples, scoring_inputs)
+    quantiles = sample_count_quantiles(
+        proportions, observed.sum(axis=1), levels, 100, np.random.default_rng(1)
+    )
+    assert quantiles[0].T.ravel().tolist() == r_output["predicted"].to_list()
+
+    coverage = calc_coverage(samples, scoring_inputs, [0, 50, 90], draws=100)
+    assert (
+        coverage.select(r_output.drop("predicted").columns)
+        .sort("clade", "quantile_level")
+        .equals(r_output.drop("predicted"))
+    )
+
+
+def test_coverage_cli(tmp_path):
+    """The CLI computes coverage for a round's sample submissions."""
+    from click.testing import CliRunner
+
+    target_dates = [date(2025, 1, 1), date(2025, 1, 2)]
+    samples, scoring_inputs = make_test_inputs(
+        ["PA", "MA"], target_dates, ["A", "B"], 5
+    )
+    nowcast_date = date(2025, 1, 8)
+    scoring_dir = (
+        tmp_path / "target-data" / "scoring-inputs" / "nowcast_date=2025-01-08"
+    )
+    scoring_dir.mkdir(parents=True)
+    scoring_inputs.write_parquet(scoring_dir / "scoring_inputs.parquet")
+    for model_id, output_type in [("team-sample", "sample"), ("team-mean", "mean")]:
+        model_dir = tmp_path / "model-output" / model_id
+        model_dir.mkdir(parents=True)
+        samples.with_columns(
+            nowcast_date=pl.lit(nowcast_date), output_type=pl.lit(output_type)
+        ).write_parquet(model_dir / f"2025-01-08-{model_id}.parquet")
+
+    output_file = tmp_path / "coverage.parquet"
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "--nowcast-date=2025-01-08",
+            f"--model-output-dir={tmp_path / 'model-output'}",
+            f"--target-data-dir={tmp_path / 'target-data'}",
+            f"--output-file={output_file}",
+        ],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+
+    coverage = pl.read_parquet(output_file)
+    assert coverage.columns == coverage_columns
+    assert coverage["model_id"].unique().to_list() == ["team-sample"]
+    assert coverage["status"].unique().to_list() == ["success"]
+    assert coverage["nowcast_date"].unique().to_list() == ["2025-01-08"]
+    assert coverage.height == 4 * 2 * 6
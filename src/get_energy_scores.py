@@ -0,0 +1,721 @@
+"""
+Compute energy scores of a round's sample nowcasts against oracle counts.
+
+The hub's R scoring code (model_scoring_functions.R) draws 100 multinomial
+count vectors from each of a model's 100 clade-proportion samples for a
+location/target_date, and passes all 10,000 of them to scoringRules::es_sample.
+The energy score's pairwise term is quadratic in the number of draws, so it
+dominates scoring time. This script estimates the same score,
+
+    ES = E||X - y|| - 1/2 E||X - X'||
+
+where X and X' are independent draws from the model's predictive distribution
+of counts (a mixture of Multinomial(N, p_s) over samples p_s) and y is the
+observed counts, with one of three methods (--method):
+
+- reference: the R computation (--draws multinomial draws per sample and
+  every pair of draws in the pairwise term)
+- sampled (default): --draws multinomial draws per sample for the first term
+  and --pairs random pairs of draws for the pairwise term (an unbiased
+  U-statistic: pairs of distinct draws whose samples are chosen independently).
+  Both terms use control variates: the squared distances ||X - y||^2 and
+  ||X - X'||^2 have closed-form expectations under the multinomial
+  distribution, so their sampling error is used to correct the distances'.
+  The pairwise term also corrects for which pairs of samples were chosen,
+  using the closed-form root expected squared distance of every pair.
+- moment: no draws. Each distance is replaced by the square root of its
+  closed-form expected square. This is fast and deterministic, but biased
+  (by Jensen's inequality), so it is mostly useful for quick comparisons.
+
+--benchmark compares the methods to the reference on a random subset of a
+round's location/target_dates for every model, and reports each method's error,
+run time, and whether it ranks the models in the same order as the reference.
+
+By default, the random seed is the nowcast date as an integer (YYYYMMDD),
+following the R scoring code.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/get_energy_scores.py --nowcast-date=2025-06-25
+uv run --with-requirements src/requirements.txt src/get_energy_scores.py --nowcast-date=2025-06-25 --benchmark
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/get_energy_scores.py
+"""
+
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+
+import click
+import numpy as np
+import polars as pl
+
+from atomic_files import write_atomic
+from get_coverage import (
+    get_sample_arrays,
+    read_round_scoring_inputs,
+    read_samples,
+    set_model_output_dir,
+)
+from get_scoring_inputs import set_unscored_dir
+from get_target_data import set_target_data_dir
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+# upper bound on the number of multinomial draws (times clades) held in memory
+max_batch_draws = 4_000_000
+
+# rows of the reference method's pairwise distance matrix computed at a time
+reference_block_rows = 1_000
+
+energy_columns = [
+    "model_id",
+    "nowcast_date",
+    "target_date",
+    "location",
+    "energy",
+    "scored",
+    "status",
+]
+
+# (method, draws, pairs) settings compared to the reference by --benchmark
+benchmark_settings = [
+    ("moment", 0, 0),
+    ("sampled", 2, 1_000),
+    ("sampled", 5, 2_000),
+    ("sampled", 10, 5_000),
+    ("sampled", 20, 20_000),
+]
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=True,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--model-output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_output_dir,
+    help="Directory of model output submissions. Default is the hub's model-output directory.",
+)
+@click.option(
+    "--target-data-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_target_data_dir,
+    help=(
+        "Directory that contains the round's scoring inputs or oracle output. "
+        "Default is the hub's target-data directory."
+    ),
+)
+@click.option(
+    "--unscored-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_unscored_dir,
+    help=(
+        "Directory of unscored-location-dates files, used when the round has no scoring inputs. "
+        "Default is the hub's auxiliary-data/unscored-location-dates."
+    ),
+)
+@click.option(
+    "--method",
+    type=click.Choice(["sampled", "reference", "moment"]),
+    default="sampled",
+    show_default=True,
+    help="How to estimate the energy score.",
+)
+@click.option(
+    "--draws",
+    type=click.IntRange(min=2),
+    default=10,
+    show_default=True,
+    help="Number of multinomial draws per sample (sampled and reference methods).",
+)
+@click.option(
+    "--pairs",
+    type=click.IntRange(min=1),
+    default=5_000,
+    show_default=True,
+    help="Number of random pairs of draws used for the pairwise term (sampled method).",
+)
+@click.option(
+    "--seed",
+    type=int,
+    required=False,
+    default=None,
+    help="Random seed. Default is the nowcast date as an integer (YYYYMMDD).",
+)
+@click.option(
+    "--benchmark",
+    is_flag=True,
+    default=False,
+    help="Compare estimation methods to the reference instead of scoring the round.",
+)
+@click.option(
+    "--benchmark-cells",
+    type=click.IntRange(min=1),
+    default=40,
+    show_default=True,
+    help="Number of random location/target_dates used by --benchmark.",
+)
+@click.option(
+    "--output-file",
+    type=str,
+    required=False,
+    default=None,
+    help=(
+        "Where to save energy scores (or benchmark results). Default is energy_[round_id].parquet "
+        "(or energy_benchmark_[round_id].parquet) in the current directory."
+    ),
+)
+def main(
+    nowcast_date: datetime,
+    model_output_dir: Path,
+    target_data_dir: Path,
+    unscored_dir: Path,
+    method: str,
+    draws: int,
+    pairs: int,
+    seed: int | None,
+    benchmark: bool,
+    benchmark_cells: int,
+    output_file: str | None,
+) -> Path:
+    nowcast_string = nowcast_date.strftime("%Y-%m-%d")
+    if seed is None:
+        seed = int(nowcast_date.strftime("%Y%m%d"))
+    output_name = "energy_benchmark" if benchmark else "energy"
+    output_path = (
+        Path(output_file)
+        if output_file
+        else Path(f"{output_name}_{nowcast_string}.parquet")
+    )
+
+    scoring_inputs = read_round_scoring_inputs(
+        nowcast_string, target_data_dir, unscored_dir
+    )
+    model_samples = {}
+    for model_output_file in sorted(
+        model_output_dir.glob(f"*/{nowcast_string}-*.parquet")
+    ):
+        model_id = model_output_file.parent.name
+        samples = read_samples(model_output_file)
+        if samples.height == 0:
+            logger.info(f"Skipping {model_id}: no sample output")
+            continue
+        model_samples[model_id] = samples
+
+    if benchmark:
+        results = benchmark_energy_scores(
+            model_samples, scoring_inputs, benchmark_cells, seed
+        )
+        with pl.Config(tbl_rows=-1, tbl_hide_dataframe_shape=True):
+            logger.info(
+                f"Energy score estimates compared to the reference:\n"
+                f"{summarize_benchmark(results)}"
+            )
+        write_atomic(output_path, lambda path: results.write_parquet(path))
+        logger.info(f"Benchmark results saved to {output_path}")
+        return output_path
+
+    model_scores = []
+    for model_id, samples in model_samples.items():
+        try:
+            scores = calc_energy_scores(
+                samples, scoring_inputs, method, draws, pairs, seed
+            ).with_columns(status=pl.lit("success"))
+        except ValueError as e:
+            logger.warning(f"Unable to compute energy scores for {model_id}: {e}")
+            scores = pl.DataFrame({"status": ["error"]})
+        model_scores.append(
+            scores.with_columns(
+                model_id=pl.lit(model_id), nowcast_date=pl.lit(nowcast_string)
+            )
+        )
+
+    if model_scores:
+        scores = pl.concat(model_scores, how="diagonal_relaxed")
+    else:
+        scores = pl.DataFrame(schema={column: pl.String for column in energy_columns})
+    scores = scores.select(
+        pl.col(column) if column in scores.columns else pl.lit(None).alias(column)
+        for column in energy_columns
+    )
+
+    write_atomic(output_path, lambda path: scores.write_parquet(path))
+    logger.info(f"Energy scores for {len(model_scores)} models saved to {output_path}")
+
+    return output_path
+
+
+def calc_energy_scores(
+    samples: pl.DataFrame,
+    scoring_inputs: pl.DataFrame,
+    method: str = "sampled",
+    draws: int = 10,
+    pairs: int = 5_000,
+    seed: int | None = None,
+) -> pl.DataFrame:
+    """
+    Return the energy score for each location and target_date.
+
+    Only locations included in samples are scored. As in the R scoring code,
+    the score is missing for location/target_dates with no observed sequences.
+    """
+    cells, proportions, observed = get_sample_arrays(samples, scoring_inputs)
+    energy = estimate_energy_scores(
+        proportions, observed, method, draws, pairs, np.random.default_rng(seed)
+    )
+    return cells.with_columns(energy=pl.Series(energy).fill_nan(None))
+
+
+def estimate_energy_scores(
+    proportions: np.ndarray,
+    observed: np.ndarray,
+    method: str,
+    draws: int,
+    pairs: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Return energy scores of multinomial count predictions, with shape (cell,).
+
+    proportions has shape (cell, sample, clade) and observed has shape
+    (cell, clade); the multinomial size for each cell is its total observed
+    count. Scores are NaN for cells with no observed counts.
+    """
+    totals = observed.sum(axis=1)
+    energy = np.full(len(totals), np.nan)
+    cells = np.flatnonzero(totals > 0)
+    if method == "moment":
+        estimate = moment_energy_scores
+    elif method == "sampled":
+        estimate = sampled_energy_scores
+    elif method == "reference":
+        estimate = reference_energy_scores
+    else:
+        raise ValueError(f"Unknown energy score method: {method}")
+
+    n_samples, n_clades = proportions.shape[1:]
+    batch_size = max(1, max_batch_draws // (n_samples * max(draws, 1) * n_clades))
+    for start in range(0, len(cells), batch_size):
+        batch = cells[start : start + batch_size]
+        energy[batch] = estimate(
+            proportions[batch], observed[batch], draws=draws, pairs=pairs, rng=rng
+        )
+
+    return energy
+
+
+def draw_counts(
+    proportions: np.ndarray, totals: np.ndarray, draws: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Return multinomial counts with shape (cell, sample, draw, clade)."""
+    n_cells, n_samples, _ = proportions.shape
+    return rng.multinomial(
+        totals[:, None, None],
+        proportions[:, :, None, :],
+        size=(n_cells, n_samples, draws),
+    ).astype(np.float64)
+
+
+def expected_squared_distances(
+    proportions: np.ndarray, observed: np.ndarray
+) -> np.ndarray:
+    """
+    Return E||X - y||^2 for X ~ Multinomial(N, p) for each sample, with shape
+    (cell, sample): ||N p - y||^2 + N sum(p (1 - p)).
+    """
+    totals = observed.sum(axis=1)[:, None, None]
+    return np.sum(
+        (totals * proportions - observed[:, None, :]) ** 2
+        + totals * proportions * (1 - proportions),
+        axis=2,
+    )
+
+
+def expected_squared_pair_distances(
+    p1: np.ndarray, p2: np.ndarray, totals: np.ndarray
+) -> np.ndarray:
+    """
+    Return E||X1 - X2||^2 for independent X1 ~ Multinomial(N, p1) and
+    X2 ~ Multinomial(N, p2): N^2 ||p1 - p2||^2 + N sum(p1 (1 - p1) + p2 (1 - p2)).
+    p1 and p2 have shape (cell, ..., clade) and totals has shape (cell,).
+    """
+    totals = totals.reshape(-1, *[1] * (p1.ndim - 2))
+    return totals**2 * np.sum((p1 - p2) ** 2, axis=-1) + totals * np.sum(
+        p1 * (1 - p1) + p2 * (1 - p2), axis=-1
+    )
+
+
+def expected_squared_sample_pair_distances(
+    proportions: np.ndarray, totals: np.ndarray
+) -> np.ndarray:
+    """
+    Return expected_squared_pair_distances for every pair of samples, with
+    shape (cell, sample, sample), without materializing per-clade differences.
+    """
+    norms = np.sum(proportions**2, axis=2)
+    variances = totals[:, None] * (1 - norms)
+    squared_differences = (
+        norms[:, :, None]
+        + norms[:, None, :]
+        - 2 * proportions @ np.swapaxes(proportions, -1, -2)
+    )
+    return (
+        totals[:, None, None] ** 2 * np.maximum(squared_differences, 0)
+        + variances[:, :, None]
+        + variances[:, None, :]
+    )
+
+
+def control_variate_mean(values: np.ndarray, *controls: np.ndarray) -> np.ndarray:
+    """
+    Return the mean of values over the last axis, adjusted with zero-mean
+    controls: mean(values) - b . mean(controls), where the coefficients b are
+    estimated for each cell by least squares.
+    """
+    x = np.stack(controls, axis=-1)
+    centered_x = x - x.mean(axis=-2, keepdims=True)
+    centered_values = values - values.mean(axis=-1, keepdims=True)
+    b = np.linalg.pinv(np.swapaxes(centered_x, -1, -2) @ centered_x) @ (
+        np.swapaxes(centered_x, -1, -2) @ centered_values[..., None]
+    )
+    return values.mean(axis=-1) - (x.mean(axis=-2)[..., None, :] @ b)[..., 0, 0]
+
+
+def sampled_energy_scores(
+    proportions: np.ndarray,
+    observed: np.ndarray,
+    draws: int,
+    pairs: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Estimate energy scores with subsampled pairs and control variates."""
+    n_cells, n_samples, _ = proportions.shape
+    totals = observed.sum(axis=1)
+    counts = draw_counts(proportions, totals, draws, rng)
+
+    # E||X - y||, with ||X - y||^2 - E||X - y||^2 as the control
+    squared = np.sum((counts - observed[:, None, None, :]) ** 2, axis=3)
+    controls = squared - expected_squared_distances(proportions, observed)[:, :, None]
+    term1 = control_variate_mean(
+        np.sqrt(squared).reshape(n_cells, -1), controls.reshape(n_cells, -1)
+    )
+
+    # E||X - X'|| from random pairs of distinct draws: samples are chosen
+    # independently, and a pair from the same sample uses different draws
+    cell = np.arange(n_cells)[:, None]
+    sample1 = rng.integers(n_samples, size=(n_cells, pairs))
+    sample2 = rng.integers(n_samples, size=(n_cells, pairs))
+    draw1 = rng.integers(draws, size=(n_cells, pairs))
+    draw2 = np.where(
+        sample1 == sample2,
+        (draw1 + 1 + rng.integers(draws - 1, size=(n_cells, pairs))) % draws,
+        rng.integers(draws, size=(n_cells, pairs)),
+    )
+    squared = np.sum(
+        (counts[cell, sample1, draw1] - counts[cell, sample2, draw2]) ** 2, axis=2
+    )
+    expected = expected_squared_pair_distances(
+        proportions[cell, sample1], proportions[cell, sample2], totals
+    )
+    # the second control corrects for which pairs of samples were chosen
+    expected_roots = np.sqrt(
+        expected_squared_sample_pair_distances(proportions, totals)
+    )
+    term2 = control_variate_mean(
+        np.sqrt(squared),
+        squared - expected,
+        np.sqrt(expected) - expected_roots.mean(axis=(1, 2))[:, None],
+    )
+
+    return term1 - term2 / 2
+
+
+def moment_energy_scores(
+    proportions: np.ndarray,
+    observed: np.ndarray,
+    rng: np.random.Generator | None = None,
+    **kwargs,
+) -> np.ndarray:
+    """Approximate energy scores with the square roots of expected squared distances."""
+    totals = observed.sum(axis=1)
+    term1 = np.sqrt(expected_squared_distances(proportions, observed)).mean(axis=1)
+    term2 = np.sqrt(expected_squared_sample_pair_distances(proportions, totals)).mean(
+        axis=(1, 2)
+    )
+    return term1 - term2 / 2
+
+
+def reference_energy_scores(
+    proportions: np.ndarray,
+    observed: np.ndarray,
+    draws: int,
+    rng: np.random.Generator,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Compute energy scores the way the R scoring code does: scoringRules'
+    es_sample on every multinomial draw, including every pair of draws.
+    """
+    n_cells, _, n_clades = proportions.shape
+    counts = draw_counts(proportions, observed.sum(axis=1), draws, rng)
+    energy = np.empty(n_cells)
+    for i in range(n_cells):
+        x = counts[i].reshape(-1, n_clades)
+        term1 = np.sqrt(np.sum((x - observed[i]) ** 2, axis=1)).mean()
+        norms = np.sum(x**2, axis=1)
+        pair_sum = 0.0
+        for start in range(0, len(x), reference_block_rows):
+            block = x[start : start + reference_block_rows]
+            squared = norms[start : start + len(block), None] + norms - 2 * block @ x.T
+            pair_sum += np.sqrt(np.maximum(squared, 0)).sum()
+        energy[i] = term1 - pair_sum / (2 * len(x) ** 2)
+
+    return energy
+
+
+def benchmark_energy_scores(
+    model_samples: dict[str, pl.DataFrame],
+    scoring_inputs: pl.DataFrame,
+    n_cells: int,
+    seed: int,
+) -> pl.DataFrame:
+    """
+    Return energy scores from the reference and each of benchmark_settings for
+    the same random location/target_dates for each model.
+
+    The reference (100 draws per sample, every pair) is run twice with
+    different seeds; the second run, "reference (re-run)", shows the reference's
+    own Monte Carlo error.
+    """
+    rng = np.random.default_rng(seed)
+    scored = scoring_inputs.group_by("location", "target_date").agg(
+        total=pl.col("oracle_value").sum()
+    )
+    cells = scored.filter(pl.col("total") > 0).sort("location", "target_date")
+    cells = cells[np.sort(rng.choice(cells.height, min(n_cells, cells.height), False))]
+    cell_inputs = scoring_inputs.join(
+        cells.select("location", "target_date"), on=["location", "target_date"]
+    )
+    settings = [
+        ("reference", 100, 0, "reference"),
+        ("reference", 100, 0, "reference (re-run)"),
+    ] + [
+        (method, draws, pairs, f"{method} (draws={draws}, pairs={pairs})")
+        for method, draws, pairs in benchmark_settings
+    ]
+
+    results = []
+    for model_id, samples in model_samples.items():
+        try:
+            _, proportions, observed = get_sample_arrays(samples, cell_inputs)
+        except ValueError as e:
+            logger.warning(f"Skipping {model_id}: {e}")
+            continue
+        for method, draws, pairs, name in settings:
+            start = time.perf_counter()
+            energy = estimate_energy_scores(
+                proportions, observed, method, draws, pairs, rng
+            )
+            results.append(
+                pl.DataFrame(
+                    {
+                        "model_id": model_id,
+                        "method": name,
+                        "cell": np.arange(len(energy)),
+                        "energy": energy,
+                        "seconds": time.perf_counter() - start,
+                    }
+                )
+            )
+
+    return pl.concat(results)
+
+
+def summarize_benchmark(results: pl.DataFrame) -> pl.DataFrame:
+    """
+    Return each method's error relative to the reference, its run time per
+    model, and whether it ranks models by mean energy score in the same order
+    as the reference.
+    """
+    reference = results.filter(method="reference").select(
+        "model_id", "cell", reference="energy"
+    )
+    reference_ranking = (
+        reference.group_by("model_id").agg(pl.mean("reference")).sort("reference")
+    )["model_id"].to_list()
+
+    compared = results.join(reference, on=["model_id", "cell"]).with_columns(
+        error=(pl.col("energy") - pl.col("reference")).abs()
+    )
+    rankings = (
+        compared.group_by("method", "model_id")
+        .agg(pl.mean("energy"))
+        .sort("energy")
+        .group_by("method", maintain_order=True)
+        .agg(ranking=pl.col("model_id").str.join(","))
+        .select("method", same_ranking=pl.col("ranking") == ",".join(reference_ranking))
+    )
+    return (
+        compared.group_by("method")
+        .agg(
+            mean_abs_error=pl.mean("error"),
+            mean_rel_error=(pl.col("error") / pl.col("reference")).mean(),
+            max_rel_error=(pl.col("error") / pl.col("reference")).max(),
+            seconds_per_model=pl.col("seconds").unique().mean(),
+        )
+        .join(rankings, on="method")
+        .sort("seconds_per_model", descending=True)
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_expected_squared_distances():
+    """Closed-form multinomial moments match simulated ones."""
+    rng = np.random.default_rng(1)
+    proportions = np.array([[[0.2, 0.3, 0.5], [0.6, 0.3, 0.1]]])
+    observed = np.array([[10, 5, 15]])
+    counts = draw_counts(proportions, observed.sum(axis=1), 20_000, rng)
+
+    simulated = np.mean(np.sum((counts - observed[:, None, None]) ** 2, axis=3), axis=2)
+    expected = expected_squared_distances(proportions, observed)
+    assert np.allclose(simulated, expected, rtol=0.02)
+
+    simulated = np.mean(np.sum((counts[:, 0] - counts[:, 1]) ** 2, axis=2))
+    expected = expected_squared_pair_distances(
+        proportions[:, 0], proportions[:, 1], observed.sum(axis=1)
+    )
+    assert np.allclose(simulated, expected, rtol=0.02)
+    all_pairs = expected_squared_sample_pair_distances(
+        proportions, observed.sum(axis=1)
+    )
+    assert np.isclose(all_pairs[0, 0, 1], expected[0])
+    assert np.allclose(all_pairs, np.swapaxes(all_pairs, -1, -2))
+
+
+def test_reference_energy_scores():
+    """The reference method matches a direct computation of es_sample."""
+    rng = np.random.default_rng(2)
+    proportions = rng.dirichlet([1, 2, 3], size=(2, 4))
+    observed = np.array([[3, 0, 9], [20, 10, 1]])
+
+    energy = reference_energy_scores(
+        proportions, observed, draws=3, rng=np.random.default_rng(3)
+    )
+    counts = draw_counts(proportions, observed.sum(axis=1), 3, np.random.default_rng(3))
+    for i in range(2):
+        x = counts[i].reshape(-1, 3)
+        term1 = np.mean([np.linalg.norm(row - observed[i]) for row in x])
+        term2 = np.mean([np.linalg.norm(a - b) for a in x for b in x])
+        assert np.isclose(energy[i], term1 - term2 / 2)
+
+
+def test_sampled_energy_scores():
+    """Sampled estimates agree with a large reference and have lower variance."""
+    rng = np.random.default_rng(4)
+    proportions = rng.dirichlet([2, 5, 1, 1], size=(3, 30))
+    observed = np.array([[30, 50, 5, 15], [2, 1, 0, 0], [300, 200, 80, 20]])
+
+    references = np.array(
+        [
+            reference_energy_scores(proportions, observed, draws=100, rng=rng)
+            for _ in range(5)
+        ]
+    )
+    sampled = np.array(
+        [
+            estimate_energy_scores(proportions, observed, "sampled", 10, 5_000, rng)
+            for _ in range(20)
+        ]
+    )
+    reference = references.mean(axis=0)
+    assert np.allclose(sampled.mean(axis=0), reference, rtol=0.01)
+    # the sampled estimate is about as precise as the reference
+    assert np.all(sampled.std(axis=0) < 3 * references.std(axis=0) + 1e-3)
+
+    moment = estimate_energy_scores(proportions, observed, "moment", 0, 0, rng)
+    assert np.allclose(moment, reference, rtol=0.1)
+
+    # cells without observations are not scored
+    observed[1] = 0
+    energy = estimate_energy_scores(proportions, observed, "sampled", 5, 100, rng)
+    assert np.isnan(energy[1]) and not np.isnan(energy).all()
+
+
+def test_calc_energy_scores():
+    """Energy scores are returned for each location and target date."""
+    from datetime import date
+
+    target_dates = [date(2024, 10, 1), date(2024, 10, 2)]
+    scoring_inputs = pl.DataFrame(
+        {
+            "location": ["MA"] * 4,
+            "target_date": [d for d in target_dates for _ in range(2)],
+            "clade": ["24A", "other"] * 2,
+            "oracle_value": [3, 1, 0, 0],
+            "scored": [True] * 4,
+        }
+    )
+    samples = pl.DataFrame(
+        {
+            "location": ["MA"] * 8,
+            "target_date": [d for d in target_dates for _ in range(4)],
+            "clade": ["24A", "other"] * 4,
+            "output_type_id": ["s1", "s1", "s2", "s2"] * 2,
+            "value": [0.7, 0.3, 0.6, 0.4] * 2,
+        }
+    )
+    scores = calc_energy_scores(samples, scoring_inputs, seed=1)
+    assert scores.columns == ["location", "target_date", "scored", "energy"]
+    assert scores["energy"][0] > 0
+    assert scores["energy"][1] is None
+
+
+def test_summarize_benchmark():
+    """Benchmark summaries report errors and whether rankings match."""
+    results = pl.DataFrame(
+        {
+            "model_id": ["a", "a", "b", "b"] * 2,
+            "method": ["reference"] * 4 + ["moment"] * 4,
+            "cell": [0, 1] * 4,
+            "energy": [1.0, 2.0, 2.0, 3.0, 1.1, 2.2, 1.0, 1.0],
+            "seconds": [2.0] * 4 + [0.5] * 4,
+        }
+    )
+    summary = summarize_benchmark(results)
+    assert summary["method"].to_list() == ["reference", "moment"]
+    assert summary["same_ranking"].to_list() == [True, False]
+    assert summary["mean_abs_error"][0] == 0
+
+    # a single model always ranks the same
+    summary = summarize_benchmark(results.filter(model_id="a"))
+    assert summary["same_ranking"].all()
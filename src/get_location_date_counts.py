@@ -25,6 +25,9 @@ import click
 import polars as pl
 from cladetime import CladeTime, sequence  # type: ignore
 
+from metadata_store import MetadataStore
+from run_history import RunRecorder
+
 # Log to stdout
 logger = logging.getLogger(__name__)
 handler = logging.StreamHandler()
@@ -50,37 +53,72 @@ logger.setLevel(logging.INFO)
     default=Path(__file__).parents[1] / "auxiliary-data" / "unscored-location-dates",
     help="For testing only: Path object to the directory where the output file will be saved",
 )
-def main(nowcast_date: datetime, output_path: Path):
+@click.option(
+    "--metadata-store",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help="Read sequence metadata as of the round close from this metadata store (see metadata_store.py) instead of downloading it from Nextstrain.",
+)
+def main(nowcast_date: datetime, output_path: Path, metadata_store: Path | None):
     # Round closing time is 8 PM US/Eastern on the day the round closes
     round_close_time = nowcast_date.replace(hour=20, minute=0, second=0)
     round_close_time = round_close_time.replace(tzinfo=ZoneInfo("US/Eastern"))
     nowcast_date_str = nowcast_date.strftime("%Y-%m-%d")
 
     logger.info(f"Getting location/date counts for round {nowcast_date_str}")
-    location_date_df = get_location_date_counts(round_close_time)
-
-    output_file = output_path / f"{nowcast_date_str}.csv"
-    location_date_df.write_csv(output_file)
+    run_params = {
+        "nowcast_date": nowcast_date_str,
+        "round_close_time": round_close_time,
+        "metadata_store": metadata_store,
+    }
+    with RunRecorder("get_location_date_counts", params=run_params) as run:
+        with run.stage("get_location_date_counts"):
+            location_date_df = get_location_date_counts(
+                round_close_time, metadata_store
+            )
+        run.count("sequences_counted", location_date_df["count"].sum())
+        run.count("locations", location_date_df["location"].n_unique())
+
+        output_file = output_path / f"{nowcast_date_str}.csv"
+        with run.stage("write_csv"):
+            location_date_df.write_csv(output_file)
+        run.count("rows_written", location_date_df.height)
     logger.info(f"Location/date counts saved to {output_file}")
 
 
-def get_location_date_counts(round_close_time: datetime) -> pl.DataFrame:
+def get_location_date_counts(
+    round_close_time: datetime, metadata_store: Path | None = None
+) -> pl.DataFrame:
     """
     Return a Polars DataFrame with total clade counts by location and collection date.
     The DataFrame will have a column for each date 31 days prior to round close.
+
+    If metadata_store is provided, the sequence metadata as of round close is read from
+    that metadata store (see metadata_store.py) instead of from Nextstrain.
     """
 
     # CladeTime object expects a UTC datetime
     round_close_utc = round_close_time.astimezone(ZoneInfo("UTC"))
-    ct = CladeTime(sequence_as_of=round_close_utc)
 
-    # CladeTime objects provide a Polars LazyFrame reference to
-    # Nextstrain's SARS-CoV-2 Genbank sequence metadata.
-    sequence_metadata = ct.sequence_metadata
+    if metadata_store is None:
+        ct = CladeTime(sequence_as_of=round_close_utc)
 
-    # Apply the same filters we used to create the list of clade
-    # target data for the round (e.g., USA, human host)
-    filtered = sequence.filter_metadata(sequence_metadata)
+        # CladeTime objects provide a Polars LazyFrame reference to
+        # Nextstrain's SARS-CoV-2 Genbank sequence metadata.
+        sequence_metadata = ct.sequence_metadata
+
+        # Apply the same filters we used to create the list of clade
+        # target data for the round (e.g., USA, human host)
+        filtered = sequence.filter_metadata(sequence_metadata)
+    else:
+        store = MetadataStore(metadata_store)
+        logger.info(f"Reading sequence metadata from {store}")
+        filtered = store.get_filtered_metadata(round_close_utc)
+
+    # There are few distinct locations, so group and join on Categorical
+    # codes rather than strings
+    filtered = filtered.with_columns(pl.col("location").cast(pl.Categorical))
 
     # Create a LazyFrame with all combinations of states and the
     # dates we're interested in (in this case, 31 days prior to
@@ -102,14 +140,16 @@ def get_location_date_counts(round_close_time: datetime) -> pl.DataFrame:
     grouped_all = (
         dates_and_locations.join(grouped, on=["location", "date"], how="left")
         .fill_null(strategy="zero")
+        .with_columns(pl.col("location").cast(pl.String))
         .sort("location")
         .rename({"date": "target_date"})
     )
 
-    return grouped_all.collect()
+    with pl.StringCache():
+        return grouped_all.collect()
 
 
-def test_get_location_date_counts(monkeypatch):
+def test_get_location_date_counts(live, monkeypatch):
     """Run checks on location/date clade counts."""
 
     # Patch the CLADETIME_DEMO environment variable so the test will
@@ -133,6 +173,46 @@ def test_get_location_date_counts(monkeypatch):
     assert test_data.height == computed_counts["count"].sum()
 
 
+def test_get_location_date_counts_snapshot(cladetime_snapshot):
+    """Run checks on location/date clade counts using the CladeTime test snapshot."""
+    round_close_test_time = datetime(
+        2025, 10, 15, 20, 0, 0, tzinfo=ZoneInfo("US/Eastern")
+    )
+    computed_counts = get_location_date_counts(round_close_test_time)
+
+    end_date = round_close_test_time.date()
+    begin_date = end_date - timedelta(days=31)
+    test_data = (
+        sequence.filter_metadata(cladetime_snapshot().sequence_metadata)
+        .filter(pl.col("date").is_between(begin_date, end_date))
+        .collect()
+    )
+
+    assert set(computed_counts.columns) == {"location", "target_date", "count"}
+    assert computed_counts["count"].sum() == test_data.height
+    # one row for every location and each of the 32 dates
+    locations = computed_counts["location"].n_unique()
+    assert computed_counts.height == locations * 32
+    assert computed_counts["target_date"].min() == begin_date
+    assert computed_counts["target_date"].max() == end_date
+
+
+def test_get_location_date_counts_metadata_store(cladetime_snapshot, tmp_path):
+    """Counts from a metadata store match counts from CladeTime."""
+    round_close_test_time = datetime(
+        2025, 10, 15, 20, 0, 0, tzinfo=ZoneInfo("US/Eastern")
+    )
+    ct = cladetime_snapshot()
+    store = MetadataStore(tmp_path)
+    store.add_release(
+        round_close_test_time,
+        ct.url_sequence_metadata,
+        sequence.filter_metadata(ct.sequence_metadata),
+    )
+    computed_counts = get_location_date_counts(round_close_test_time, tmp_path)
+    assert computed_counts.equals(get_location_date_counts(round_close_test_time))
+
+
 if __name__ == "__main__":
     # Until there's a Python version of hubData, get the current round ID from the latest
     # .json file in auxiliary-data/modeled-clades
@@ -0,0 +1,506 @@
+"""
+Write a round's plot-ready summaries of observed clade proportions and model sample bands.
+
+plot_validation_data.R and plot_summary_graphs.R read the round's time series and every
+model's sample output for each figure, and compute observed proportions and sample
+quantiles as they plot. This script computes them once per round, after
+get_target_data.py has written the round's target data, and writes two small files:
+
+    <output-dir>/nowcast_date=YYYY-MM-DD/observed.parquet
+    <output-dir>/nowcast_date=YYYY-MM-DD/bands.parquet
+
+observed.parquet has a row per source, location, target date, and clade, with the
+observed count, the total count for the location and target date, the proportion, and a
+Wilson score binomial confidence interval (--confidence). Sources are:
+
+- nowcast: the time series as of the day before the nowcast date (the data available
+  when the round closed), if it exists
+- validation: the round's oracle output, if it exists
+
+As in the R plotting code, the proportion is 0 when a location and target date have no
+sequences; the confidence interval is null.
+
+bands.parquet has a row per model, location, target date, and clade, with the mean and
+median of the model's sample proportions and the lower and upper bounds of each central
+interval (--interval-range; lower_50, upper_50, ...). Quantiles use the same
+interpolation as R's default quantile type (type 7). Each model's samples are read once,
+and all of the quantiles are computed in one group_by. Models with no sample output are
+left out, as they are in the R plots.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/get_plot_summaries.py --nowcast-date=2025-06-25
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/get_plot_summaries.py
+"""
+
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from statistics import NormalDist
+
+import click
+import numpy as np
+import polars as pl
+
+from atomic_files import write_atomic
+from get_coverage import get_quantile_levels, read_samples, set_model_output_dir
+from get_target_data import set_target_data_dir
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+observed_schema = {
+    "source": pl.String,
+    "as_of": pl.Date,
+    "location": pl.String,
+    "target_date": pl.Date,
+    "clade": pl.String,
+    "observation": pl.Int64,
+    "total": pl.Int64,
+    "proportion": pl.Float64,
+    "lower": pl.Float64,
+    "upper": pl.Float64,
+}
+
+
+def read_observed(
+    nowcast_date: datetime, target_data_dir: Path
+) -> dict[str, pl.LazyFrame]:
+    """Return the round's observed counts (location, target_date, clade, observation, as_of), by source."""
+    nowcast_string = nowcast_date.strftime("%Y-%m-%d")
+    as_of_string = (nowcast_date - timedelta(days=1)).strftime("%Y-%m-%d")
+    paths = {
+        "nowcast": (
+            target_data_dir
+            / "time-series"
+            / f"as_of={as_of_string}"
+            / f"nowcast_date={nowcast_string}"
+            / "timeseries.parquet",
+            "observation",
+        ),
+        "validation": (
+            target_data_dir
+            / "oracle-output"
+            / f"nowcast_date={nowcast_string}"
+            / "oracle.parquet",
+            "oracle_value",
+        ),
+    }
+    observed = {}
+    for source, (path, count_column) in paths.items():
+        if not path.is_file():
+            logger.info(f"No {source} data for round {nowcast_string}: {path}")
+            continue
+        observed[source] = pl.scan_parquet(path, hive_partitioning=False).select(
+            "as_of",
+            "location",
+            "target_date",
+            "clade",
+            pl.col(count_column).alias("observation"),
+        )
+    return observed
+
+
+def summarize_observed(
+    observed: dict[str, pl.LazyFrame], confidence: float = 0.95
+) -> pl.DataFrame:
+    """
+    Return observed clade proportions and Wilson score confidence intervals.
+
+    The interval for x of n sequences, with z the normal quantile for the confidence
+    level, is
+
+        (x + z^2/2) / (n + z^2) +/- z / (n + z^2) * sqrt(x * (n - x) / n + z^2 / 4)
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    x = pl.col("observation")
+    n = pl.col("total")
+    center = (x + z**2 / 2) / (n + z**2)
+    half_width = z / (n + z**2) * (x * (n - x) / n + z**2 / 4).sqrt()
+    frames = [lf.with_columns(source=pl.lit(source)) for source, lf in observed.items()]
+    if not frames:
+        return pl.DataFrame(schema=observed_schema)
+    return (
+        pl.concat(frames)
+        .with_columns(
+            total=pl.col("observation").sum().over("source", "location", "target_date")
+        )
+        .with_columns(
+            proportion=pl.when(n > 0).then(x / n).otherwise(0.0),
+            lower=pl.when(n > 0).then((center - half_width).clip(lower_bound=0.0)),
+            upper=pl.when(n > 0).then((center + half_width).clip(upper_bound=1.0)),
+        )
+        .select(observed_schema.keys())
+        .cast(observed_schema)  # type: ignore
+        .sort("source", "location", "target_date", "clade")
+        .collect()
+    )
+
+
+def get_band_columns(interval_ranges: tuple[int, ...] | list[int]) -> list[str]:
+    """Return the names of the interval bound columns, from widest to narrowest."""
+    return [
+        f"{bound}_{interval_range}"
+        for interval_range in sorted(set(interval_ranges), reverse=True)
+        for bound in ["lower", "upper"]
+    ]
+
+
+def summarize_samples(
+    samples: pl.DataFrame, interval_ranges: tuple[int, ...] | list[int]
+) -> pl.DataFrame:
+    """
+    Return the mean, median, and central interval bounds of sample proportions.
+
+    There is a row for each location, target date, and clade in samples.
+    """
+    bounds = []
+    for interval_range in sorted(set(interval_ranges), reverse=True):
+        lower, upper = get_quantile_levels([interval_range])
+        bounds += [
+            pl.col("value")
+            .quantile(lower, interpolation="linear")
+            .alias(f"lower_{interval_range}"),
+            pl.col("value")
+            .quantile(upper, interpolation="linear")
+            .alias(f"upper_{interval_range}"),
+        ]
+    return (
+        samples.group_by("location", "target_date", "clade")
+        .agg(
+            pl.col("value").mean().alias("mean"),
+            pl.col("value").quantile(0.5, interpolation="linear").alias("median"),
+            *bounds,
+        )
+        .sort("location", "target_date", "clade")
+    )
+
+
+def summarize_model_output(
+    nowcast_date: datetime,
+    model_output_dir: Path,
+    interval_ranges: tuple[int, ...] | list[int],
+) -> pl.DataFrame:
+    """Return the sample bands of every model that submitted samples for the round."""
+    nowcast_string = nowcast_date.strftime("%Y-%m-%d")
+    band_columns = get_band_columns(interval_ranges)
+    schema = {
+        "model_id": pl.String,
+        "location": pl.String,
+        "target_date": pl.Date,
+        "clade": pl.String,
+        "mean": pl.Float64,
+        "median": pl.Float64,
+        **{column: pl.Float64 for column in band_columns},
+    }
+    bands = []
+    for model_output_file in sorted(
+        model_output_dir.glob(f"*/{nowcast_string}-*.parquet")
+    ):
+        model_id = model_output_file.parent.name
+        if model_output_file.name != f"{nowcast_string}-{model_id}.parquet":
+            continue
+        samples = read_samples(model_output_file)
+        if samples.is_empty():
+            logger.info(f"{model_id} has no sample output for round {nowcast_string}")
+            continue
+        bands.append(
+            summarize_samples(samples, interval_ranges).with_columns(
+                model_id=pl.lit(model_id)
+            )
+        )
+    if not bands:
+        return pl.DataFrame(schema=schema)
+    return pl.concat(bands).select(schema.keys()).cast(schema)  # type: ignore
+
+
+def set_output_dir(ctx, param, value):
+    """Set the output_dir default value to the hub's auxiliary-data/plot-summaries directory."""
+    if value is None:
+        value = hub_root / "auxiliary-data" / "plot-summaries"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=True,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--target-data-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_target_data_dir,
+    help="Directory that contains the round's time series and oracle output. Default is the hub's target-data directory.",
+)
+@click.option(
+    "--model-output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_output_dir,
+    help="Directory of model output submissions. Default is the hub's model-output directory.",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_output_dir,
+    help="Directory where the round's summaries are saved. Default is the hub's auxiliary-data/plot-summaries directory.",
+)
+@click.option(
+    "--interval-range",
+    type=click.IntRange(min=1, max=99),
+    multiple=True,
+    default=[50, 80, 95],
+    show_default=True,
+    help="Central interval of sample proportions (percent). Can be specified more than once.",
+)
+@click.option(
+    "--confidence",
+    type=click.FloatRange(min=0, max=1, min_open=True, max_open=True),
+    default=0.95,
+    show_default=True,
+    help="Confidence level of the binomial intervals of observed proportions.",
+)
+def main(
+    nowcast_date: datetime,
+    target_data_dir: Path,
+    model_output_dir: Path,
+    output_dir: Path,
+    interval_range: tuple[int, ...],
+    confidence: float,
+) -> tuple[Path, Path]:
+    nowcast_string = nowcast_date.strftime("%Y-%m-%d")
+    observed = read_observed(nowcast_date, target_data_dir)
+    if not observed:
+        raise click.ClickException(
+            f"No time series or oracle output for round {nowcast_string} in {target_data_dir}"
+        )
+    observed_summary = summarize_observed(observed, confidence)
+    bands = summarize_model_output(nowcast_date, model_output_dir, interval_range)
+
+    round_dir = output_dir / f"nowcast_date={nowcast_string}"
+    round_dir.mkdir(parents=True, exist_ok=True)
+    observed_path = round_dir / "observed.parquet"
+    bands_path = round_dir / "bands.parquet"
+    write_atomic(observed_path, lambda path: observed_summary.write_parquet(path))
+    write_atomic(bands_path, lambda path: bands.write_parquet(path))
+    logger.info(
+        f"Saved {observed_summary.height} observed rows ({', '.join(observed)}) "
+        f"and {bands.height} sample band rows ({bands['model_id'].n_unique()} models) "
+        f"to {round_dir}"
+    )
+    return observed_path, bands_path
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+def test_summarize_observed():
+    """Proportions and Wilson intervals are computed for each location and target date."""
+    observed = pl.LazyFrame(
+        {
+            "as_of": [datetime(2025, 1, 7).date()] * 4,
+            "location": ["MA", "MA", "TX", "TX"],
+            "target_date": [datetime(2025, 1, 1).date()] * 4,
+            "clade": ["24A", "other", "24A", "other"],
+            "observation": [3, 7, 0, 0],
+        }
+    )
+    result = summarize_observed({"nowcast": observed})
+    assert result.columns == list(observed_schema)
+    ma = result.filter(location="MA", clade="24A").row(0, named=True)
+    assert (ma["total"], ma["proportion"]) == (10, pytest.approx(0.3))
+    # Wilson 95% interval for 3 of 10
+    assert ma["lower"] == pytest.approx(0.1078, abs=1e-4)
+    assert ma["upper"] == pytest.approx(0.6032, abs=1e-4)
+    tx = result.filter(location="TX")
+    assert tx["proportion"].to_list() == [0.0, 0.0]
+    assert tx["lower"].is_null().all()
+
+    # intervals are wider at a higher confidence level
+    wider = summarize_observed({"nowcast": observed}, confidence=0.99)
+    assert wider.filter(location="MA", clade="24A")["lower"].item() < ma["lower"]
+
+
+def test_summarize_samples():
+    """Sample bands match R's default (type 7) quantiles."""
+    rng = np.random.default_rng(0)
+    values = rng.dirichlet([1, 2, 3], size=100)
+    samples = pl.DataFrame(
+        {
+            "location": "MA",
+            "target_date": datetime(2025, 1, 1).date(),
+            "clade": np.repeat([["24A", "24B", "other"]], 100, axis=0).ravel(),
+            "output_type_id": np.repeat([str(i) for i in range(100)], 3),
+            "value": values.ravel(),
+        }
+    )
+    bands = summarize_samples(samples, [95, 50])
+    assert bands.columns == [
+        "location",
+        "target_date",
+        "clade",
+        "mean",
+        "median",
+        "lower_95",
+        "upper_95",
+        "lower_50",
+        "upper_50",
+    ]
+    clade_b = bands.filter(clade="24B").row(0, named=True)
+    expected = np.quantile(values[:, 1], [0.025, 0.975, 0.25, 0.75, 0.5])
+    assert [
+        clade_b[column]
+        for column in ["lower_95", "upper_95", "lower_50", "upper_50", "median"]
+    ] == pytest.approx(expected)
+    assert clade_b["mean"] == pytest.approx(values[:, 1].mean())
+
+
+def test_main(tmp_path):
+    """The CLI writes a round's observed proportions and sample bands."""
+    nowcast_date = datetime(2025, 1, 8).date()
+    target_dates = [nowcast_date - timedelta(days=i) for i in range(3)]
+    clades = ["24A", "other"]
+    grid = pl.DataFrame(
+        [
+            (location, target_date, clade, i)
+            for i, (location, target_date, clade) in enumerate(
+                (location, target_date, clade)
+                for location in ["MA", "TX"]
+                for target_date in target_dates
+                for clade in clades
+            )
+        ],
+        schema=["location", "target_date", "clade", "observation"],
+        orient="row",
+    )
+    ts_dir = tmp_path / "time-series/as_of=2025-01-07/nowcast_date=2025-01-08"
+    ts_dir.mkdir(parents=True)
+    grid.with_columns(
+        nowcast_date=pl.lit(nowcast_date), as_of=pl.lit(datetime(2025, 1, 7).date())
+    ).write_parquet(ts_dir / "timeseries.parquet")
+
+    rng = np.random.default_rng(1)
+    for model_id, output_types in [
+        ("team-a", ["sample", "mean"]),
+        ("team-b", ["mean"]),
+    ]:
+        rows = []
+        for location in ["MA", "TX"]:
+            for target_date in target_dates:
+                for output_type in output_types:
+                    n = 100 if output_type == "sample" else 1
+                    values = rng.dirichlet([1, 1], size=n)
+                    for i in range(n):
+                        for clade, value in zip(clades, values[i]):
+                            rows.append(
+                                (
+                                    nowcast_date,
+                                    target_date,
+                                    clade,
+                                    location,
+                                    output_type,
+                                    (
+                                        f"{location}{i}"
+                                        if output_type == "sample"
+                                        else None
+                                    ),
+                                    value,
+                                )
+                            )
+        model_dir = tmp_path / "model-output" / model_id
+        model_dir.mkdir(parents=True)
+        pl.DataFrame(
+            rows,
+            schema=[
+                "nowcast_date",
+                "target_date",
+                "clade",
+                "location",
+                "output_type",
+                "output_type_id",
+                "value",
+            ],
+            orient="row",
+        ).write_parquet(model_dir / f"2025-01-08-{model_id}.parquet")
+
+    observed_path, bands_path = main(
+        [
+            "--nowcast-date",
+            "2025-01-08",
+            "--target-data-dir",
+            str(tmp_path),
+            "--model-output-dir",
+            str(tmp_path / "model-output"),
+            "--output-dir",
+            str(tmp_path / "plot-summaries"),
+        ],
+        standalone_mode=False,
+    )
+    assert observed_path.parent.name == "nowcast_date=2025-01-08"
+
+    # only the time series exists; its proportions sum to 1 at each location and date
+    observed = pl.read_parquet(observed_path, hive_partitioning=False)
+    assert observed.height == grid.height
+    assert observed["source"].unique().to_list() == ["nowcast"]
+    assert observed.group_by("location", "target_date").agg(pl.sum("proportion"))[
+        "proportion"
+    ].to_list() == pytest.approx([1.0] * 6)
+
+    # team-b has no samples, so it has no bands
+    bands = pl.read_parquet(bands_path, hive_partitioning=False)
+    assert bands["model_id"].unique().to_list() == ["team-a"]
+    assert bands.height == 2 * 3 * 2
+    assert bands.columns[-6:] == [
+        "lower_95",
+        "upper_95",
+        "lower_80",
+        "upper_80",
+        "lower_50",
+        "upper_50",
+    ]
+    assert (
+        bands.select(
+            (pl.col("lower_95") <= pl.col("lower_50"))
+            & (pl.col("lower_50") <= pl.col("median"))
+            & (pl.col("median") <= pl.col("upper_50"))
+            & (pl.col("upper_50") <= pl.col("upper_95"))
+        )
+        .to_series()
+        .all()
+    )
+
+    with pytest.raises(click.ClickException, match="No time series or oracle output"):
+        main(
+            ["--nowcast-date", "2025-01-15", "--target-data-dir", str(tmp_path)],
+            standalone_mode=False,
+        )
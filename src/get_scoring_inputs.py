@@ -0,0 +1,400 @@
+"""
+Create a per-round bundle of the target data used to score nowcasts.
+
+Scoring a round's submissions requires the round's oracle output, limited to
+target dates in the 31 days before the nowcast date, joined to the round's
+unscored-location-dates file to determine which location/target_date pairs count
+toward the hub's evaluation (a pair is scored when no sequences for it were
+available at the submission deadline). Rather than re-deriving this for every
+model, this script does it once per round and saves a small parquet file that is
+sorted by location, target_date, and clade (the order used when scoring):
+
+    <target-data-dir>/scoring-inputs/nowcast_date=<round_id>/scoring_inputs.parquet
+
+The unscored-location-dates files for the hub's earliest rounds use full state
+names (e.g., "Alabama"); these are converted to the two-letter abbreviations used
+by the oracle output.
+
+The script is run after get_target_data.py. If --nowcast-date is not specified,
+scoring inputs are created for every round in the oracle output directory.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/get_scoring_inputs.py --nowcast-date=2024-10-09
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/get_scoring_inputs.py
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import click
+import polars as pl
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+from atomic_files import write_atomic
+from get_target_data import set_target_data_dir, state_list
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+# full location names used by early unscored-location-dates files
+state_names = {
+    "Alabama": "AL",
+    "Alaska": "AK",
+    "Arizona": "AZ",
+    "Arkansas": "AR",
+    "California": "CA",
+    "Colorado": "CO",
+    "Connecticut": "CT",
+    "Delaware": "DE",
+    "District of Columbia": "DC",
+    "Washington DC": "DC",
+    "Florida": "FL",
+    "Georgia": "GA",
+    "Hawaii": "HI",
+    "Idaho": "ID",
+    "Illinois": "IL",
+    "Indiana": "IN",
+    "Iowa": "IA",
+    "Kansas": "KS",
+    "Kentucky": "KY",
+    "Louisiana": "LA",
+    "Maine": "ME",
+    "Maryland": "MD",
+    "Massachusetts": "MA",
+    "Michigan": "MI",
+    "Minnesota": "MN",
+    "Mississippi": "MS",
+    "Missouri": "MO",
+    "Montana": "MT",
+    "Nebraska": "NE",
+    "Nevada": "NV",
+    "New Hampshire": "NH",
+    "New Jersey": "NJ",
+    "New Mexico": "NM",
+    "New York": "NY",
+    "North Carolina": "NC",
+    "North Dakota": "ND",
+    "Ohio": "OH",
+    "Oklahoma": "OK",
+    "Oregon": "OR",
+    "Pennsylvania": "PA",
+    "Puerto Rico": "PR",
+    "Rhode Island": "RI",
+    "South Carolina": "SC",
+    "South Dakota": "SD",
+    "Tennessee": "TN",
+    "Texas": "TX",
+    "Utah": "UT",
+    "Vermont": "VT",
+    "Virginia": "VA",
+    "Washington": "WA",
+    "West Virginia": "WV",
+    "Wisconsin": "WI",
+    "Wyoming": "WY",
+}
+
+scoring_inputs_schema = pa.schema(
+    [
+        ("location", pa.string()),
+        ("target_date", pa.date32()),
+        ("clade", pa.string()),
+        ("oracle_value", pa.int64()),
+        ("scored", pa.bool_()),
+        ("nowcast_date", pa.date32()),
+        ("as_of", pa.date32()),
+    ]
+)
+
+
+def set_unscored_dir(ctx, param, value):
+    """Set the unscored_dir default value to the hub's unscored-location-dates directory."""
+    if value is None:
+        value = Path(__file__).parents[1] / "auxiliary-data" / "unscored-location-dates"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD). Default is every round with oracle output.",
+)
+@click.option(
+    "--target-data-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_target_data_dir,
+    help=(
+        "Path object to the directory that contains oracle output and where scoring inputs will be saved. "
+        "Default is the hub's target-data directory. Specify '.' to use the current working directory."
+    ),
+)
+@click.option(
+    "--unscored-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_unscored_dir,
+    help="Directory of unscored-location-dates files. Default is the hub's auxiliary-data/unscored-location-dates.",
+)
+def main(
+    nowcast_date: datetime | None, target_data_dir: Path, unscored_dir: Path
+) -> list[Path]:
+    oracle_dir = target_data_dir / "oracle-output"
+    if nowcast_date is None:
+        nowcast_strings = sorted(
+            path.name.split("=")[1] for path in oracle_dir.glob("nowcast_date=*")
+        )
+    else:
+        nowcast_strings = [nowcast_date.strftime("%Y-%m-%d")]
+
+    output_files = []
+    for nowcast_string in nowcast_strings:
+        oracle_path = oracle_dir / f"nowcast_date={nowcast_string}" / "oracle.parquet"
+        unscored_path = unscored_dir / f"{nowcast_string}.csv"
+        if not oracle_path.is_file() or not unscored_path.is_file():
+            logger.info(
+                f"Skipping {nowcast_string}: oracle output or unscored-location-dates file not found"
+            )
+            continue
+
+        scoring_inputs = create_scoring_inputs(
+            pl.scan_parquet(oracle_path, hive_partitioning=False),
+            read_unscored_location_dates(unscored_path),
+            date.fromisoformat(nowcast_string),
+        )
+        output_files.append(
+            write_scoring_inputs(nowcast_string, scoring_inputs, target_data_dir)
+        )
+
+    return output_files
+
+
+def read_unscored_location_dates(unscored_path: Path) -> pl.LazyFrame:
+    """
+    Return an unscored-location-dates file, with full state names converted to
+    the abbreviations used in the hub's target data.
+    """
+    return pl.scan_csv(
+        unscored_path,
+        schema={"target_date": pl.Date, "location": pl.String, "count": pl.Int64},
+    ).with_columns(pl.col("location").replace(state_names))
+
+
+def create_scoring_inputs(
+    oracle: pl.LazyFrame, unscored: pl.LazyFrame, nowcast_date: date
+) -> pl.LazyFrame:
+    """
+    Return oracle output for the dates scored in a round, with a column that
+    indicates whether each location/target_date pair is scored.
+
+    Pairs with sequences available at the submission deadline (count > 0 in
+    the unscored-location-dates file) are not scored. Pairs that aren't in the
+    unscored-location-dates file (i.e., target dates after the nowcast date)
+    are scored.
+    """
+    scored = unscored.select(
+        "location", "target_date", scored=pl.col("count") == 0
+    ).unique(["location", "target_date"], keep="first")
+
+    return (
+        oracle.filter(pl.col("target_date") > nowcast_date - timedelta(days=32))
+        .filter(pl.col("location").is_in(state_list))
+        .join(scored, on=["location", "target_date"], how="left")
+        .with_columns(pl.col("scored").fill_null(True))
+        .select(scoring_inputs_schema.names)
+        .sort("location", "target_date", "clade")
+    )
+
+
+def write_scoring_inputs(
+    nowcast_string: str, scoring_inputs: pl.LazyFrame, target_data_dir: Path
+) -> Path:
+    """Write a round's scoring inputs to the scoring-inputs directory."""
+    output_path = target_data_dir / "scoring-inputs" / f"nowcast_date={nowcast_string}"
+    output_path.mkdir(exist_ok=True, parents=True)
+    output_path = output_path / "scoring_inputs.parquet"
+
+    scoring_inputs_arrow = (
+        scoring_inputs.collect().to_arrow().cast(scoring_inputs_schema)
+    )
+    write_atomic(
+        output_path,
+        lambda path: pq.write_table(
+            scoring_inputs_arrow,
+            path,
+            use_dictionary=["location", "clade"],
+            compression="zstd",
+        ),
+    )
+    logger.info(f"Scoring inputs saved to {output_path}")
+
+    return output_path
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_read_unscored_location_dates(tmp_path):
+    """Full state names in unscored-location-dates files are abbreviated."""
+    unscored_path = tmp_path / "2024-10-02.csv"
+    unscored_path.write_text(
+        "target_date,location,count\n"
+        "2024-09-01,Alabama,0\n"
+        "2024-09-01,Washington DC,3\n"
+        "2024-09-01,MA,1\n"
+    )
+    unscored = read_unscored_location_dates(unscored_path).collect()
+    assert unscored["location"].to_list() == ["AL", "DC", "MA"]
+    assert unscored.schema["target_date"] == pl.Date
+
+
+def test_create_scoring_inputs():
+    """Scoring inputs are filtered, flagged, and sorted."""
+    nowcast_date = date(2024, 10, 9)
+    target_dates = [nowcast_date - timedelta(days=d) for d in [32, 31, 1]] + [
+        nowcast_date + timedelta(days=1)
+    ]
+    oracle = pl.LazyFrame(
+        {
+            "location": ["PA", "MA"] * 8,
+            "target_date": [d for d in target_dates for _ in range(4)],
+            "clade": ["BB", "BB", "AA", "AA"] * 4,
+            "oracle_value": range(16),
+            "nowcast_date": [nowcast_date] * 16,
+            "as_of": [date(2025, 1, 7)] * 16,
+        }
+    )
+    unscored = pl.LazyFrame(
+        {
+            "target_date": [target_dates[1], target_dates[1], target_dates[2]],
+            "location": ["MA", "PA", "MA"],
+            "count": [2, 0, 1],
+        }
+    )
+
+    scoring_inputs = create_scoring_inputs(oracle, unscored, nowcast_date).collect()
+    assert scoring_inputs.columns == scoring_inputs_schema.names
+
+    # target dates before nowcast_date - 31 days are excluded
+    assert scoring_inputs["target_date"].min() == target_dates[1]
+    assert scoring_inputs.height == 12
+
+    # sorted by location, target_date, clade
+    assert scoring_inputs.equals(
+        scoring_inputs.sort("location", "target_date", "clade")
+    )
+    assert scoring_inputs["clade"].to_list()[:2] == ["AA", "BB"]
+
+    scored = dict(
+        scoring_inputs.select(
+            pl.concat_str("location", pl.col("target_date").cast(pl.String)), "scored"
+        ).iter_rows()
+    )
+    assert scored[f"MA{target_dates[1]}"] is False
+    assert scored[f"PA{target_dates[1]}"] is True
+    assert scored[f"MA{target_dates[2]}"] is False
+    # not in the unscored-location-dates file
+    assert scored[f"PA{target_dates[2]}"] is True
+    assert scored[f"MA{target_dates[3]}"] is True
+
+
+def test_scoring_inputs_cli(tmp_path):
+    """The CLI creates scoring inputs for hub rounds."""
+    from click.testing import CliRunner
+
+    hub_root = Path(__file__).parents[1]
+    nowcast_strings = ["2024-10-02", "2024-10-09"]
+    for nowcast_string in nowcast_strings:
+        oracle_dir = tmp_path / "oracle-output" / f"nowcast_date={nowcast_string}"
+        oracle_dir.mkdir(parents=True)
+        (oracle_dir / "oracle.parquet").write_bytes(
+            (
+                hub_root
+                / "target-data"
+                / "oracle-output"
+                / f"nowcast_date={nowcast_string}"
+                / "oracle.parquet"
+            ).read_bytes()
+        )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ["--target-data-dir", str(tmp_path)],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert [path.parent.name for path in result.return_value] == [
+        f"nowcast_date={nowcast_string}" for nowcast_string in nowcast_strings
+    ]
+
+    for nowcast_string, output_file in zip(nowcast_strings, result.return_value):
+        scoring_inputs = pq.read_table(output_file, memory_map=True, partitioning=None)
+        assert scoring_inputs.schema == scoring_inputs_schema
+        scoring_inputs = pl.from_arrow(scoring_inputs)
+        assert set(scoring_inputs["location"].unique()) == set(state_list)
+        # some locations had sequences before the submission deadline
+        assert not scoring_inputs["scored"].all()
+
+        # the 2024-10-02 unscored-location-dates file uses full state names
+        # (e.g., "Alabama"), and the 2024-10-09 file uses abbreviations; either
+        # way, location/date pairs with sequences before the deadline aren't scored
+        unscored = pl.read_csv(
+            hub_root
+            / "auxiliary-data"
+            / "unscored-location-dates"
+            / f"{nowcast_string}.csv",
+            schema={"target_date": pl.Date, "location": pl.String, "count": pl.Int64},
+        )
+        if nowcast_string == "2024-10-02":
+            assert set(unscored["location"]) <= set(state_names)
+            unscored = unscored.with_columns(
+                location=pl.col("location").map_elements(
+                    state_names.get, return_dtype=pl.String
+                )
+            )
+            assert set(unscored["location"]) == set(state_list)
+        else:
+            assert set(unscored["location"]) <= set(state_list)
+        with_sequences = unscored.filter(pl.col("count") > 0).select(
+            "location", "target_date"
+        )
+        assert with_sequences.height > 0
+        not_scored = (
+            scoring_inputs.filter(~pl.col("scored"))
+            .select("location", "target_date")
+            .unique()
+        )
+        assert not_scored.sort("location", "target_date").equals(
+            with_sequences.filter(
+                pl.col("target_date")
+                > date.fromisoformat(nowcast_string) - timedelta(days=32)
+            ).sort("location", "target_date")
+        )
@@ -18,7 +18,11 @@ To run the included tests manually (from the root of the repo):
 uv run --with-requirements src/requirements.txt --module pytest src/get_target_data.py
 """
 
+import hashlib
 import json
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import logging
 import sys
@@ -27,6 +31,7 @@ from datetime import date, datetime, timedelta, timezone
 import click
 import polars as pl
 import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
 import pyarrow.dataset as ds  # type: ignore
 import pyarrow.parquet as pq  # type: ignore
 from click.testing import CliRunner
@@ -34,6 +39,11 @@ from click import Context, Option
 
 from cladetime import Clade, CladeTime, sequence  # type: ignore
 
+from atomic_files import read_checkpoint, sink_parquet_atomic, write_atomic
+from location_registry import LocationRegistry
+from metadata_store import MetadataStore
+from run_history import RunRecorder
+
 # Log to stdout
 logger = logging.getLogger(__name__)
 handler = logging.StreamHandler()
@@ -44,61 +54,59 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# the hub's locations and the geographies they aggregate to (see hub-config/locations.json)
+location_registry = LocationRegistry.from_file()
+
 # valid locations for variant-nowcast-hub (50 states + DC and PR)
-state_list = [
-    "AL",
-    "AK",
-    "AZ",
-    "AR",
-    "CA",
-    "CO",
-    "CT",
-    "DE",
-    "DC",
-    "FL",
-    "GA",
-    "HI",
-    "ID",
-    "IL",
-    "IN",
-    "IA",
-    "KS",
-    "KY",
-    "LA",
-    "ME",
-    "MD",
-    "MA",
-    "MI",
-    "MN",
-    "MS",
-    "MO",
-    "MT",
-    "NE",
-    "NV",
-    "NH",
-    "NJ",
-    "NM",
-    "NY",
-    "NC",
-    "ND",
-    "OH",
-    "OK",
-    "OR",
-    "PA",
-    "RI",
-    "SC",
-    "SD",
-    "TN",
-    "TX",
-    "UT",
-    "VT",
-    "VA",
-    "WA",
-    "WV",
-    "WI",
-    "WY",
-    "PR",
-]
+state_list = location_registry.target_locations
+
+# fixed encoding for the location column: the hub's location list is small and
+# known ahead of time, so group_bys and joins can work on integer codes instead
+# of strings
+location_enum = pl.Enum(state_list)
+
+# most rows of the dense location/date/clade grid that create_target_data builds at
+# once; each row of the grid takes about 120 bytes while the target data is written
+target_data_chunk_rows = 1024 * 1024
+
+# schemas of the time series and oracle output files written by write_target_data
+ts_schema = pa.schema(
+    [
+        ("target_date", pa.date32()),
+        ("location", pa.string()),
+        ("clade", pa.string()),
+        ("observation", pa.int64()),
+        ("nowcast_date", pa.date32()),
+        ("as_of", pa.date32()),
+    ]
+)
+oracle_schema = pa.schema(
+    [
+        ("location", pa.string()),
+        ("target_date", pa.date32()),
+        ("clade", pa.string()),
+        ("oracle_value", pa.int64()),
+        ("nowcast_date", pa.date32()),
+        ("as_of", pa.date32()),
+    ]
+)
+
+# schema of the rollup files written by write_rollups (see create_rollups)
+rollup_schema = pa.schema(
+    [
+        ("geography", pa.string()),
+        ("location", pa.string()),
+        ("interval", pa.string()),
+        ("target_date", pa.date32()),
+        ("days", pa.int32()),
+        ("clade", pa.string()),
+        ("observation", pa.int64()),
+        ("total", pa.int64()),
+        ("proportion", pa.float64()),
+        ("nowcast_date", pa.date32()),
+        ("as_of", pa.date32()),
+    ]
+)
 
 
 def normalize_date(ctx, param, value):
@@ -138,6 +146,16 @@ def set_target_data_dir(ctx, param, value):
     return value
 
 
+def set_work_dir(ctx, param, value):
+    """Set the work_dir default value to a folder in the system's temp directory."""
+    if value is None:
+        value = Path(tempfile.gettempdir()) / "variant-nowcast-hub" / "get_target_data"
+    else:
+        value = Path(value)
+
+    return value
+
+
 @click.command()
 @click.option(
     "--nowcast-date",
@@ -188,6 +206,55 @@ def set_target_data_dir(ctx, param, value):
         "Specify '.' to save target data to the current working directory."
     ),
 )
+@click.option(
+    "--work-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_work_dir,
+    help=(
+        "Directory for intermediate checkpoints. A re-run with the same parameters resumes from the last "
+        "completed stage. Default is a variant-nowcast-hub folder in the system's temp directory."
+    ),
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    required=False,
+    default=1,
+    help=(
+        "Number of worker processes used for clade assignment. Values greater than 1 split the sequences "
+        "into shards that are assigned in parallel. Default is 1 (no sharding)."
+    ),
+)
+@click.option(
+    "--shard-by",
+    type=click.Choice(["date", "strain"]),
+    required=False,
+    default="date",
+    help=(
+        "How to split sequences into shards when --workers is greater than 1: by collection date range "
+        "(shards have similar sequence counts) or by a hash of the strain name. Default is date."
+    ),
+)
+@click.option(
+    "--metadata-store",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help=(
+        "Read sequence metadata as of --sequence-as-of from this metadata store (see metadata_store.py) "
+        "instead of downloading it from Nextstrain. Default is to download it."
+    ),
+)
+@click.option(
+    "--rollups/--no-rollups",
+    default=False,
+    help=(
+        "Also write national, HHS region, and epiweek totals and clade proportions to a rollups folder "
+        "beside time-series. Default is --no-rollups."
+    ),
+)
 def main(
     nowcast_date: datetime,
     sequence_as_of: datetime,
@@ -195,6 +262,11 @@ def main(
     collection_min_date: datetime,
     collection_max_date: datetime,
     target_data_dir: Path,
+    work_dir: Path,
+    workers: int,
+    shard_by: str,
+    metadata_store: Path | None,
+    rollups: bool,
 ) -> tuple[Path, Path]:
     # Date for retrieving sequences cannot be in the future
     if sequence_as_of > datetime.now(tz=timezone.utc):
@@ -243,39 +315,137 @@ def main(
     logger.info(f"collection_max_date: {collection_max_date}")
     print("--------------------------------------------------")
 
-    assignments = assign_clades(
+    checkpoint_dir = get_checkpoint_dir(
+        work_dir,
         nowcast_date,
         sequence_as_of,
         tree_as_of,
         collection_min_date,
         collection_max_date,
     )
-    target_data = create_target_data(
-        assignments,
-        clade_list,
-        nowcast_string,
-        sequence_as_of.strftime("%Y-%m-%d"),
-        collection_min_date,
-        collection_max_date,
-    )
+    logger.info(f"Checkpoint directory: {checkpoint_dir}")
+
+    run_params = {
+        "nowcast_date": nowcast_string,
+        "sequence_as_of": sequence_as_of,
+        "tree_as_of": tree_as_of,
+        "collection_min_date": collection_min_date,
+        "collection_max_date": collection_max_date,
+        "workers": workers,
+        "shard_by": shard_by,
+        "metadata_store": metadata_store,
+        "rollups": rollups,
+    }
+    with RunRecorder("get_target_data", params=run_params) as run:
+        with run.stage("assign_clades"):
+            assignments = assign_clades(
+                nowcast_date,
+                sequence_as_of,
+                tree_as_of,
+                collection_min_date,
+                collection_max_date,
+                checkpoint_dir,
+                workers,
+                shard_by,
+                metadata_store,
+            )
+        run.count("sequences_to_assign", assignments.meta.get("sequences_to_assign"))
+        run.count("sequences_assigned", assignments.meta.get("sequences_assigned"))
+
+        with run.stage("create_target_data"):
+            target_data = create_target_data(
+                assignments,
+                clade_list,
+                nowcast_string,
+                sequence_as_of.strftime("%Y-%m-%d"),
+                collection_min_date,
+                collection_max_date,
+            )
 
-    output_files = write_target_data(
-        nowcast_string,
-        sequence_as_of.strftime("%Y-%m-%d"),
-        target_data,
-        target_data_dir,
-    )
+        with run.stage("write_target_data"):
+            output_files = write_target_data(
+                nowcast_string,
+                sequence_as_of.strftime("%Y-%m-%d"),
+                target_data,
+                target_data_dir,
+            )
+        run.count("partitions_written", len(output_files))
+        run.count("time_series_rows", pq.read_metadata(output_files[0]).num_rows)
+        run.count("oracle_rows", pq.read_metadata(output_files[1]).num_rows)
+
+        if rollups:
+            with run.stage("write_rollups"):
+                rollup_files = write_rollups(
+                    nowcast_string,
+                    sequence_as_of.strftime("%Y-%m-%d"),
+                    create_rollups(target_data[0]),
+                    target_data_dir,
+                )
+            run.count(
+                "rollup_rows",
+                sum(pq.read_metadata(path).num_rows for path in rollup_files),
+            )
 
     return output_files
 
 
+def get_filtered_metadata(
+    ct: CladeTime,
+    sequence_as_of: datetime,
+    collection_min_date: datetime,
+    collection_max_date: datetime,
+    metadata_store: Path | None = None,
+) -> pl.LazyFrame:
+    """
+    Return the filtered sequence metadata in the collection date window.
+
+    The metadata is read from metadata_store if provided, or otherwise from the
+    Nextstrain metadata file of the CladeTime object.
+    """
+    if metadata_store is None:
+        return sequence.filter_metadata(
+            ct.sequence_metadata,
+            collection_min_date=collection_min_date,
+            collection_max_date=collection_max_date,
+        )
+
+    store = MetadataStore(metadata_store)
+    logger.info(f"Reading sequence metadata from {store}")
+    return store.get_filtered_metadata(
+        sequence_as_of, collection_min_date, collection_max_date
+    )
+
+
 def assign_clades(
     nowcast_date: datetime,
     sequence_as_of: datetime,
     tree_as_of: datetime,
     collection_min_date: datetime,
     collection_max_date: datetime,
+    checkpoint_dir: Path | None = None,
+    workers: int = 1,
+    shard_by: str = "date",
+    metadata_store: Path | None = None,
 ) -> Clade:
+    """
+    Return clade assignments for sequences in the collection date window.
+
+    If checkpoint_dir is provided, the filtered sequence metadata, clade
+    assignments, and clade summary are saved there as each stage completes,
+    and any stages already saved by a previous run are re-used.
+
+    If workers is greater than 1, the sequences are split into that many
+    shards, which are assigned in parallel (see assign_clades_sharded).
+
+    If metadata_store is provided, the sequence metadata as of sequence_as_of is read
+    from that metadata store (see metadata_store.py) instead of from Nextstrain.
+    """
+    if checkpoint_dir is not None:
+        assignments = read_clade_checkpoint(checkpoint_dir)
+        if assignments is not None:
+            logger.info(f"Resuming from clade assignments saved in {checkpoint_dir}")
+            return assignments
+
     # Instantiate CladeTime object
     ct = CladeTime(sequence_as_of=sequence_as_of, tree_as_of=tree_as_of)
     logger.info(
@@ -289,18 +459,267 @@ def assign_clades(
         }
     )
 
-    filtered_metadata = sequence.filter_metadata(
-        ct.sequence_metadata,
-        collection_min_date=collection_min_date,
-        collection_max_date=collection_max_date,
-    )
-
-    assignments = ct.assign_clades(filtered_metadata)
+    if checkpoint_dir is None:
+        filtered_metadata = get_filtered_metadata(
+            ct,
+            sequence_as_of,
+            collection_min_date,
+            collection_max_date,
+            metadata_store,
+        )
+    else:
+        filtered_path = checkpoint_dir / "filtered_metadata.parquet"
+        if filtered_path.is_file():
+            logger.info(f"Resuming from filtered metadata saved in {filtered_path}")
+        else:
+            filtered_metadata = get_filtered_metadata(
+                ct,
+                sequence_as_of,
+                collection_min_date,
+                collection_max_date,
+                metadata_store,
+            )
+            write_atomic(filtered_path, filtered_metadata.sink_parquet)
+        filtered_metadata = read_checkpoint(filtered_path)
+
+    if workers > 1:
+        with tempfile.TemporaryDirectory(dir=checkpoint_dir) as shard_dir:
+            assignments = assign_clades_sharded(
+                filtered_metadata,
+                sequence_as_of,
+                tree_as_of,
+                workers,
+                shard_by,
+                Path(shard_dir),
+            )
+            if checkpoint_dir is None:
+                # shard files are removed with shard_dir, so load the results
+                assignments = Clade(
+                    meta=assignments.meta,
+                    detail=assignments.detail.collect().lazy(),
+                    summary=assignments.summary.collect().lazy(),
+                )
+            else:
+                write_clade_checkpoint(checkpoint_dir, assignments)
+    else:
+        assignments = ct.assign_clades(filtered_metadata)
+        if checkpoint_dir is not None:
+            write_clade_checkpoint(checkpoint_dir, assignments)
     logger.info("Clade assignments complete")
 
+    if checkpoint_dir is not None:
+        assignments = read_clade_checkpoint(checkpoint_dir)  # type: ignore
+
     return assignments
 
 
+def assign_clades_sharded(
+    filtered_metadata: pl.LazyFrame,
+    sequence_as_of: datetime,
+    tree_as_of: datetime,
+    workers: int,
+    shard_by: str,
+    shard_dir: Path,
+) -> Clade:
+    """
+    Assign clades to shards of filtered_metadata in parallel worker processes.
+
+    Every worker uses a CladeTime object with the same sequence_as_of and
+    tree_as_of dates, so all shards are assigned against the same reference
+    tree. Shards are disjoint sets of sequences, so merging the per-shard
+    summaries gives the same clade counts as a single assign_clades call.
+
+    Each worker retrieves the sequences in its own shard from the Nextstrain
+    sequence file, so sharding pays off when Nextclade assignment (rather than
+    the sequence download) dominates the run time. The returned Clade's
+    LazyFrames reference parquet files in shard_dir.
+    """
+    shards = shard_metadata(filtered_metadata, workers, shard_by)
+    if not shards:
+        # match CladeTime.assign_clades when there are no sequences to assign
+        return Clade(meta={}, detail=pl.LazyFrame(), summary=pl.LazyFrame())
+
+    shard_paths = []
+    for i, shard in enumerate(shards):
+        shard_path = shard_dir / f"shard_{i}.parquet"
+        shard.write_parquet(shard_path)
+        shard_paths.append(shard_path)
+        logger.info(f"Shard {i}: {shard.height} sequences")
+
+    # Polars is multithreaded, so start workers with spawn rather than fork
+    # https://docs.pola.rs/user-guide/misc/multiprocessing/
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        results = list(
+            executor.map(
+                assign_shard,
+                shard_paths,
+                [sequence_as_of] * len(shard_paths),
+                [tree_as_of] * len(shard_paths),
+            )
+        )
+
+    shard_assignments = [
+        Clade(
+            meta=meta,
+            detail=pl.scan_parquet(detail_path),
+            summary=pl.scan_parquet(summary_path),
+        )
+        for meta, detail_path, summary_path in results
+    ]
+
+    return merge_clade_assignments(shard_assignments)
+
+
+def shard_metadata(
+    filtered_metadata: pl.LazyFrame, shards: int, shard_by: str = "date"
+) -> list[pl.DataFrame]:
+    """
+    Split sequence metadata into disjoint, non-empty shards.
+
+    shard_by="date" creates contiguous collection date ranges with similar
+    sequence counts (all sequences for a date are in the same shard).
+    shard_by="strain" assigns sequences to shards by a hash of the strain name.
+    """
+    metadata = filtered_metadata.collect()
+
+    if shard_by == "strain":
+        shard = pl.col("strain").hash() % shards
+    elif shard_by == "date":
+        date_shards = (
+            metadata.group_by("date")
+            .len()
+            .sort("date")
+            .select(
+                "date",
+                # number of sequences collected before each date, scaled to the
+                # number of shards
+                shard=(pl.col("len").cum_sum() - pl.col("len"))
+                * shards
+                // pl.col("len").sum(),
+            )
+        )
+        shard = pl.col("date").replace_strict(
+            date_shards["date"], date_shards["shard"], default=0
+        )
+    else:
+        raise ValueError(f"Invalid shard_by value: {shard_by}")
+
+    sharded = metadata.with_columns(shard.alias("shard"))
+    return [
+        df.drop("shard")
+        for df in sharded.partition_by("shard", maintain_order=True)
+        if df.height > 0
+    ]
+
+
+def assign_shard(
+    shard_path: Path, sequence_as_of: datetime, tree_as_of: datetime
+) -> tuple[dict, Path, Path]:
+    """
+    Assign clades to one shard of sequence metadata (runs in a worker process).
+
+    Returns the Clade metadata and the paths of the saved detail and summary.
+    """
+    ct = CladeTime(sequence_as_of=sequence_as_of, tree_as_of=tree_as_of)
+    # each worker needs its own Nextclade output file
+    assignments = ct.assign_clades(
+        pl.scan_parquet(shard_path), output_file=shard_path.with_suffix(".tsv")
+    )
+
+    detail_path = shard_path.with_name(f"{shard_path.stem}_assignments.parquet")
+    summary_path = shard_path.with_name(f"{shard_path.stem}_summary.parquet")
+    assignments.detail.sink_parquet(detail_path)
+    assignments.summary.sink_parquet(summary_path)
+
+    return assignments.meta, detail_path, summary_path
+
+
+def merge_clade_assignments(shard_assignments: list[Clade]) -> Clade:
+    """Combine Clade objects for disjoint sets of sequences into a single Clade."""
+    summary = pl.concat([clade.summary for clade in shard_assignments])
+    group_by = [col for col in summary.collect_schema().names() if col != "count"]
+    summary = summary.group_by(group_by, maintain_order=True).agg(
+        pl.col("count").sum().cast(pl.UInt32)
+    )
+
+    detail = pl.concat([clade.detail for clade in shard_assignments])
+
+    meta = dict(shard_assignments[0].meta)
+    for count in ["sequences_to_assign", "sequences_assigned"]:
+        if count in meta:
+            meta[count] = sum(clade.meta[count] for clade in shard_assignments)
+
+    return Clade(meta=meta, detail=detail, summary=summary)
+
+
+def get_checkpoint_dir(
+    work_dir: Path,
+    nowcast_date: datetime,
+    sequence_as_of: datetime,
+    tree_as_of: datetime,
+    collection_min_date: datetime,
+    collection_max_date: datetime,
+) -> Path:
+    """Return (and create) a checkpoint directory unique to a set of run parameters."""
+    params = {
+        "nowcast_date": nowcast_date.strftime("%Y-%m-%d"),
+        "sequence_as_of": sequence_as_of.isoformat(),
+        "tree_as_of": tree_as_of.isoformat(),
+        "collection_min_date": collection_min_date.isoformat(),
+        "collection_max_date": collection_max_date.isoformat(),
+    }
+    params_json = json.dumps(params, indent=4, sort_keys=True)
+    key = hashlib.sha256(params_json.encode("utf-8")).hexdigest()[:12]
+
+    checkpoint_dir = work_dir / f"{params['nowcast_date']}-{key}"
+    checkpoint_dir.mkdir(exist_ok=True, parents=True)
+    params_path = checkpoint_dir / "params.json"
+    if not params_path.is_file():
+        write_atomic(params_path, lambda path: path.write_text(params_json))
+
+    return checkpoint_dir
+
+
+def write_clade_checkpoint(checkpoint_dir: Path, assignments: Clade):
+    """Save a Clade object's assignments, summary, and metadata."""
+    write_atomic(
+        checkpoint_dir / "clade_assignments.parquet", assignments.detail.sink_parquet
+    )
+    # the metadata file marks the clade assignment stage as complete
+    write_atomic(
+        checkpoint_dir / "clade_meta.json",
+        lambda path: path.write_text(json.dumps(assignments.meta, default=str)),
+    )
+    write_atomic(
+        checkpoint_dir / "clade_summary.parquet", assignments.summary.sink_parquet
+    )
+
+
+def read_clade_checkpoint(checkpoint_dir: Path) -> Clade | None:
+    """Return a Clade object from a checkpoint directory (or None if it's incomplete)."""
+    meta_path = checkpoint_dir / "clade_meta.json"
+    detail_path = checkpoint_dir / "clade_assignments.parquet"
+    summary_path = checkpoint_dir / "clade_summary.parquet"
+    if not meta_path.is_file() or not detail_path.is_file():
+        return None
+
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    detail = read_checkpoint(detail_path)
+    if summary_path.is_file():
+        summary = read_checkpoint(summary_path)
+    else:
+        # same summary that CladeTime.assign_clades creates
+        summary = sequence.summarize_clades(
+            detail, group_by=["location", "date", "host", "clade_nextstrain", "country"]
+        )
+        write_atomic(summary_path, summary.sink_parquet)
+        summary = read_checkpoint(summary_path)
+
+    return Clade(meta=meta, detail=detail, summary=summary)
+
+
 def create_target_data(
     assignments: Clade,
     clade_list: list,
@@ -308,8 +727,23 @@ def create_target_data(
     sequence_as_of_string: str,
     collection_min_date: datetime,
     collection_max_date: datetime,
+    locations: list[str] = state_list,
+    chunk_rows: int = target_data_chunk_rows,
 ) -> tuple[pl.LazyFrame, pl.LazyFrame]:
-    """Return time series and oracle output target data."""
+    """
+    Return time series and oracle output target data.
+
+    The location and clade columns of the returned LazyFrames are Enums based
+    on locations (default: the hub's locations) and the round's clade_list.
+    Use write_target_data to save them as strings.
+
+    Target data has a row for every target date, location, and clade. That
+    grid is built in chunks of consecutive dates with at most chunk_rows rows
+    (or a single date, if that's larger), so the memory used to write target
+    data depends on chunk_rows rather than on the number of locations.
+    """
+    location_enum = pl.Enum(locations)
+    clade_enum = pl.Enum(clade_list)
 
     time_series = (
         assignments.summary.select(["location", "date", "clade_nextstrain", "count"])
@@ -318,24 +752,57 @@ def create_target_data(
             .then(pl.col("clade_nextstrain"))
             .otherwise(pl.lit("other"))
         )
-        .select(["location", "date", "clade", "count"])
+        # locations and clades outside of the hub's lists would be dropped by
+        # the join below anyway; remove them here so the remaining values can
+        # be cast to Enums
+        .filter(
+            pl.col("location").is_in(locations),
+            pl.col("clade").is_in(clade_list),
+        )
+        .select(
+            pl.col("location").cast(location_enum),
+            "date",
+            pl.col("clade").cast(clade_enum),
+            "count",
+        )
         .group_by(["location", "date", "clade"])
         .sum()
     )
 
-    all_rows = (
-        pl.LazyFrame(
-            pl.date_range(
-                collection_min_date, collection_max_date, "1d", eager=True
-            ).alias("date")
+    # Add rows for locations/target_dates/clades that didn't have observations.
+    # Polars builds a cross join in one piece, so join each chunk of dates
+    # separately (chunks are concatenated in order, one at a time)
+    dates = pl.date_range(
+        collection_min_date, collection_max_date, "1d", eager=True
+    ).alias("date")
+    cells = (
+        pl.Series("location", locations, dtype=location_enum)
+        .to_frame()
+        .lazy()
+        .join(
+            pl.Series("clade", clade_list, dtype=clade_enum).to_frame().lazy(),
+            how="cross",
         )
-        .join(pl.Series("location", state_list).to_frame().lazy(), how="cross")
-        .join(pl.Series("clade", clade_list).to_frame().lazy(), how="cross")
     )
+    dates_per_chunk = max(1, chunk_rows // (len(locations) * len(clade_list)))
+    chunks = []
+    for offset in range(0, len(dates), dates_per_chunk):
+        chunk_dates = dates.slice(offset, dates_per_chunk)
+        chunks.append(
+            chunk_dates.to_frame()
+            .lazy()
+            .join(cells, how="cross")
+            .join(
+                time_series.filter(
+                    pl.col("date").is_between(chunk_dates[0], chunk_dates[-1])
+                ),
+                on=["location", "date", "clade"],
+                how="left",
+            )
+        )
 
-    # Add rows that for locations/target_dates/clades that didn't have observations
     time_series_all = (
-        all_rows.join(time_series, on=["location", "date", "clade"], how="left")
+        pl.concat(chunks, parallel=False)
         .fill_null(strategy="zero")
         .with_columns(
             pl.lit(nowcast_string).alias("nowcast_date"),
@@ -377,14 +844,19 @@ def write_target_data(
     """
     Write time series and oracle output target data.
 
-    This function converts the target data LazyFrames to arrow tables
-    and explicitly specifies what the schema should be. This ensures that the
-    R Hubverse tools (which use arrow::read_dataset to read parquet files) will
-    not get a data type mismatch between the values in folder names used for
-    Hive-style partitioning the corresponding columns in the parquet files.
+    Files are written with an explicitly specified schema (ts_schema and
+    oracle_schema). This ensures that the R Hubverse tools (which use
+    arrow::read_dataset to read parquet files) will not get a data type
+    mismatch between the values in folder names used for Hive-style
+    partitioning the corresponding columns in the parquet files.
     https://github.com/reichlab/variant-nowcast-hub/issues/265
+
+    Enum-encoded location and clade columns are written as strings, using
+    Parquet dictionary encoding for those columns only.
     """
 
+    enum_columns = ["location", "clade"]
+
     # write time series data
     target_time_series_dir = target_data_dir / "time-series"
 
@@ -395,21 +867,9 @@ def write_target_data(
     ts_output_path.mkdir(exist_ok=True, parents=True)
     ts_output_path = ts_output_path / "timeseries.parquet"
 
-    time_series = target_data[0]
-    time_series_arrow = time_series.collect().to_arrow()
-
-    ts_schema = pa.schema(
-        [
-            ("target_date", pa.date32()),
-            ("location", pa.string()),
-            ("clade", pa.string()),
-            ("observation", pa.int64()),
-            ("nowcast_date", pa.date32()),
-            ("as_of", pa.date32()),
-        ]
+    sink_parquet_atomic(
+        target_data[0], ts_output_path, ts_schema, dictionary_columns=enum_columns
     )
-    time_series_arrow = time_series_arrow.cast(ts_schema)
-    pq.write_table(time_series_arrow, ts_output_path, use_dictionary=False)
     logger.info(f"Target time series saved to {ts_output_path}")
 
     # write oracle output data
@@ -418,24 +878,156 @@ def write_target_data(
     oracle_output_path.mkdir(exist_ok=True, parents=True)
     oracle_output_path = oracle_output_path / "oracle.parquet"
 
-    oracle = target_data[1]
-    oracle_arrow = oracle.collect().to_arrow()
+    sink_parquet_atomic(
+        target_data[1],
+        oracle_output_path,
+        oracle_schema,
+        dictionary_columns=enum_columns,
+    )
+    logger.info(f"Target oracle output saved to {oracle_output_path}")
+
+    return (ts_output_path, oracle_output_path)
 
-    oracle_schema = pa.schema(
+
+def create_rollups(
+    time_series: pl.LazyFrame, registry: LocationRegistry = location_registry
+) -> pl.LazyFrame:
+    """
+    Return clade counts and proportions aggregated from the time series target data.
+
+    Counts are summed to each geography in the location registry for each day,
+    and to epiweek totals for every geography (for the hub's default registry:
+    national totals with location "US", HHS region totals with locations "HHS1"
+    through "HHS10", and states). The geography column is the registry level
+    ("national", "hhs_region", or "state"), and the interval column is "day" or
+    "epiweek". Epiweeks run Sunday through Saturday (MMWR weeks) and are
+    labeled by the Saturday's date; the days column is the number of
+    target_dates summed into a row, which is less than 7 for weeks cut off by
+    the collection date range. The total column is the count of all clades for
+    a location and target_date, and proportion is observation / total (null
+    when total is 0). Daily counts for the hub's own locations are not
+    repeated here, because they are the time series.
+
+    Every geography and interval is aggregated in a single group_by, by joining
+    the time series to the registry's geographies. The join repeats each time
+    series row once per registry level and interval, so it has only Enum, date,
+    and count columns, and uses aggregations that Polars' streaming engine
+    supports: days is computed from the first and last target_date in each row
+    (time series target data has every date in its range), and nowcast_date and
+    as_of (the same for every row of a time series) are added afterwards.
+    """
+    location_dtype = time_series.collect_schema()["location"]
+    geographies = registry.get_geographies().select(
+        pl.col("location").cast(location_dtype),
+        pl.col("geography").cast(pl.Enum(registry.levels)),
+        pl.col("geography_location").cast(pl.Enum(registry.locations["location"])),
+    )
+    interval_enum = pl.Enum(["day", "epiweek"])
+
+    # MMWR weeks end on Saturday (polars weekdays are Monday=1 through Sunday=7)
+    epiweek_end = pl.col("target_date") + pl.duration(
+        days=(13 - pl.col("target_date").dt.weekday()) % 7
+    )
+    daily = time_series.select(
+        "location",
+        "target_date",
+        "clade",
+        "observation",
+        pl.col("target_date").alias("day"),
+    )
+    intervals = pl.concat(
         [
-            ("location", pa.string()),
-            ("target_date", pa.date32()),
-            ("clade", pa.string()),
-            ("oracle_value", pa.int64()),
-            ("nowcast_date", pa.date32()),
-            ("as_of", pa.date32()),
+            daily.with_columns(interval=pl.lit("day", dtype=interval_enum)),
+            daily.with_columns(
+                epiweek_end.alias("target_date"),
+                interval=pl.lit("epiweek", dtype=interval_enum),
+            ),
         ]
     )
-    oracle_arrow = oracle_arrow.cast(oracle_schema)
-    pq.write_table(oracle_arrow, oracle_output_path, use_dictionary=False)
-    logger.info(f"Target oracle output saved to {oracle_output_path}")
+    keys = ["geography", "interval", "location", "target_date", "clade"]
 
-    return (ts_output_path, oracle_output_path)
+    return (
+        intervals.join(geographies.lazy(), on="location")
+        .filter(
+            (pl.col("geography") != registry.target_level)
+            | (pl.col("interval") != "day")
+        )
+        .drop("location")
+        .rename({"geography_location": "location"})
+        .group_by(keys)
+        .agg(
+            pl.col("observation").sum(),
+            first_day=pl.col("day").min(),
+            last_day=pl.col("day").max(),
+        )
+        .join(time_series.select("nowcast_date", "as_of").head(1), how="cross")
+        .with_columns(
+            pl.col(["geography", "interval", "location", "clade"]).cast(pl.String),
+            days=((pl.col("last_day") - pl.col("first_day")).dt.total_days() + 1).cast(
+                pl.Int32
+            ),
+            total=pl.col("observation")
+            .sum()
+            .over(["geography", "interval", "location", "target_date"]),
+        )
+        .with_columns(
+            proportion=pl.when(pl.col("total") > 0).then(
+                pl.col("observation") / pl.col("total")
+            )
+        )
+        .drop("first_day", "last_day")
+        .sort(keys)
+    )
+
+
+def write_rollups(
+    nowcast_string: str,
+    sequence_as_of_string: str,
+    rollups: pl.LazyFrame,
+    target_data_dir: Path,
+    registry: LocationRegistry = location_registry,
+) -> list[Path]:
+    """
+    Write the output of create_rollups, one file per geography (registry level).
+
+    Files are Hive-partitioned like the time series target data, with an
+    additional geography partition so that consumers of national or regional
+    data read only a few kilobytes:
+
+        <target_data_dir>/rollups/as_of=<as_of>/nowcast_date=<round_id>/geography=<geography>/rollup.parquet
+    """
+    rollup_dir = (
+        target_data_dir
+        / "rollups"
+        / f"as_of={sequence_as_of_string}"
+        / f"nowcast_date={nowcast_string}"
+    )
+    rollup_arrow = (
+        rollups.select(rollup_schema.names)
+        .collect(engine="streaming")
+        .to_arrow()
+        .cast(rollup_schema)
+    )
+
+    output_paths = []
+    for geography in registry.levels:
+        geography_arrow = rollup_arrow.filter(
+            pc.equal(rollup_arrow["geography"], geography)
+        )
+        output_path = rollup_dir / f"geography={geography}" / "rollup.parquet"
+        output_path.parent.mkdir(exist_ok=True, parents=True)
+        write_atomic(
+            output_path,
+            lambda path: pq.write_table(
+                geography_arrow,
+                path,
+                use_dictionary=["geography", "location", "interval", "clade"],
+            ),
+        )
+        output_paths.append(output_path)
+    logger.info(f"Target data rollups saved to {rollup_dir}")
+
+    return output_paths
 
 
 if __name__ == "__main__":
@@ -586,7 +1178,362 @@ def test_target_data():
     assert oracle.height == ts.height
 
 
-def test_target_data_integration(caplog, tmp_path):
+def test_target_data_encoding(tmp_path):
+    """Location and clade are Enums in memory and strings on disk."""
+    test_summary = {
+        "location": ["PA", "MA", "Guam"],
+        "date": [date(2024, 12, 1), date(2024, 12, 2), date(2024, 12, 2)],
+        "clade_nextstrain": ["AA", "CC", "AA"],
+        "count": [2, 3, 4],
+    }
+    test_assignments = Clade(
+        {"tree_as_of": datetime(2024, 8, 1, 14, 30, 40)},
+        pl.LazyFrame(),
+        pl.LazyFrame(test_summary),
+    )
+    test_clade_list = ["AA", "BB", "other"]
+    target_data = create_target_data(
+        test_assignments,
+        test_clade_list,
+        "2024-12-04",
+        "2024-12-17",
+        datetime(2024, 12, 1, tzinfo=timezone.utc),
+        datetime(2024, 12, 2, tzinfo=timezone.utc),
+    )
+
+    for lf in target_data:
+        schema = lf.collect_schema()
+        assert schema["location"] == pl.Enum(state_list)
+        assert schema["clade"] == pl.Enum(test_clade_list)
+
+    # locations outside of state_list are dropped
+    ts = target_data[0].collect()
+    assert ts.get_column("observation").sum() == 5
+    assert ts.filter(pl.col("clade") == "other").get_column("observation").sum() == 3
+
+    ts_path, oracle_path = write_target_data(
+        "2024-12-04", "2024-12-17", target_data, tmp_path
+    )
+    for path in [ts_path, oracle_path]:
+        schema = pq.read_schema(path)
+        assert schema.field("location").type == pa.string()
+        assert schema.field("clade").type == pa.string()
+
+
+def test_target_data_rollups(tmp_path):
+    """Rollups sum the time series to regions, the nation, and epiweeks."""
+    test_summary = {
+        "location": ["PA", "MA", "MA", "CT", "CA"],
+        # 2024-12-01 is a Sunday and 2024-12-08 is the Sunday after
+        "date": [
+            date(2024, 12, 1),
+            date(2024, 12, 1),
+            date(2024, 12, 7),
+            date(2024, 12, 8),
+            date(2024, 12, 8),
+        ],
+        "clade_nextstrain": ["AA", "AA", "BB", "CC", "AA"],
+        "count": [2, 3, 4, 5, 6],
+    }
+    test_assignments = Clade(
+        {"tree_as_of": datetime(2024, 8, 1, 14, 30, 40)},
+        pl.LazyFrame(),
+        pl.LazyFrame(test_summary),
+    )
+    time_series, _ = create_target_data(
+        test_assignments,
+        ["AA", "BB", "other"],
+        "2024-12-04",
+        "2024-12-17",
+        datetime(2024, 11, 30, tzinfo=timezone.utc),
+        datetime(2024, 12, 8, tzinfo=timezone.utc),
+    )
+    rollups = create_rollups(time_series).collect()
+
+    # every sequence is counted once per geography and interval
+    totals = rollups.group_by("geography", "interval").agg(pl.sum("observation"))
+    assert totals.height == 5
+    assert totals["observation"].to_list() == [20] * 5
+
+    national_day = rollups.filter(geography="national", interval="day")
+    assert national_day.height == 9 * 3
+    assert national_day["days"].unique().to_list() == [1]
+    dec1 = national_day.filter(target_date=date(2024, 12, 1))
+    assert dict(dec1.select("clade", "observation").iter_rows()) == {
+        "AA": 5,
+        "BB": 0,
+        "other": 0,
+    }
+    assert dec1["total"].unique().to_list() == [5]
+    assert dec1.filter(clade="AA")["proportion"].item() == 1.0
+    assert (
+        national_day.filter(target_date=date(2024, 12, 2))["proportion"].is_null().all()
+    )
+
+    # MA and CT are in HHS region 1
+    region_1 = rollups.filter(
+        geography="hhs_region", interval="epiweek", location="HHS1"
+    )
+    assert dict(
+        region_1.group_by("target_date").agg(pl.sum("observation")).iter_rows()
+    ) == {date(2024, 11, 30): 0, date(2024, 12, 7): 7, date(2024, 12, 14): 5}
+    # the first and last epiweeks are cut off by the collection date range
+    assert dict(region_1.select("target_date", "days").unique().iter_rows()) == {
+        date(2024, 11, 30): 1,
+        date(2024, 12, 7): 7,
+        date(2024, 12, 14): 1,
+    }
+    state_week = rollups.filter(
+        geography="state", location="MA", target_date=date(2024, 12, 7)
+    )
+    assert dict(state_week.select("clade", "proportion").iter_rows()) == {
+        "AA": 3 / 7,
+        "BB": 4 / 7,
+        "other": 0,
+    }
+    assert rollups.filter(geography="state", interval="day").height == 0
+
+    rollup_paths = write_rollups(
+        "2024-12-04", "2024-12-17", create_rollups(time_series), tmp_path
+    )
+    assert [path.parent.name for path in rollup_paths] == [
+        "geography=national",
+        "geography=hhs_region",
+        "geography=state",
+    ]
+    assert "as_of=2024-12-17/nowcast_date=2024-12-04" in str(rollup_paths[0])
+    for path in rollup_paths:
+        assert pq.read_schema(path) == rollup_schema
+    national = pl.read_parquet(rollup_paths[0], hive_partitioning=False)
+    assert national.height == (9 + 3) * 3
+    assert set(national["location"]) == {"US"}
+
+
+def test_checkpoint_dir(tmp_path):
+    """Checkpoint directories are keyed by run parameters."""
+    dates = [
+        datetime(2024, 10, 2, tzinfo=timezone.utc),
+        datetime(2024, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
+        datetime(2024, 9, 30, 23, 59, 59, tzinfo=timezone.utc),
+        datetime(2024, 7, 2, 23, 59, 59, tzinfo=timezone.utc),
+        datetime(2024, 10, 12, 23, 59, 59, tzinfo=timezone.utc),
+    ]
+    checkpoint_dir = get_checkpoint_dir(tmp_path, *dates)
+    assert checkpoint_dir.name.startswith("2024-10-02-")
+    assert checkpoint_dir == get_checkpoint_dir(tmp_path, *dates)
+    params = json.loads((checkpoint_dir / "params.json").read_text())
+    assert params["tree_as_of"] == "2024-09-30T23:59:59+00:00"
+
+    # a different collection window gets a different checkpoint directory
+    other_dates = dates[:4] + [datetime(2024, 10, 13, tzinfo=timezone.utc)]
+    assert checkpoint_dir != get_checkpoint_dir(tmp_path, *other_dates)
+
+
+def test_assign_clades_resume(monkeypatch, tmp_path):
+    """assign_clades resumes from checkpointed clade assignments."""
+    detail = pl.LazyFrame(
+        {
+            "strain": ["a", "b", "c"],
+            "location": ["MA", "MA", "PA"],
+            "date": [date(2024, 12, 1)] * 3,
+            "host": ["Homo sapiens"] * 3,
+            "clade_nextstrain": ["AA", "AA", "BB"],
+            "country": ["USA"] * 3,
+        }
+    )
+    assignments = Clade({"tree_as_of": datetime(2024, 8, 1)}, detail, pl.LazyFrame())
+    checkpoint_dir = tmp_path / "checkpoint"
+    checkpoint_dir.mkdir()
+    write_atomic(
+        checkpoint_dir / "clade_assignments.parquet", assignments.detail.sink_parquet
+    )
+    # simulate a run that stopped before the clade summary was written
+    assert read_clade_checkpoint(checkpoint_dir) is None
+    (checkpoint_dir / "clade_meta.json").write_text(
+        json.dumps(assignments.meta, default=str)
+    )
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("CladeTime should not be called when resuming")
+
+    monkeypatch.setitem(globals(), "CladeTime", no_network)
+    run_dates = [datetime(2024, 12, 1, tzinfo=timezone.utc)] * 5
+    resumed = assign_clades(*run_dates, checkpoint_dir=checkpoint_dir)
+
+    assert resumed.meta == {"tree_as_of": "2024-08-01 00:00:00"}
+    summary = resumed.summary.collect()
+    assert dict(
+        summary.select("clade_nextstrain", "count").sort("clade_nextstrain").iter_rows()
+    ) == {"AA": 2, "BB": 1}
+    assert (checkpoint_dir / "clade_summary.parquet").is_file()
+
+
+def test_sharded_assignments():
+    """Merged shard assignments match a single clade assignment."""
+    strains = [f"strain{i}" for i in range(200)]
+    metadata = pl.LazyFrame(
+        {
+            "strain": strains,
+            "date": [date(2024, 12, 1) + timedelta(days=i % 17) for i in range(200)],
+            "location": [state_list[i % 7] for i in range(200)],
+            "host": ["Homo sapiens"] * 200,
+            "country": ["USA"] * 200,
+        }
+    )
+    # stand-in for Nextclade output (some sequences are not assigned a clade)
+    nextclade = pl.LazyFrame(
+        {
+            "seqName": strains,
+            "clade_nextstrain": [["AA", "BB", "CC", None][i % 4] for i in range(200)],
+        }
+    )
+
+    def mock_assign_clades(sequence_metadata: pl.LazyFrame) -> Clade:
+        detail = sequence_metadata.join(
+            nextclade, left_on="strain", right_on="seqName", how="left"
+        )
+        summary = sequence.summarize_clades(
+            detail, group_by=["location", "date", "host", "clade_nextstrain", "country"]
+        )
+        sequence_count = sequence_metadata.select(pl.len()).collect().item()
+        meta = {"sequences_to_assign": sequence_count, "tree_as_of": "2024-11-01"}
+        return Clade(meta=meta, detail=detail, summary=summary)
+
+    single = mock_assign_clades(metadata)
+    sort_cols = ["location", "date", "clade_nextstrain"]
+
+    for shard_by in ["date", "strain"]:
+        shards = shard_metadata(metadata, 3, shard_by)
+        assert len(shards) == 3
+        assert sum(shard.height for shard in shards) == 200
+        if shard_by == "date":
+            # date shards are contiguous, non-overlapping date ranges
+            for prev, next in zip(shards, shards[1:]):
+                assert prev["date"].max() < next["date"].min()
+
+        merged = merge_clade_assignments(
+            [mock_assign_clades(shard.lazy()) for shard in shards]
+        )
+        assert merged.meta == single.meta
+        assert merged.summary.collect_schema() == single.summary.collect_schema()
+        assert (
+            merged.summary.collect()
+            .sort(sort_cols)
+            .equals(single.summary.collect().sort(sort_cols))
+        )
+        assert (
+            merged.detail.collect()
+            .sort("strain")
+            .equals(single.detail.collect().sort("strain"))
+        )
+
+    # shards are never empty
+    assert len(shard_metadata(metadata.head(2), 5, "date")) == 2
+
+
+def test_target_data_snapshot(cladetime_snapshot, monkeypatch, tmp_path):
+    """Create target data end-to-end using the CladeTime test snapshot."""
+    monkeypatch.setenv("RUN_HISTORY_DIR", str(tmp_path / "run-history"))
+    nowcast_date = "2025-09-03"
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "--nowcast-date",
+            nowcast_date,
+            "--target-data-dir",
+            str(tmp_path / "target-data"),
+            "--work-dir",
+            str(tmp_path / "work"),
+            "--rollups",
+        ],
+        catch_exceptions=False,
+        standalone_mode=False,
+    )
+    assert result.exit_code == 0
+    ts_path, oracle_path = result.return_value
+    assert "as_of=2025-12-02" in str(ts_path)
+    ts = pl.read_parquet(ts_path, hive_partitioning=False)
+    oracle = pl.read_parquet(oracle_path, hive_partitioning=False)
+
+    modeled_clades_path = (
+        Path(__file__).parents[1]
+        / "auxiliary-data"
+        / "modeled-clades"
+        / f"{nowcast_date}.json"
+    )
+    modeled_clades = json.loads(modeled_clades_path.read_text(encoding="utf-8"))
+    tree_as_of = datetime.fromisoformat(modeled_clades["meta"]["created_at"])
+    collection_min_date = (tree_as_of - timedelta(days=90)).date()
+    collection_max_date = date(2025, 9, 13)
+
+    # every modeled clade, location, and collection date is in the time series
+    assert set(ts["clade"]) == set(modeled_clades["clades"])
+    assert ts["target_date"].min() == collection_min_date
+    assert ts["target_date"].max() == collection_max_date
+    num_days = (collection_max_date - collection_min_date).days + 1
+    assert ts.height == num_days * len(state_list) * len(modeled_clades["clades"])
+    assert oracle.height == 42 * len(state_list) * len(modeled_clades["clades"])
+
+    # every snapshot sequence in the collection window is counted once
+    recorded = (
+        sequence.filter_metadata(cladetime_snapshot().sequence_metadata)
+        .filter(
+            pl.col("date").is_between(collection_min_date, collection_max_date),
+            pl.col("location").is_in(state_list),
+        )
+        .collect()
+    )
+    assert ts["observation"].sum() == recorded.height
+
+    # rollups are written beside the time series
+    national = pl.read_parquet(
+        tmp_path
+        / "target-data/rollups/as_of=2025-12-02/nowcast_date=2025-09-03/geography=national/rollup.parquet"
+    )
+    assert national.filter(interval="day")["observation"].sum() == recorded.height
+
+
+def test_target_data_metadata_store(cladetime_snapshot, monkeypatch, tmp_path):
+    """Target data created from a metadata store matches target data from CladeTime."""
+    monkeypatch.setenv("RUN_HISTORY_DIR", str(tmp_path / "run-history"))
+    store = MetadataStore(tmp_path / "store")
+    ct = cladetime_snapshot()
+    store.add_release(
+        datetime(2025, 12, 2, 23, 59, 59, tzinfo=timezone.utc),
+        ct.url_sequence_metadata,
+        sequence.filter_metadata(ct.sequence_metadata),
+    )
+
+    def get_target_data(*args):
+        result = CliRunner().invoke(
+            main,
+            ["--nowcast-date", "2025-09-03", *args],
+            catch_exceptions=False,
+            standalone_mode=False,
+        )
+        return pl.read_parquet(result.return_value[0], hive_partitioning=False)
+
+    expected = get_target_data(
+        "--target-data-dir", str(tmp_path / "cladetime"), "--work-dir", str(tmp_path)
+    )
+
+    def no_download(self):
+        raise AssertionError("sequence metadata should be read from the store")
+
+    monkeypatch.setattr(cladetime_snapshot, "sequence_metadata", property(no_download))
+    ts = get_target_data(
+        "--target-data-dir",
+        str(tmp_path / "store-target-data"),
+        "--work-dir",
+        str(tmp_path / "store-work"),
+        "--metadata-store",
+        str(tmp_path / "store"),
+    )
+    assert ts.equals(expected)
+
+
+def test_target_data_integration(live, caplog, tmp_path):
     """
     If the modeled-clades file doesn't have meta.created_at, tree_as_of should default to
     nowcast_date - two days. Additionally, when collection_min_date isn't provided,
@@ -0,0 +1,429 @@
+"""
+Query the hub's data with SQL, using an embedded DuckDB database.
+
+The hub's model output, target data, and scores are registered as views in
+a DuckDB database, so they can be queried together without reading them
+into memory first:
+
+- model_output: every team's submissions, with a model_id column
+- time_series, oracle_output, rollups: target data (hive partition columns,
+  such as as_of and nowcast_date, are typed as dates)
+- scores (scores.tsv) and coverage (coverage.parquet)
+- modeled_clades: one row per round's nowcast_date and clade
+
+DuckDB runs queries in parallel and pushes filters and column selections
+into the Parquet files: filters on hive partition columns skip whole files,
+filters on model_id skip other teams' submissions, and other filters skip
+row groups using the Parquet statistics.
+
+The catalog (the views and the files behind them) is cached in a DuckDB
+database file. When a catalog is opened, each source's files are listed
+and compared to a fingerprint of the files (path, size, and modification
+time) saved when its view was created. Only views whose files changed are
+re-created. The catalog's views use absolute paths, so the database file can
+also be opened by other DuckDB clients (e.g., the duckdb CLI or R's duckdb
+package).
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/hubquery.py "SELECT model_id, count(*) FROM model_output GROUP BY ALL"
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/hubquery.py
+"""
+
+import hashlib
+import json
+import logging
+from datetime import date
+from pathlib import Path
+
+import click
+import duckdb
+import polars as pl
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# view name -> (directory relative to the hub root, file pattern, hive partition types)
+hub_sources = {
+    "model_output": ("model-output", "*/*.parquet", {}),
+    "time_series": (
+        "target-data/time-series",
+        "as_of=*/nowcast_date=*/*.parquet",
+        {"as_of": "DATE", "nowcast_date": "DATE"},
+    ),
+    "oracle_output": (
+        "target-data/oracle-output",
+        "nowcast_date=*/*.parquet",
+        {"nowcast_date": "DATE"},
+    ),
+    "rollups": (
+        "target-data/rollups",
+        "as_of=*/nowcast_date=*/geography=*/*.parquet",
+        {"as_of": "DATE", "nowcast_date": "DATE", "geography": "VARCHAR"},
+    ),
+    "scores": ("auxiliary-data/scores", "scores.tsv", {}),
+    "coverage": ("auxiliary-data/scores", "coverage.parquet", {}),
+    "modeled_clades": ("auxiliary-data/modeled-clades", "*.json", {}),
+}
+
+model_output_columns = [
+    "nowcast_date",
+    "target_date",
+    "location",
+    "clade",
+    "output_type",
+    "output_type_id",
+    "value",
+]
+
+
+def set_catalog(ctx, param, value):
+    """Set the catalog default value to ~/.variant-nowcast-hub/hubquery/<hub>.duckdb."""
+    if value is None:
+        root = Path(ctx.params.get("hub_root") or hub_root).resolve()
+        path_hash = hashlib.sha256(str(root).encode()).hexdigest()[:8]
+        value = (
+            Path.home()
+            / ".variant-nowcast-hub"
+            / "hubquery"
+            / f"{root.name}-{path_hash}.duckdb"
+        )
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.argument("query", required=False)
+@click.option(
+    "--hub-root",
+    type=str,
+    required=False,
+    default=str(hub_root),
+    is_eager=True,
+    help="Root directory of the hub. Default is this repo.",
+)
+@click.option(
+    "--catalog",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_catalog,
+    help="DuckDB database file that caches the catalog. Default is ~/.variant-nowcast-hub/hubquery/<hub>.duckdb.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Re-create every view, even if its files haven't changed.",
+)
+@click.option(
+    "--threads",
+    type=click.IntRange(min=1),
+    required=False,
+    default=None,
+    help="Number of threads DuckDB uses. Default is DuckDB's default (the number of CPUs).",
+)
+@click.option(
+    "--output-file",
+    type=str,
+    required=False,
+    default=None,
+    help="Save query results to this file (.parquet or .csv) instead of printing them.",
+)
+def main(
+    query: str | None,
+    hub_root: str,
+    catalog: Path,
+    refresh: bool,
+    threads: int | None,
+    output_file: str | None,
+):
+    """
+    Run a SQL query against the hub's data, or list the catalog's views if no
+    query is given.
+    """
+    con = connect(Path(hub_root), catalog, refresh=refresh, threads=threads)
+
+    if query is None:
+        print(con.sql("SELECT * FROM hubquery_catalog ORDER BY view"))
+    elif output_file is not None:
+        con.execute(f"COPY ({query}) TO {sql_string(output_file)}")
+        logger.info(f"Query results saved to {output_file}")
+    else:
+        print(con.sql(query))
+
+    con.close()
+
+
+def connect(
+    root: Path = hub_root,
+    catalog: Path | str = ":memory:",
+    refresh: bool = False,
+    threads: int | None = None,
+) -> duckdb.DuckDBPyConnection:
+    """
+    Return a connection to a DuckDB database with views of the hub's data.
+
+    Views are created (or updated) for every source in hub_sources that has
+    files. A view is left as is if its files haven't changed since it was
+    created, unless refresh is True.
+    """
+    if catalog != ":memory:":
+        Path(catalog).parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(str(catalog))
+    if threads is not None:
+        con.execute(f"SET threads = {threads}")
+    con.execute("SET parquet_metadata_cache = true")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS hubquery_catalog (
+            view VARCHAR PRIMARY KEY,
+            files INTEGER,
+            fingerprint VARCHAR,
+            updated_at TIMESTAMP
+        )
+        """)
+    cached = dict(
+        con.execute("SELECT view, fingerprint FROM hubquery_catalog").fetchall()
+    )
+
+    for view, (directory, pattern, hive_types) in hub_sources.items():
+        files = sorted((root / directory).glob(pattern))
+        if not files:
+            logger.debug(f"No files for {view}")
+            con.execute(f"DROP VIEW IF EXISTS {view}")
+            con.execute("DELETE FROM hubquery_catalog WHERE view = ?", [view])
+            continue
+
+        fingerprint = get_fingerprint(files)
+        if not refresh and cached.get(view) == fingerprint:
+            continue
+
+        con.execute(
+            f"CREATE OR REPLACE VIEW {view} AS {get_view_sql(view, files, hive_types)}"
+        )
+        con.execute(
+            "INSERT OR REPLACE INTO hubquery_catalog VALUES (?, ?, ?, now())",
+            [view, len(files), fingerprint],
+        )
+        logger.info(f"Updated {view} view ({len(files)} files)")
+
+    return con
+
+
+def get_fingerprint(files: list[Path]) -> str:
+    """Return a hash of the files' paths, sizes, and modification times."""
+    fingerprint = hashlib.sha256()
+    for file in files:
+        stat = file.stat()
+        fingerprint.update(f"{file}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return fingerprint.hexdigest()
+
+
+def get_view_sql(view: str, files: list[Path], hive_types: dict[str, str]) -> str:
+    """Return the SELECT statement that defines a source's view."""
+    if view == "model_output":
+        # one branch per team, so filters on model_id skip other teams' files
+        teams: dict[str, list[Path]] = {}
+        for file in files:
+            teams.setdefault(file.parent.name, []).append(file)
+        columns = ", ".join(model_output_columns)
+        return "\nUNION ALL\n".join(
+            f"SELECT {sql_string(team)} AS model_id, {columns} "
+            f"FROM read_parquet({sql_list(team_files)}, union_by_name = true)"
+            for team, team_files in teams.items()
+        )
+
+    if view == "modeled_clades":
+        return (
+            "SELECT CAST(regexp_extract(filename, '(\\d{4}-\\d{2}-\\d{2})\\.json$', 1) AS DATE) AS nowcast_date, "
+            "unnest(clades) AS clade "
+            f"FROM read_json({sql_list(files)}, columns = {{'clades': 'VARCHAR[]'}}, filename = true)"
+        )
+
+    if files[0].suffix == ".tsv":
+        # scores.tsv is written by R's readr::write_tsv
+        return (
+            f"SELECT * FROM read_csv({sql_list(files)}, delim = '\\t', header = true, "
+            "nullstr = 'NA', union_by_name = true)"
+        )
+
+    options = "union_by_name = true"
+    if hive_types:
+        types = ", ".join(f"{sql_string(k)}: {v}" for k, v in hive_types.items())
+        options += f", hive_partitioning = true, hive_types = {{{types}}}"
+    return f"SELECT * FROM read_parquet({sql_list(files)}, {options})"
+
+
+def sql_string(value: str | Path) -> str:
+    """Return a value as a quoted SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_list(files: list[Path]) -> str:
+    """Return file paths as a SQL list of absolute paths."""
+    return "[" + ", ".join(sql_string(f.resolve()) for f in files) + "]"
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+@pytest.fixture
+def test_hub(tmp_path) -> Path:
+    """A small hub with model output, target data, and modeled clades."""
+    for team, value in [("team-a", 0.25), ("team-b", 0.75)]:
+        for nowcast_date in [date(2025, 1, 1), date(2025, 1, 8)]:
+            team_dir = tmp_path / "model-output" / team
+            team_dir.mkdir(parents=True, exist_ok=True)
+            pl.DataFrame(
+                {
+                    "nowcast_date": [nowcast_date] * 2,
+                    "target_date": [nowcast_date] * 2,
+                    "location": ["MA"] * 2,
+                    "clade": ["24A", "other"],
+                    "output_type": ["mean"] * 2,
+                    "output_type_id": [None, None],
+                    "value": [value, 1 - value],
+                },
+                schema_overrides={"output_type_id": pl.String},
+            ).write_parquet(team_dir / f"{nowcast_date}-{team}.parquet")
+
+    for as_of in ["2025-01-10", "2025-01-20"]:
+        for nowcast_date in ["2025-01-01", "2025-01-08"]:
+            ts_dir = (
+                tmp_path
+                / "target-data"
+                / "time-series"
+                / f"as_of={as_of}"
+                / f"nowcast_date={nowcast_date}"
+            )
+            ts_dir.mkdir(parents=True)
+            pl.DataFrame(
+                {
+                    "target_date": [date(2025, 1, 1)],
+                    "location": ["MA"],
+                    "clade": ["24A"],
+                    "observation": [3],
+                }
+            ).write_parquet(ts_dir / "timeseries.parquet")
+
+    clades_dir = tmp_path / "auxiliary-data" / "modeled-clades"
+    clades_dir.mkdir(parents=True)
+    for nowcast_date in ["2025-01-01", "2025-01-08"]:
+        (clades_dir / f"{nowcast_date}.json").write_text(
+            json.dumps({"clades": ["24A", "other"], "meta": {}})
+        )
+
+    return tmp_path
+
+
+def test_connect_views(test_hub):
+    """Sources are registered as views with typed partition columns."""
+    con = connect(test_hub)
+
+    views = {
+        row[0] for row in con.execute("SELECT view FROM hubquery_catalog").fetchall()
+    }
+    assert views == {"model_output", "time_series", "modeled_clades"}
+
+    mean_values = con.sql(
+        "SELECT model_id, avg(value) FROM model_output WHERE clade = '24A' GROUP BY ALL ORDER BY 1"
+    ).fetchall()
+    assert mean_values == [("team-a", 0.25), ("team-b", 0.75)]
+
+    types = {row[0]: row[1] for row in con.execute("DESCRIBE time_series").fetchall()}
+    assert types["as_of"] == "DATE" and types["nowcast_date"] == "DATE"
+    assert con.sql(
+        "SELECT count(*) FROM time_series WHERE as_of = DATE '2025-01-20'"
+    ).fetchone() == (2,)
+
+    clades = con.sql(
+        "SELECT nowcast_date, count(*) FROM modeled_clades GROUP BY ALL ORDER BY 1"
+    ).fetchall()
+    assert clades == [(date(2025, 1, 1), 2), (date(2025, 1, 8), 2)]
+
+
+def test_connect_pushdown(test_hub):
+    """Filters on partition columns and model_id skip files."""
+    con = connect(test_hub)
+
+    plan = con.sql(
+        "EXPLAIN ANALYZE SELECT * FROM time_series WHERE as_of = DATE '2025-01-10'"
+    ).fetchone()[1]
+    assert "Total Files Read: 2" in plan
+
+    plan = con.sql(
+        "EXPLAIN ANALYZE SELECT * FROM model_output WHERE model_id = 'team-b'"
+    ).fetchone()[1]
+    assert plan.count("READ_PARQUET") == 1
+
+
+def test_connect_catalog_cache(test_hub, tmp_path, caplog):
+    """Cached views are re-created only when their files change."""
+    catalog = tmp_path / "catalog" / "hub.duckdb"
+    connect(test_hub, catalog).close()
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO):
+        connect(test_hub, catalog).close()
+    assert "Updated" not in caplog.text
+
+    new_file = test_hub / "model-output" / "team-c" / "2025-01-01-team-c.parquet"
+    new_file.parent.mkdir()
+    (test_hub / "model-output" / "team-a" / "2025-01-01-team-a.parquet").rename(
+        new_file
+    )
+    with caplog.at_level(logging.INFO):
+        con = connect(test_hub, catalog)
+    assert "Updated model_output" in caplog.text
+    assert "Updated time_series" not in caplog.text
+    assert con.sql(
+        "SELECT count(*) FROM model_output WHERE model_id = 'team-c'"
+    ).fetchone() == (2,)
+    con.close()
+
+
+def test_hubquery_cli_output_file(test_hub, tmp_path):
+    """Query results are saved to --output-file, which can contain quotes."""
+    from click.testing import CliRunner
+
+    output_file = tmp_path / "team's results" / "means.parquet"
+    output_file.parent.mkdir()
+    result = CliRunner().invoke(
+        main,
+        [
+            "SELECT model_id, value FROM model_output WHERE clade = '24A'",
+            f"--hub-root={test_hub}",
+            f"--catalog={tmp_path / 'catalog.duckdb'}",
+            f"--output-file={output_file}",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert pl.read_parquet(output_file).sort("model_id")["model_id"].to_list() == [
+        "team-a",
+        "team-a",
+        "team-b",
+        "team-b",
+    ]
@@ -0,0 +1,318 @@
+"""
+Read the hub's location registry from hub-config/locations.json.
+
+The registry lists the locations that target data is created for, and the geographies
+they aggregate to. Levels are ordered from the top of the hierarchy to the level of the
+hub's locations:
+
+    {
+        "levels": ["national", "hhs_region", "state"],
+        "locations": [
+            {"location": "US", "name": "United States", "level": "national", "parent": null},
+            {"location": "HHS1", "name": "HHS Region 1", "level": "hhs_region", "parent": "US"},
+            {"location": "CT", "name": "Connecticut", "level": "state", "parent": "HHS1"},
+            ...
+        ]
+    }
+
+Every location below the top level has a parent at the level directly above it. Locations
+at the last level are the hub's locations (the location values in target data and model
+output), in the order listed. Piloting other geographies (e.g., counties) means adding a
+level to this file; get_target_data.py and its rollups read the hierarchy from here.
+
+To check a registry file and summarize its levels:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo: uv run --with-requirements src/requirements.txt src/location_registry.py
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/location_registry.py
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import click
+import polars as pl
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+registry_file = hub_root / "hub-config" / "locations.json"
+
+location_schema = {
+    "location": pl.String,
+    "name": pl.String,
+    "level": pl.String,
+    "parent": pl.String,
+}
+
+
+class LocationRegistry:
+    """
+    The hub's locations and the geographies they aggregate to.
+
+    levels are ordered from the top of the hierarchy to the level of the hub's
+    locations (target_level). locations has a row for each location, with its name,
+    level, and parent location.
+    """
+
+    def __init__(self, levels: list[str], locations: pl.DataFrame):
+        self.levels = levels
+        self.locations = locations.select(
+            pl.col(column).cast(dtype) for column, dtype in location_schema.items()
+        )
+        self.validate()
+
+    def __repr__(self):
+        sizes = ", ".join(
+            f"{level}={self.locations.filter(level=level).height}"
+            for level in self.levels
+        )
+        return f"LocationRegistry({sizes})"
+
+    @classmethod
+    def from_file(cls, path: Path = registry_file) -> "LocationRegistry":
+        """Return the registry in a locations.json file."""
+        registry = json.loads(path.read_text())
+        return cls(
+            registry["levels"],
+            pl.DataFrame(registry["locations"], schema=location_schema),
+        )
+
+    @property
+    def target_level(self) -> str:
+        """The level of the hub's locations."""
+        return self.levels[-1]
+
+    @property
+    def target_locations(self) -> list[str]:
+        """The hub's locations, in registry order."""
+        return (
+            self.locations.filter(level=self.target_level)
+            .get_column("location")
+            .to_list()
+        )
+
+    def validate(self):
+        """Raise a ValueError if the registry isn't a hierarchy of self.levels."""
+        if not self.levels or len(set(self.levels)) != len(self.levels):
+            raise ValueError(
+                f"Registry levels must be unique and non-empty: {self.levels}"
+            )
+        duplicated = self.locations.filter(pl.col("location").is_duplicated())
+        if duplicated.height:
+            raise ValueError(
+                f"Duplicate registry locations: {duplicated['location'].unique().sort().to_list()}"
+            )
+        unknown = self.locations.filter(~pl.col("level").is_in(self.levels))
+        if unknown.height:
+            raise ValueError(
+                f"Registry levels not in {self.levels}: {unknown['level'].unique().sort().to_list()}"
+            )
+        if not self.target_locations:
+            raise ValueError(f"Registry has no {self.target_level} locations")
+
+        parent_level = {
+            level: parent for parent, level in zip([None] + self.levels, self.levels)
+        }
+        parents = self.locations.join(
+            self.locations.select("location", parent_level="level"),
+            left_on="parent",
+            right_on="location",
+            how="left",
+        ).with_columns(
+            expected_level=pl.col("level").replace_strict(
+                parent_level, return_dtype=pl.String
+            )
+        )
+        bad_parents = parents.filter(
+            ~pl.col("parent_level").eq_missing(pl.col("expected_level"))
+        )
+        if bad_parents.height:
+            location, level, parent = bad_parents.select(
+                "location", "level", "parent"
+            ).row(0)
+            raise ValueError(
+                f"Registry location {location} ({level}) has parent {parent}; "
+                f"{level} locations need a parent at level {parent_level[level]}"
+            )
+
+    def get_geographies(self) -> pl.DataFrame:
+        """
+        Return the location at each level that each of the hub's locations belongs to.
+
+        There is a row for each of the hub's locations and each level, with columns
+        location (the hub's location), geography (the level), and geography_location
+        (the location at that level, which is the hub's location itself at
+        target_level). Joining data for the hub's locations to this frame and grouping
+        by geography and geography_location aggregates every level in one pass.
+        """
+        parents = self.locations.select("location", "parent")
+        current = pl.DataFrame(
+            {
+                "location": self.target_locations,
+                "geography_location": self.target_locations,
+            },
+            schema={"location": pl.String, "geography_location": pl.String},
+        )
+        geographies = []
+        for level in reversed(self.levels):
+            geographies.append(current.with_columns(geography=pl.lit(level)))
+            current = current.join(
+                parents, left_on="geography_location", right_on="location"
+            ).select("location", geography_location="parent")
+        return pl.concat(geographies).select(
+            "location", "geography", "geography_location"
+        )
+
+
+@click.command()
+@click.option(
+    "--registry-file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=registry_file,
+    show_default=True,
+    help="Location registry to check.",
+)
+def main(registry_file: Path):
+    registry = LocationRegistry.from_file(registry_file)
+    logger.info(f"{registry_file} is valid: {registry}")
+    return registry
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def get_test_registry(levels=None, locations=None) -> LocationRegistry:
+    """Return a small three-level registry, or one with the given levels/locations."""
+    if locations is None:
+        locations = [
+            ("US", "United States", "national", None),
+            ("R1", "Region 1", "region", "US"),
+            ("R2", "Region 2", "region", "US"),
+            ("MA", "Massachusetts", "state", "R1"),
+            ("TX", "Texas", "state", "R2"),
+            ("CT", "Connecticut", "state", "R1"),
+        ]
+    return LocationRegistry(
+        levels or ["national", "region", "state"],
+        pl.DataFrame(locations, schema=location_schema, orient="row"),
+    )
+
+
+def test_hub_registry():
+    """The hub's registry has the hub's 52 locations, in hub-config order."""
+    registry = LocationRegistry.from_file()
+    assert registry.levels == ["national", "hhs_region", "state"]
+    assert len(registry.target_locations) == 52
+    assert registry.target_locations[:3] == ["AL", "AK", "AZ"]
+    assert registry.target_locations[-1] == "PR"
+
+    # every state belongs to one HHS region and the nation
+    geographies = registry.get_geographies()
+    assert geographies.height == 52 * 3
+    assert geographies.group_by("geography").agg(
+        pl.col("geography_location").n_unique()
+    ).sort("geography").rows() == [("hhs_region", 10), ("national", 1), ("state", 52)]
+
+    # the hub's locations are the location task IDs of the latest round
+    tasks = json.loads((hub_root / "hub-config" / "tasks.json").read_text())
+    task_ids = tasks["rounds"][-1]["model_tasks"][0]["task_ids"]
+    assert registry.target_locations == task_ids["location"]["optional"]
+
+
+def test_get_geographies():
+    """Each location is mapped to itself and its ancestors."""
+    geographies = get_test_registry().get_geographies()
+    assert geographies.sort("location", "geography").rows() == [
+        ("CT", "national", "US"),
+        ("CT", "region", "R1"),
+        ("CT", "state", "CT"),
+        ("MA", "national", "US"),
+        ("MA", "region", "R1"),
+        ("MA", "state", "MA"),
+        ("TX", "national", "US"),
+        ("TX", "region", "R2"),
+        ("TX", "state", "TX"),
+    ]
+
+    # a single-level registry
+    registry = get_test_registry(["state"], [("MA", "Massachusetts", "state", None)])
+    assert registry.target_locations == ["MA"]
+    assert registry.get_geographies().rows() == [("MA", "state", "MA")]
+
+
+def test_invalid_registry():
+    """Registries that aren't a hierarchy of their levels are rejected."""
+    import pytest
+
+    invalid_registries = [
+        (["state", "state"], [], "must be unique"),
+        (
+            ["national", "state"],
+            [("US", "US", "national", None), ("MA", "MA", "state", "US")] * 2,
+            "Duplicate registry locations: \\['MA', 'US'\\]",
+        ),
+        (
+            ["national", "state"],
+            [("US", "US", "national", None), ("MA", "MA", "county", "US")],
+            "not in",
+        ),
+        (["national", "state"], [("US", "US", "national", None)], "no state locations"),
+        (
+            ["national", "region", "state"],
+            [("US", "US", "national", None), ("MA", "MA", "state", "US")],
+            "MA \\(state\\) has parent US",
+        ),
+        (
+            ["national", "state"],
+            [("US", "US", "national", None), ("MA", "MA", "state", "R1")],
+            "MA \\(state\\) has parent R1",
+        ),
+        (
+            ["national", "state"],
+            [("US", "US", "national", "US"), ("MA", "MA", "state", "US")],
+            "US \\(national\\) has parent US",
+        ),
+    ]
+    for levels, locations, message in invalid_registries:
+        with pytest.raises(ValueError, match=message):
+            get_test_registry(levels, locations)
+
+
+def test_main(tmp_path):
+    """The CLI checks a registry file."""
+    path = tmp_path / "locations.json"
+    path.write_text(
+        json.dumps(
+            {
+                "levels": ["national", "state"],
+                "locations": [
+                    {
+                        "location": "US",
+                        "name": "US",
+                        "level": "national",
+                        "parent": None,
+                    },
+                    {"location": "MA", "name": "MA", "level": "state", "parent": "US"},
+                ],
+            }
+        )
+    )
+    registry = main(["--registry-file", str(path)], standalone_mode=False)
+    assert repr(registry) == "LocationRegistry(national=1, state=1)"
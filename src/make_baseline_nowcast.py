@@ -0,0 +1,555 @@
+"""
+Create Hub-baseline nowcasts with a national multinomial logistic regression.
+
+This is a Python version of the hub's baseline model (see
+model-metadata/Hub-baseline.yml). For each modeling round, it:
+
+1. Sums the round's time series target data to national daily clade counts,
+   using the most recent time series that was available before the nowcast
+   date (i.e., the data a modeler would have had when submitting).
+2. Fits a multinomial logistic regression that is linear in time over the
+   --days days of data that end on the nowcast date. The fit is a Newton
+   solver on the log posterior with independent normal priors on the
+   intercepts and slopes, so results are deterministic.
+3. Draws samples of the regression parameters from a Laplace (normal)
+   approximation of the posterior and converts them to clade proportions for
+   each of the round's target dates. As with the Stan-based baseline, every
+   location gets the same predictions.
+
+Submissions are written in the hub's model-output layout:
+
+    <output-dir>/<model_id>/<round_id>-<model_id>.parquet
+
+To refit every round that has time series data, use --all-rounds. Rounds are
+fit in parallel by --workers processes.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/make_baseline_nowcast.py --nowcast-date=2026-08-19
+or
+uv run --with-requirements src/requirements.txt src/make_baseline_nowcast.py --all-rounds --workers=8
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/make_baseline_nowcast.py
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import click
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq  # type: ignore
+
+from atomic_files import write_atomic
+from sim_model_output import get_model_output_table, get_round_tasks
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# standard deviation of the normal priors on the regression's intercepts and
+# (per-week) slopes; keeps the fit finite for clades with no sequences
+prior_sd = 5.0
+
+# the baseline has used 70 days of data since this round (50 days before it)
+fit_days_changed = "2026-04-29"
+
+
+def set_target_data_dir(ctx, param, value):
+    """Set the target_data_dir default value to the hub's target-data directory."""
+    if value is None:
+        value = hub_root / "target-data"
+    else:
+        value = Path(value)
+
+    return value
+
+
+def set_output_dir(ctx, param, value):
+    """Set the output_dir default value to baseline-model-output in the current working directory."""
+    if value is None:
+        value = Path.cwd() / "baseline-model-output"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--all-rounds",
+    is_flag=True,
+    default=False,
+    help="Create nowcasts for every round in hub-config/tasks.json that has time series target data.",
+)
+@click.option(
+    "--target-data-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_target_data_dir,
+    help="Path to the hub's target data. Default is the hub's target-data directory.",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_output_dir,
+    help="Directory where submissions are saved. Default is baseline-model-output in the current working directory.",
+)
+@click.option(
+    "--model-id",
+    type=str,
+    default="Hub-baseline",
+    show_default=True,
+    help="model_id used for the submission folder and file names.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=7),
+    required=False,
+    default=None,
+    help=(
+        "Number of days of data, ending on the nowcast date, used to fit the model. Default is the number "
+        "used by the Hub-baseline model for the round (70 days starting with the 2026-04-29 round, 50 before)."
+    ),
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    help="Number of worker processes used with --all-rounds. Default is the number of CPUs.",
+)
+def main(
+    nowcast_date: datetime | None,
+    all_rounds: bool,
+    target_data_dir: Path,
+    output_dir: Path,
+    model_id: str,
+    days: int | None,
+    workers: int,
+) -> list[Path]:
+    if all_rounds == (nowcast_date is not None):
+        raise click.UsageError("Use either --nowcast-date or --all-rounds")
+
+    if all_rounds:
+        round_ids = get_fittable_rounds(target_data_dir)
+    else:
+        round_ids = [nowcast_date.strftime("%Y-%m-%d")]
+
+    start = time.perf_counter()
+    args = [
+        (round_id, target_data_dir, output_dir, model_id, days)
+        for round_id in round_ids
+    ]
+    if len(args) > 1 and workers > 1:
+        # Polars is multithreaded, so start workers with spawn rather than fork
+        # https://docs.pola.rs/user-guide/misc/multiprocessing/
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            output_files = list(executor.map(make_baseline_nowcast, *zip(*args)))
+    else:
+        output_files = [make_baseline_nowcast(*arg) for arg in args]
+
+    logger.info(
+        f"Wrote {len(output_files)} {model_id} submissions to {output_dir} "
+        f"in {time.perf_counter() - start:.1f} seconds"
+    )
+    return output_files
+
+
+def make_baseline_nowcast(
+    round_id: str,
+    target_data_dir: Path,
+    output_dir: Path,
+    model_id: str,
+    days: int | None = None,
+) -> Path:
+    """Fit the baseline model for a round and write its submission."""
+    if days is None:
+        days = 70 if round_id >= fit_days_changed else 50
+    round_tasks = get_round_tasks(round_id)
+    nowcast_date = round_tasks["nowcast_date"]
+    counts = get_national_counts(round_id, target_data_dir, round_tasks["clades"], days)
+
+    # time is measured in weeks relative to the nowcast date
+    fit_weeks = np.arange(1 - days, 1) / 7
+    target_weeks = np.array(
+        [(d - nowcast_date).days / 7 for d in round_tasks["target_dates"]]
+    )
+    beta, cov = fit_mlr(fit_weeks, counts)
+
+    # seed with the round_id so that re-running a round gives the same samples
+    rng = np.random.default_rng(int(nowcast_date.strftime("%Y%m%d")))
+    draws = rng.multivariate_normal(
+        beta.ravel(), cov, size=round_tasks["samples"], method="cholesky"
+    ).reshape(-1, *beta.shape)
+    proportions = predict_mlr(draws, target_weeks)
+
+    # every location gets the same predictions: (location, date, sample, clade)
+    locations = round_tasks["locations"]
+    proportions = proportions.transpose(1, 0, 2)
+    table = get_model_output_table(
+        round_tasks,
+        locations,
+        np.broadcast_to(proportions, (len(locations), *proportions.shape)),
+    )
+
+    output_file = output_dir / model_id / f"{round_id}-{model_id}.parquet"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(output_file, lambda path: pq.write_table(table, path))
+    logger.info(f"Baseline nowcast for {round_id} saved to {output_file}")
+
+    return output_file
+
+
+def get_time_series_as_of(target_data_dir: Path, round_id: str) -> str | None:
+    """
+    Return the as_of date of the most recent time series target data for a
+    round that was created before the round's nowcast date, or None if there
+    isn't any.
+    """
+    as_of_dates = [
+        path.parent.name.removeprefix("as_of=")
+        for path in (target_data_dir / "time-series").glob(
+            f"as_of=*/nowcast_date={round_id}"
+        )
+    ]
+    return max([d for d in as_of_dates if d < round_id], default=None)
+
+
+def get_fittable_rounds(target_data_dir: Path) -> list[str]:
+    """Return round_ids in hub-config/tasks.json that have time series target data."""
+    with open(hub_root / "hub-config" / "tasks.json") as f:
+        tasks = json.load(f)
+
+    round_ids = [
+        round_config["model_tasks"][0]["task_ids"]["nowcast_date"]["required"][0]
+        for round_config in tasks["rounds"]
+    ]
+    return [
+        round_id
+        for round_id in round_ids
+        if get_time_series_as_of(target_data_dir, round_id) is not None
+    ]
+
+
+def get_national_counts(
+    round_id: str, target_data_dir: Path, clades: list[str], days: int
+) -> np.ndarray:
+    """
+    Return national daily clade counts for the days of data that end on a
+    round's nowcast date, with shape (day, clade).
+
+    Counts are read from the national target data rollups when they exist and
+    are otherwise summed from the time series.
+    """
+    as_of = get_time_series_as_of(target_data_dir, round_id)
+    if as_of is None:
+        raise ValueError(f"No time series target data before round {round_id}")
+
+    partition = f"as_of={as_of}/nowcast_date={round_id}"
+    rollup_path = (
+        target_data_dir
+        / "rollups"
+        / partition
+        / "geography=national"
+        / "rollup.parquet"
+    )
+    if rollup_path.is_file():
+        daily = pl.scan_parquet(rollup_path, hive_partitioning=False).filter(
+            interval="day"
+        )
+    else:
+        daily = pl.scan_parquet(
+            target_data_dir / "time-series" / partition / "*.parquet",
+            hive_partitioning=False,
+        )
+
+    nowcast_date = date.fromisoformat(round_id)
+    fit_dates = pl.date_range(
+        nowcast_date - timedelta(days=days - 1), nowcast_date, eager=True
+    )
+    counts = (
+        daily.filter(pl.col("target_date").is_in(fit_dates.implode()))
+        .group_by("target_date", "clade")
+        .agg(pl.col("observation").sum())
+        .collect()
+        .pivot("clade", index="target_date", values="observation")
+    )
+    # add days and clades with no sequences and put them in order
+    counts = (
+        fit_dates.alias("target_date")
+        .to_frame()
+        .join(counts, on="target_date", how="left")
+        .select(
+            [pl.col(c) if c in counts.columns else pl.lit(0).alias(c) for c in clades]
+        )
+        .fill_null(0)
+    )
+
+    return counts.to_numpy().astype(np.float64)
+
+
+def fit_mlr(weeks: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fit a multinomial logistic regression of clade counts on time.
+
+    weeks has shape (day,) and counts has shape (day, clade). The model has an
+    intercept and slope for every clade, with independent normal(0, prior_sd)
+    priors that also make the parameters identifiable. Returns the posterior
+    mode, with shape (clade, 2), and the covariance of the Laplace
+    approximation of the posterior (the inverse of the negative Hessian at the
+    mode), with shape (2 * clade, 2 * clade).
+    """
+    n_clades = counts.shape[1]
+    x = np.column_stack([np.ones_like(weeks), weeks])
+    totals = counts.sum(axis=1)
+    precision = 1 / prior_sd**2
+
+    def log_posterior(beta):
+        eta = x @ beta.T
+        log_norm = np.logaddexp.reduce(eta, axis=1)
+        return (
+            np.sum(counts * eta)
+            - np.sum(totals * log_norm)
+            - precision * np.sum(beta**2) / 2
+        )
+
+    def neg_hessian(beta):
+        p = softmax(x @ beta.T)
+        # totals * (diag(p) - p p^T) for each day: (day, clade, clade)
+        w = -totals[:, None, None] * p[:, :, None] * p[:, None, :]
+        w[:, np.arange(n_clades), np.arange(n_clades)] += totals[:, None] * p
+        h = np.einsum("tkj,ta,tb->kajb", w, x, x).reshape(2 * n_clades, -1)
+        return h + precision * np.eye(2 * n_clades)
+
+    # start from the clades' overall log proportions
+    beta = np.zeros((n_clades, 2))
+    beta[:, 0] = np.log((counts.sum(axis=0) + 0.5) / (counts.sum() + 0.5 * n_clades))
+    objective = log_posterior(beta)
+    for _ in range(100):
+        p = softmax(x @ beta.T)
+        gradient = (counts - totals[:, None] * p).T @ x - precision * beta
+        step = np.linalg.solve(neg_hessian(beta), gradient.ravel()).reshape(beta.shape)
+        # backtracking line search (the log posterior is concave)
+        scale = 1.0
+        while log_posterior(beta + scale * step) < objective and scale > 1e-6:
+            scale /= 2
+        beta = beta + scale * step
+        objective = log_posterior(beta)
+        if np.max(np.abs(scale * step)) < 1e-9:
+            break
+
+    return beta, np.linalg.inv(neg_hessian(beta))
+
+
+def predict_mlr(draws: np.ndarray, weeks: np.ndarray) -> np.ndarray:
+    """
+    Return clade proportions for samples of regression parameters.
+
+    draws has shape (sample, clade, 2) and weeks has shape (date,); the result
+    has shape (sample, date, clade).
+    """
+    eta = draws[:, None, :, 0] + draws[:, None, :, 1] * weeks[None, :, None]
+    return softmax(eta)
+
+
+def softmax(eta: np.ndarray) -> np.ndarray:
+    """Return the softmax of eta over its last axis."""
+    exp_eta = np.exp(eta - eta.max(axis=-1, keepdims=True))
+    return exp_eta / exp_eta.sum(axis=-1, keepdims=True)
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_fit_mlr():
+    """The fit recovers the growth rates of simulated clade counts."""
+    weeks = np.arange(-69, 1) / 7
+    true_beta = np.array([[0.0, 0.0], [-1.0, 0.7], [0.5, -0.3]])
+    rng = np.random.default_rng(1)
+    counts = np.array(
+        [rng.multinomial(2000, p) for p in predict_mlr(true_beta[None], weeks)[0]]
+    )
+
+    beta, cov = fit_mlr(weeks, counts)
+    # only differences between clades are identified by the data
+    slopes = beta[:, 1] - beta[0, 1]
+    assert np.allclose(slopes, true_beta[:, 1], atol=0.02)
+    fitted = predict_mlr(beta[None], weeks)[0]
+    assert np.allclose(fitted, predict_mlr(true_beta[None], weeks)[0], atol=0.01)
+    assert cov.shape == (6, 6)
+    assert np.allclose(cov, cov.T)
+    assert np.all(np.linalg.eigvalsh(cov) > 0)
+
+    # clades with no sequences have finite parameters and tiny proportions
+    counts[:, 2] = 0
+    beta, _ = fit_mlr(weeks, counts)
+    assert np.isfinite(beta).all()
+    assert predict_mlr(beta[None], weeks)[0][:, 2].max() < 0.01
+
+    # the fit is deterministic
+    assert np.array_equal(fit_mlr(weeks, counts)[0], beta)
+
+
+def test_get_national_counts(tmp_path):
+    """National counts come from the latest time series before the nowcast date."""
+    round_id = "2024-10-09"
+    for as_of, count in [("2024-10-08", 1), ("2024-10-09", 100)]:
+        ts_dir = tmp_path / f"time-series/as_of={as_of}/nowcast_date={round_id}"
+        ts_dir.mkdir(parents=True)
+        pl.DataFrame(
+            {
+                "target_date": [
+                    date(2024, 10, 9),
+                    date(2024, 10, 9),
+                    date(2024, 10, 8),
+                ],
+                "location": ["MA", "PA", "MA"],
+                "clade": ["24A", "24A", "other"],
+                "observation": [count, count, count],
+            }
+        ).write_parquet(ts_dir / "timeseries.parquet")
+
+    assert get_time_series_as_of(tmp_path, round_id) == "2024-10-08"
+    assert get_time_series_as_of(tmp_path, "2024-10-16") is None
+    counts = get_national_counts(round_id, tmp_path, ["24A", "24B", "other"], 3)
+    assert counts.tolist() == [[0, 0, 0], [0, 0, 1], [2, 0, 0]]
+
+    # rollups are used when they exist
+    rollup_dir = (
+        tmp_path
+        / f"rollups/as_of=2024-10-08/nowcast_date={round_id}/geography=national"
+    )
+    rollup_dir.mkdir(parents=True)
+    pl.DataFrame(
+        {
+            "interval": ["day", "epiweek"],
+            "target_date": [date(2024, 10, 9), date(2024, 10, 12)],
+            "clade": ["24B", "24B"],
+            "observation": [5, 5],
+        }
+    ).write_parquet(rollup_dir / "rollup.parquet")
+    counts = get_national_counts(round_id, tmp_path, ["24A", "24B", "other"], 3)
+    assert counts.tolist() == [[0, 0, 0], [0, 0, 0], [0, 5, 0]]
+
+
+def test_make_baseline_nowcast(tmp_path):
+    """The CLI writes a hub-formatted submission from the hub's target data."""
+    from click.testing import CliRunner
+
+    from sim_model_output import model_output_schema
+
+    round_id = "2024-10-09"
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [f"--nowcast-date={round_id}", f"--output-dir={tmp_path}"],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert result.return_value == [
+        tmp_path / "Hub-baseline" / f"{round_id}-Hub-baseline.parquet"
+    ]
+
+    round_tasks = get_round_tasks(round_id)
+    output = pl.read_parquet(result.return_value[0])
+    assert pq.read_schema(result.return_value[0]) == model_output_schema
+    n_cells = len(round_tasks["locations"]) * len(round_tasks["target_dates"])
+    assert output.height == n_cells * len(round_tasks["clades"]) * 101
+    samples = output.filter(output_type="sample")
+    sums = samples.group_by("location", "target_date", "output_type_id").agg(
+        pl.sum("value")
+    )
+    assert np.allclose(sums["value"], 1)
+
+    # every location has the same predictions
+    by_location = samples.with_columns(
+        sample=pl.col("output_type_id").str.slice(2)
+    ).pivot("location", index=["target_date", "clade", "sample"], values="value")
+    values = by_location.select(round_tasks["locations"]).to_numpy()
+    assert np.array_equal(values, np.repeat(values[:, :1], values.shape[1], axis=1))
+
+    # re-running a round gives the same submission
+    rerun = make_baseline_nowcast(
+        round_id, hub_root / "target-data", tmp_path / "rerun", "Hub-baseline"
+    )
+    assert pl.read_parquet(rerun).equals(output)
+
+    result = runner.invoke(main, [], standalone_mode=False)
+    assert isinstance(result.exception, click.UsageError)
+
+
+def test_make_baseline_nowcast_workers(tmp_path):
+    """With --workers, rounds are fit in worker processes and match a serial run."""
+    from click.testing import CliRunner
+
+    # target data with the time series of two rounds
+    target_data_dir = tmp_path / "target-data"
+    for as_of, round_id in [("2024-10-08", "2024-10-09"), ("2024-10-15", "2024-10-16")]:
+        round_dir = target_data_dir / "time-series" / f"as_of={as_of}"
+        round_dir.mkdir(parents=True)
+        (round_dir / f"nowcast_date={round_id}").symlink_to(
+            hub_root
+            / "target-data"
+            / "time-series"
+            / f"as_of={as_of}"
+            / f"nowcast_date={round_id}"
+        )
+
+    runner = CliRunner()
+    output_files = {}
+    for workers in [1, 2]:
+        result = runner.invoke(
+            main,
+            [
+                "--all-rounds",
+                f"--target-data-dir={target_data_dir}",
+                f"--output-dir={tmp_path / f'workers={workers}'}",
+                f"--workers={workers}",
+            ],
+            standalone_mode=False,
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0
+        output_files[workers] = result.return_value
+
+    assert [path.name for path in output_files[2]] == [
+        "2024-10-09-Hub-baseline.parquet",
+        "2024-10-16-Hub-baseline.parquet",
+    ]
+    for serial, parallel in zip(output_files[1], output_files[2]):
+        assert pl.read_parquet(parallel).equals(pl.read_parquet(serial))
@@ -0,0 +1,619 @@
+"""
+Keep a local, versioned store of filtered Nextstrain sequence metadata.
+
+get_target_data.py (sequence_as_of, nowcast date + 90 days by default) and
+get_location_date_counts.py (the round close time) need Nextstrain's sequence metadata
+as it was at a point in time. CladeTime downloads the whole metadata file of the version
+published before that time, so re-running past rounds means downloading a whole file per
+date. This store keeps one base snapshot of the filtered metadata (the output of
+cladetime's sequence.filter_metadata) and, for each later release, a delta of the
+sequences that were added, changed (e.g., re-assigned to another clade), or removed:
+
+    manifest.json                       store parameters and releases (as_of, source, changes)
+    base/collection_month=YYYY-MM/data.parquet  the first release, by collection month
+    deltas/<as_of>.parquet              strain, change, and the new values of added and changed sequences
+
+A release is the metadata as of a time (as_of), and its source is the URL of the Nextstrain
+metadata version that CladeTime read. When a release has the same source as the one before,
+nothing is downloaded and the release has no delta, so releases can be added often (e.g.,
+daily) at little cost: the store grows with the number of changed sequences, not with the
+number of releases.
+
+The filtered metadata as of a time is the base, with each sequence replaced by its latest
+change in a delta up to that time. This is exact for the as_of time of any release, and for
+times between two releases with the same source. Other times raise an error, because a new
+metadata version may have been published in between.
+
+To add releases (one per day, at 23:59:59 UTC, as get_target_data.py sets sequence_as_of):
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/metadata_store.py --start-date=YYYY-MM-DD --end-date=YYYY-MM-DD
+
+Then pass --metadata-store to get_target_data.py or get_location_date_counts.py to read
+sequence metadata from the store instead of downloading it.
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/metadata_store.py
+"""
+
+import json
+import logging
+import random
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import click
+import polars as pl
+from cladetime import CladeTime, sequence  # type: ignore
+
+from atomic_files import write_atomic
+from run_history import RunRecorder
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+default_store_dir = Path.home() / ".variant-nowcast-hub" / "metadata-store"
+
+# columns (and column order) of sequence.filter_metadata's output
+metadata_schema = {
+    "clade": pl.String,
+    "country": pl.String,
+    "date": pl.Date,
+    "strain": pl.String,
+    "host": pl.String,
+    "location": pl.String,
+}
+
+delta_schema = {"strain": pl.String, "change": pl.String} | {
+    column: dtype for column, dtype in metadata_schema.items() if column != "strain"
+}
+
+
+def get_as_of(value: datetime) -> datetime:
+    """Return a datetime in UTC, treating a naive datetime as UTC (as CladeTime does)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class MetadataStore:
+    """
+    Filtered sequence metadata as of each release, stored as a base snapshot and deltas.
+
+    collection_min_date, if set when the store is created, drops sequences collected
+    before that date, to keep the store small.
+    """
+
+    def __init__(self, store_dir: Path, collection_min_date: date | None = None):
+        self.store_dir = store_dir
+        self.collection_min_date = collection_min_date
+        self.releases: list[dict] = []
+        manifest_path = store_dir / "manifest.json"
+        if manifest_path.is_file():
+            manifest = json.loads(manifest_path.read_text())
+            saved_min_date = manifest["params"]["collection_min_date"]
+            self.collection_min_date = (
+                None if saved_min_date is None else date.fromisoformat(saved_min_date)
+            )
+            if collection_min_date is not None and (
+                collection_min_date != self.collection_min_date
+            ):
+                raise ValueError(
+                    f"The store in {store_dir} has collection_min_date {saved_min_date}"
+                )
+            self.releases = manifest["releases"]
+
+    def __repr__(self):
+        if not self.releases:
+            return f"MetadataStore({self.store_dir}, empty)"
+        return (
+            f"MetadataStore({self.store_dir}, {len(self.releases)} releases, "
+            f"{self.releases[0]['as_of']} to {self.releases[-1]['as_of']})"
+        )
+
+    @property
+    def last_release(self) -> dict | None:
+        return self.releases[-1] if self.releases else None
+
+    def add_release(
+        self,
+        as_of: datetime,
+        source: str,
+        filtered_metadata: pl.LazyFrame | pl.DataFrame | None,
+    ) -> dict:
+        """
+        Add the filtered metadata as of a time, read from source, and return the release.
+
+        Releases must be added in as_of order. filtered_metadata can be None if source is
+        the same as the last release's source (the metadata hasn't changed).
+        """
+        as_of = get_as_of(as_of)
+        last = self.last_release
+        if last is not None and as_of <= datetime.fromisoformat(last["as_of"]):
+            raise ValueError(
+                f"Releases must be added in order: {as_of.isoformat()} is not after {last['as_of']}"
+            )
+        release = {
+            "as_of": as_of.isoformat(),
+            "source": source,
+            "file": None,
+            "added": 0,
+            "changed": 0,
+            "removed": 0,
+        }
+        if last is not None and source == last["source"]:
+            logger.info(f"Release {as_of}: metadata unchanged since {last['as_of']}")
+        elif filtered_metadata is None:
+            raise ValueError(f"Release {as_of} has a new source but no metadata")
+        else:
+            metadata = self._prepare(filtered_metadata)
+            if last is None:
+                self._write_base(metadata)
+                release["added"] = metadata.height
+            else:
+                delta = self._get_delta(metadata, as_of)
+                for change in ["added", "changed", "removed"]:
+                    release[change] = delta.filter(change=change).height
+                if delta.height:
+                    release["file"] = (
+                        f"deltas/{as_of.strftime('%Y%m%dT%H%M%SZ')}.parquet"
+                    )
+                    (self.store_dir / "deltas").mkdir(exist_ok=True)
+                    write_atomic(
+                        self.store_dir / release["file"],
+                        lambda path: delta.write_parquet(path),
+                    )
+            logger.info(
+                f"Release {as_of}: {release['added']} added, {release['changed']} changed, "
+                f"{release['removed']} removed"
+            )
+        self.releases.append(release)
+        self._save_manifest()
+        return release
+
+    def _prepare(self, filtered_metadata: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
+        lf = filtered_metadata.lazy().select(metadata_schema.keys())
+        if self.collection_min_date is not None:
+            lf = lf.filter(pl.col("date") >= self.collection_min_date)
+        metadata = lf.cast(metadata_schema).collect()  # type: ignore
+        duplicated = metadata.filter(pl.col("strain").is_duplicated())
+        if duplicated.height:
+            # deltas are keyed by strain, so only one row per strain can be stored
+            logger.warning(
+                f"Keeping the first of {duplicated.height} rows with duplicate strains"
+            )
+            metadata = metadata.unique("strain", keep="first", maintain_order=True)
+        return metadata
+
+    def _write_base(self, metadata: pl.DataFrame):
+        base_dir = self.store_dir / "base"
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.store_dir) as tmp_dir:
+            for (month,), partition in metadata.group_by(
+                pl.col("date").dt.strftime("%Y-%m").alias("collection_month")
+            ):
+                partition_dir = Path(tmp_dir) / "base" / f"collection_month={month}"
+                partition_dir.mkdir(parents=True)
+                partition.write_parquet(partition_dir / "data.parquet")
+            if base_dir.exists():
+                shutil.rmtree(base_dir)
+            (Path(tmp_dir) / "base").mkdir(exist_ok=True)
+            (Path(tmp_dir) / "base").rename(base_dir)
+
+    def _get_delta(self, metadata: pl.DataFrame, as_of: datetime) -> pl.DataFrame:
+        current = self.get_filtered_metadata(
+            datetime.fromisoformat(self.releases[-1]["as_of"]),
+            collection_min_date=self.collection_min_date,
+        ).collect()
+        columns = [column for column in metadata_schema if column != "strain"]
+        added = metadata.join(current, on="strain", how="anti").with_columns(
+            change=pl.lit("added")
+        )
+        removed = (
+            current.join(metadata, on="strain", how="anti")
+            .select("strain")
+            .with_columns(change=pl.lit("removed"))
+        )
+        changed = (
+            metadata.join(current, on="strain", suffix="_previous")
+            .filter(
+                pl.any_horizontal(
+                    pl.col(column).ne_missing(pl.col(f"{column}_previous"))
+                    for column in columns
+                )
+            )
+            .with_columns(change=pl.lit("changed"))
+        )
+        return pl.concat(
+            [
+                frame.select(
+                    (
+                        pl.col(column)
+                        if column in frame.columns
+                        else pl.lit(None).alias(column)
+                    )
+                    for column in delta_schema
+                ).cast(
+                    delta_schema  # type: ignore
+                )
+                for frame in [added, changed, removed]
+            ]
+        )
+
+    def _save_manifest(self):
+        manifest = {
+            "params": {
+                "collection_min_date": (
+                    None
+                    if self.collection_min_date is None
+                    else self.collection_min_date.isoformat()
+                )
+            },
+            "releases": self.releases,
+        }
+        write_atomic(
+            self.store_dir / "manifest.json",
+            lambda path: path.write_text(json.dumps(manifest, indent=4)),
+        )
+
+    def get_release(self, as_of: datetime) -> int:
+        """
+        Return the index of the release that has the metadata as of a time.
+
+        Raises a ValueError if the metadata as of that time isn't known: it's before the
+        first release, after the last, or between two releases with different sources.
+        """
+        as_of = get_as_of(as_of)
+        times = [datetime.fromisoformat(release["as_of"]) for release in self.releases]
+        if not times or not times[0] <= as_of <= times[-1]:
+            raise ValueError(
+                f"{self} doesn't have metadata as of {as_of.isoformat()}; add a release"
+            )
+        index = max(i for i, time in enumerate(times) if time <= as_of)
+        if times[index] < as_of and (
+            self.releases[index]["source"] != self.releases[index + 1]["source"]
+        ):
+            raise ValueError(
+                f"Metadata changed between releases {times[index].isoformat()} and "
+                f"{times[index + 1].isoformat()}; add a release as of {as_of.isoformat()}"
+            )
+        return index
+
+    def get_filtered_metadata(
+        self,
+        as_of: datetime,
+        collection_min_date: datetime | date | None = None,
+        collection_max_date: datetime | date | None = None,
+    ) -> pl.LazyFrame:
+        """
+        Return the filtered sequence metadata as of a time.
+
+        The result is the same as sequence.filter_metadata(CladeTime(sequence_as_of=as_of)
+        .sequence_metadata, collection_min_date, collection_max_date), except that rows
+        may be in a different order. Base partitions outside the collection dates aren't
+        read.
+        """
+        index = self.get_release(as_of)
+        min_date = _get_day(collection_min_date)
+        max_date = _get_day(collection_max_date)
+        if self.collection_min_date is not None and (
+            min_date is None or min_date < self.collection_min_date
+        ):
+            raise ValueError(
+                f"The store only has sequences collected on or after {self.collection_min_date}"
+            )
+
+        delta_files = [
+            self.store_dir / release["file"]
+            for release in self.releases[1 : index + 1]
+            if release["file"] is not None
+        ]
+        latest = (
+            pl.concat(
+                [pl.read_parquet(path) for path in delta_files],
+                how="vertical",
+            ).unique("strain", keep="last", maintain_order=True)
+            if delta_files
+            else pl.DataFrame(schema=delta_schema)
+        )
+
+        base = pl.scan_parquet(
+            self.store_dir / "base" / "**" / "*.parquet",
+            hive_partitioning=True,
+            hive_schema={"collection_month": pl.String},
+        )
+        if min_date is not None:
+            base = base.filter(pl.col("collection_month") >= min_date.strftime("%Y-%m"))
+        if max_date is not None:
+            base = base.filter(pl.col("collection_month") <= max_date.strftime("%Y-%m"))
+        metadata = pl.concat(
+            [
+                base.select(metadata_schema.keys()).join(
+                    latest.lazy().select("strain"), on="strain", how="anti"
+                ),
+                latest.lazy()
+                .filter(pl.col("change") != "removed")
+                .select(metadata_schema.keys()),
+            ]
+        )
+        if min_date is not None:
+            metadata = metadata.filter(pl.col("date") >= min_date)
+        if max_date is not None:
+            metadata = metadata.filter(pl.col("date") <= max_date)
+        return metadata
+
+
+def _get_day(value: datetime | date | None) -> date | None:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def get_release_times(
+    start_date: datetime | None, end_date: datetime | None, as_of: tuple[datetime, ...]
+) -> list[datetime]:
+    """Return 23:59:59 UTC on each day from start_date to end_date, plus as_of, in order."""
+    times = {get_as_of(time) for time in as_of}
+    if start_date is not None:
+        day = start_date.date()
+        while day <= (end_date or start_date).date():
+            times.add(
+                datetime(day.year, day.month, day.day, 23, 59, 59, tzinfo=timezone.utc)
+            )
+            day += timedelta(days=1)
+    return sorted(times)
+
+
+@click.command()
+@click.option(
+    "--store-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=default_store_dir,
+    show_default=True,
+    help="Directory of the metadata store.",
+)
+@click.option(
+    "--start-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Add a release as of 23:59:59 UTC on each day from this date (YYYY-MM-DD) to --end-date.",
+)
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Last day to add a release for (YYYY-MM-DD). Default is --start-date.",
+)
+@click.option(
+    "--as-of",
+    type=click.DateTime(formats=["%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S"]),
+    multiple=True,
+    help="Also add a release as of this time (e.g., a round close time; UTC if no offset is given). Can be repeated.",
+)
+@click.option(
+    "--collection-min-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="For a new store: only keep sequences collected on or after this date (YYYY-MM-DD).",
+)
+def main(
+    store_dir: Path,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    as_of: tuple[datetime, ...],
+    collection_min_date: datetime | None,
+) -> MetadataStore:
+    if start_date is None and end_date is not None:
+        raise click.UsageError("--end-date requires --start-date")
+    times = get_release_times(start_date, end_date, as_of)
+    if not times:
+        raise click.UsageError("Use --start-date or --as-of to choose releases to add")
+    if any(time > datetime.now(timezone.utc) for time in times):
+        raise click.UsageError("Releases can't be added for times in the future")
+
+    try:
+        store = MetadataStore(
+            store_dir, collection_min_date.date() if collection_min_date else None
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    last = store.last_release
+    if last is not None:
+        skipped = [t for t in times if t <= datetime.fromisoformat(last["as_of"])]
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} releases already in {store}")
+        times = [t for t in times if t not in skipped]
+
+    with RunRecorder(
+        "metadata_store", params={"releases": [t.isoformat() for t in times]}
+    ) as run:
+        for time in times:
+            ct = CladeTime(sequence_as_of=time)
+            last = store.last_release
+            with run.stage("add_release"):
+                if last is not None and ct.url_sequence_metadata == last["source"]:
+                    store.add_release(time, ct.url_sequence_metadata, None)
+                else:
+                    store.add_release(
+                        time,
+                        ct.url_sequence_metadata,
+                        sequence.filter_metadata(ct.sequence_metadata),
+                    )
+        run.count("releases_added", len(times))
+
+    logger.info(f"Metadata store: {store}")
+    return store
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def get_test_releases(releases: int = 6, seed: int = 0) -> list[pl.DataFrame]:
+    """Return filtered metadata for a series of releases, with sequences added, changed and removed."""
+    rng = random.Random(seed)
+    clades = ["24A", "24B", "24C", "25A"]
+    start = date(2025, 1, 1)
+    rows = {
+        f"USA/{i}": [rng.choice(clades), start + timedelta(days=rng.randrange(120))]
+        for i in range(300)
+    }
+    next_strain = len(rows)
+    metadata = []
+    for _ in range(releases):
+        metadata.append(
+            pl.DataFrame(
+                [
+                    (clade, "USA", day, strain, "Homo sapiens", "MA")
+                    for strain, (clade, day) in rows.items()
+                ],
+                schema=metadata_schema,
+                orient="row",
+            )
+        )
+        for strain in rng.sample(sorted(rows), 30):
+            rows[strain][0] = rng.choice(clades)
+        for strain in rng.sample(sorted(rows), 10):
+            del rows[strain]
+        for _ in range(20):
+            rows[f"USA/{next_strain}"] = [
+                rng.choice(clades),
+                start + timedelta(days=rng.randrange(150)),
+            ]
+            next_strain += 1
+    return metadata
+
+
+def sort_metadata(metadata: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
+    return metadata.lazy().collect().sort("strain")
+
+
+def test_metadata_store(tmp_path):
+    """Every release's metadata is rebuilt exactly from the base and deltas."""
+    releases = get_test_releases()
+    store = MetadataStore(tmp_path)
+    times = [
+        datetime(2025, 5, 1, tzinfo=timezone.utc) + timedelta(days=i) for i in range(6)
+    ]
+    for i, (time, metadata) in enumerate(zip(times, releases)):
+        release = store.add_release(time, f"version-{i}", metadata.lazy())
+        if i:
+            assert (release["added"], release["changed"], release["removed"]) == (
+                20,
+                release["changed"],
+                10,
+            )
+            assert 0 < release["changed"] <= 30
+
+    # the saved manifest is read back
+    store = MetadataStore(tmp_path)
+    assert len(store.releases) == 6
+    for time, metadata in zip(times, releases):
+        assert sort_metadata(store.get_filtered_metadata(time)).equals(
+            sort_metadata(metadata)
+        )
+
+    # collection date filters match sequence.filter_metadata's
+    min_date, max_date = date(2025, 2, 10), date(2025, 3, 20)
+    expected = releases[3].filter(pl.col("date").is_between(min_date, max_date))
+    result = store.get_filtered_metadata(
+        times[3],
+        datetime.combine(min_date, datetime.min.time(), tzinfo=timezone.utc),
+        max_date,
+    )
+    assert sort_metadata(result).equals(sort_metadata(expected))
+
+    # deltas are a fraction of the size of the releases they replace
+    delta_rows = sum(pl.read_parquet(path).height for path in tmp_path.glob("deltas/*"))
+    assert delta_rows < sum(release.height for release in releases[1:]) / 4
+
+
+def test_release_times(tmp_path):
+    """Times between releases are answered only if the metadata didn't change."""
+    import pytest
+
+    releases = get_test_releases(2)
+    store = MetadataStore(tmp_path, collection_min_date=date(2025, 2, 1))
+    first = datetime(2025, 5, 1, 23, 59, 59, tzinfo=timezone.utc)
+    store.add_release(first, "version-0", releases[0])
+    store.add_release(first + timedelta(days=1), "version-0", None)
+    store.add_release(first + timedelta(days=2), "version-1", releases[1])
+    assert store.releases[1]["file"] is None
+
+    # naive datetimes are UTC
+    assert store.get_release(datetime(2025, 5, 2, 12)) == 0
+    assert store.get_release(first + timedelta(days=2)) == 2
+    with pytest.raises(ValueError, match="Metadata changed between releases"):
+        store.get_release(first + timedelta(days=1, hours=1))
+    with pytest.raises(ValueError, match="add a release"):
+        store.get_release(first + timedelta(days=3))
+    with pytest.raises(ValueError, match="in order"):
+        store.add_release(first, "version-1", releases[1])
+
+    # sequences collected before the store's collection_min_date aren't kept
+    expected = releases[1].filter(pl.col("date") >= date(2025, 2, 1))
+    result = store.get_filtered_metadata(
+        first + timedelta(days=2), collection_min_date=date(2025, 2, 1)
+    )
+    assert sort_metadata(result).equals(sort_metadata(expected))
+    with pytest.raises(ValueError, match="only has sequences collected on or after"):
+        store.get_filtered_metadata(first + timedelta(days=2))
+    with pytest.raises(ValueError, match="collection_min_date"):
+        MetadataStore(tmp_path, collection_min_date=date(2025, 1, 1))
+
+
+def test_main(tmp_path, monkeypatch, cladetime_snapshot):
+    """The CLI adds daily releases, downloading metadata only when its source changes."""
+    monkeypatch.setenv("RUN_HISTORY_DIR", str(tmp_path / "run-history"))
+    store = main(
+        [
+            "--store-dir",
+            str(tmp_path / "store"),
+            "--start-date",
+            "2025-12-01",
+            "--end-date",
+            "2025-12-02",
+            "--as-of",
+            "2025-12-01T01:00:00",
+        ],
+        standalone_mode=False,
+    )
+    assert [release["as_of"] for release in store.releases] == [
+        "2025-12-01T01:00:00+00:00",
+        "2025-12-01T23:59:59+00:00",
+        "2025-12-02T23:59:59+00:00",
+    ]
+    assert [release["added"] for release in store.releases] == [
+        sort_metadata(
+            sequence.filter_metadata(cladetime_snapshot().sequence_metadata)
+        ).height,
+        0,
+        0,
+    ]
+    result = store.get_filtered_metadata(datetime(2025, 12, 2, 12))
+    expected = sequence.filter_metadata(cladetime_snapshot().sequence_metadata)
+    assert sort_metadata(result).equals(sort_metadata(expected))
+
+    # releases already in the store are skipped
+    store = main(
+        ["--store-dir", str(tmp_path / "store"), "--start-date", "2025-12-02"],
+        standalone_mode=False,
+    )
+    assert len(store.releases) == 3
@@ -0,0 +1,592 @@
+"""
+Monitor which clades would be on the modeled-clade list, one daily sequence snapshot at a time.
+
+get_clades_to_model.py builds the list of clades to model once a week, recomputing weekly
+clade counts and proportions over the whole threshold window from Nextstrain's sequence
+metadata. This script applies the same rules (threshold, threshold_weeks, max_clades) to
+each day's sequence metadata between rounds, so we can see emerging clades as they cross
+the threshold.
+
+The monitor keeps weekly counts by clade, and weekly totals, for the sequences in the
+current threshold window. Each new snapshot is compared to the sequences already counted:
+only sequences that were added, removed, or re-assigned to a different clade change the
+weekly counts, and the list is then re-evaluated from those counts. Each time a clade
+would enter or leave the list, an event is added to the monitor's history.
+
+The monitor's state is saved to --state-dir after every snapshot, so a daily run picks up
+where the last one left off:
+
+    state.json      parameters, threshold window, current clade list, and weekly counts
+    sequences.parquet   strain, clade, and collection date of the counted sequences
+    history.csv     one row for each time a clade entered or left the list
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo: uv run --with-requirements src/requirements.txt src/monitor_clade_prevalence.py --start-date=YYYY-MM-DD --end-date=YYYY-MM-DD
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/monitor_clade_prevalence.py
+"""
+
+import json
+import logging
+import random
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import click
+import polars as pl
+from cladetime import CladeTime, sequence  # type: ignore
+
+from atomic_files import write_atomic
+from get_clades_to_model import get_clade_proportions, get_clades, select_clades
+from run_history import RunRecorder
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+default_state_dir = Path.home() / ".variant-nowcast-hub" / "clade-monitor"
+
+sequence_schema = {"strain": pl.String, "clade": pl.String, "date": pl.Date}
+
+history_schema = {
+    "snapshot": pl.Date,
+    "max_collection_date": pl.Date,
+    "clade": pl.String,
+    "change": pl.String,
+    "window_sequences": pl.Int64,
+    "max_weekly_proportion": pl.Float64,
+}
+
+
+class CladePrevalenceMonitor:
+    """
+    Apply get_clades' clade-list rules to a series of sequence metadata snapshots.
+
+    week_counts maps (clade, week) to the number of sequences in the threshold window,
+    where week is the Sunday that starts the week (as in get_clades' weekly rollup), and
+    week_totals maps each week to its total sequences. Both only include sequences
+    collected on or after window_start.
+
+    Example
+    -------
+    >>> monitor = CladePrevalenceMonitor(threshold=0.01, threshold_weeks=3, max_clades=9)
+    >>> for as_of in snapshot_dates:
+    >>>     ct = CladeTime(sequence_as_of=as_of)
+    >>>     events = monitor.update(as_of, sequence.filter_metadata(ct.sequence_metadata))
+    >>> monitor.clades
+    """
+
+    def __init__(
+        self, threshold: float = 0.01, threshold_weeks: int = 3, max_clades: int = 9
+    ):
+        self.threshold = threshold
+        self.threshold_weeks = threshold_weeks
+        self.max_clades = max_clades
+        self.sequences = pl.DataFrame(schema=sequence_schema)
+        self.week_counts: dict[tuple[str, date], int] = {}
+        self.week_totals: dict[date, int] = {}
+        self.window_start: date | None = None
+        self.max_day: date | None = None
+        self.last_snapshot: date | None = None
+        self.clades: list[str] = []
+        self.history: list[dict] = []
+
+    @property
+    def params(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "threshold_weeks": self.threshold_weeks,
+            "max_clades": self.max_clades,
+        }
+
+    def get_window_start(self, max_day: date) -> date:
+        """Return the earliest collection date counted by get_clades for max_day."""
+        return max_day - timedelta(days=max_day.weekday() + 7 * self.threshold_weeks)
+
+    def update(
+        self, snapshot: date, filtered_metadata: pl.LazyFrame | pl.DataFrame
+    ) -> list[dict]:
+        """
+        Apply a sequence metadata snapshot and return the clade list changes it causes.
+
+        filtered_metadata is the snapshot's sequence metadata after
+        sequence.filter_metadata (the same input as get_clades).
+        """
+        lf = filtered_metadata.lazy()
+        max_day = lf.select(pl.max("date")).collect().item()
+        if max_day is None:
+            logger.warning(f"Snapshot {snapshot} has no sequences, skipping")
+            return []
+
+        window_start = self.get_window_start(max_day)
+        if self.window_start is not None and window_start < self.window_start:
+            # sequences before the current window were not kept, so the counts can't be
+            # moved back; this only happens if the latest sequences are withdrawn
+            logger.info(
+                f"Threshold window moved back to {window_start}, recounting snapshot {snapshot}"
+            )
+            self.sequences = pl.DataFrame(schema=sequence_schema)
+            self.week_counts = {}
+            self.week_totals = {}
+
+        # sequences without a clade can't be modeled (get_clades fails on them)
+        sequences = (
+            lf.filter(pl.col("date") >= window_start, pl.col("clade").is_not_null())
+            .select("strain", "clade", "date")
+            .cast(sequence_schema)  # type: ignore
+            .collect()
+        )
+        keys = ["strain", "clade", "date"]
+        changes = pl.concat(
+            [
+                sequences.join(self.sequences, on=keys, how="anti").with_columns(
+                    change=pl.lit(1)
+                ),
+                self.sequences.join(sequences, on=keys, how="anti").with_columns(
+                    change=pl.lit(-1)
+                ),
+            ]
+        )
+        week_changes = (
+            changes.group_by(
+                "clade",
+                # weeks start on Sunday (polars weekdays are Monday=1 ... Sunday=7)
+                week=pl.col("date") - pl.duration(days=pl.col("date").dt.weekday() % 7),
+            )
+            .agg(pl.col("change").sum())
+            .filter(pl.col("change") != 0)
+        )
+        for clade, week, change in week_changes.iter_rows():
+            self._add(clade, week, change)
+
+        self.sequences = sequences
+        self.window_start = window_start
+        self.max_day = max_day
+        self.last_snapshot = snapshot
+
+        logger.info(
+            f"Snapshot {snapshot}: {changes.height} changed sequences, "
+            f"max collection date {max_day}"
+        )
+        return self._update_clades()
+
+    def _add(self, clade: str, week: date, change: int):
+        count = self.week_counts.get((clade, week), 0) + change
+        if count:
+            self.week_counts[(clade, week)] = count
+        else:
+            del self.week_counts[(clade, week)]
+        total = self.week_totals.get(week, 0) + change
+        if total:
+            self.week_totals[week] = total
+        else:
+            del self.week_totals[week]
+
+    def get_proportions(self) -> pl.LazyFrame:
+        """
+        Return weekly clade proportions in the threshold window, as get_clades' prop_dat.
+
+        The weekly counts have a row for each clade and week, so this is the same size as
+        the list of clades, no matter how many sequences the window has.
+        """
+        weekly_counts = pl.LazyFrame(
+            [(clade, week, count) for (clade, week), count in self.week_counts.items()],
+            schema={"clade": pl.String, "date": pl.Date, "count": pl.UInt32},
+            orient="row",
+        )
+        return get_clade_proportions(weekly_counts)
+
+    def _update_clades(self) -> list[dict]:
+        prop_dat = self.get_proportions()
+        clades = select_clades(prop_dat, self.threshold, self.max_clades)
+        clade_stats = {
+            clade: (count, proportion)
+            for clade, count, proportion in prop_dat.group_by("clade")
+            .agg(pl.col("count").sum(), pl.col("proportion").max())
+            .collect()
+            .iter_rows()
+        }
+        changes = [(clade, "entered") for clade in clades if clade not in self.clades]
+        changes += [(clade, "left") for clade in self.clades if clade not in clades]
+        events = [
+            {
+                "snapshot": self.last_snapshot,
+                "max_collection_date": self.max_day,
+                "clade": clade,
+                "change": change,
+                "window_sequences": clade_stats.get(clade, (0, 0.0))[0],
+                "max_weekly_proportion": clade_stats.get(clade, (0, 0.0))[1],
+            }
+            for clade, change in sorted(changes)
+        ]
+        for event in events:
+            logger.info(
+                f"Clade {event['clade']} {event['change']} the list "
+                f"(snapshot {self.last_snapshot})"
+            )
+        self.clades = clades
+        self.history.extend(events)
+        return events
+
+    def get_history(self) -> pl.DataFrame:
+        """Return the clade list changes as a DataFrame."""
+        return pl.DataFrame(self.history, schema=history_schema)
+
+    def save(self, state_dir: Path):
+        """Save the monitor's state to state_dir."""
+        state_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "params": self.params,
+            "window_start": _isoformat(self.window_start),
+            "max_day": _isoformat(self.max_day),
+            "last_snapshot": _isoformat(self.last_snapshot),
+            "clades": self.clades,
+            "week_counts": [
+                [clade, week.isoformat(), count]
+                for (clade, week), count in sorted(
+                    self.week_counts.items(), key=lambda item: (item[0][1], item[0][0])
+                )
+            ],
+        }
+        write_atomic(
+            state_dir / "sequences.parquet",
+            lambda path: self.sequences.write_parquet(path),
+        )
+        write_atomic(
+            state_dir / "history.csv", lambda path: self.get_history().write_csv(path)
+        )
+        # state.json is written last: it's what load() checks for
+        write_atomic(
+            state_dir / "state.json",
+            lambda path: path.write_text(json.dumps(state, indent=4)),
+        )
+
+    @classmethod
+    def load(cls, state_dir: Path) -> "CladePrevalenceMonitor":
+        """Return a monitor with the state saved in state_dir."""
+        state = json.loads((state_dir / "state.json").read_text())
+        monitor = cls(**state["params"])
+        monitor.window_start = _fromisoformat(state["window_start"])
+        monitor.max_day = _fromisoformat(state["max_day"])
+        monitor.last_snapshot = _fromisoformat(state["last_snapshot"])
+        monitor.clades = state["clades"]
+        for clade, week, count in state["week_counts"]:
+            monitor._add(clade, date.fromisoformat(week), count)
+        monitor.sequences = pl.read_parquet(state_dir / "sequences.parquet").cast(
+            sequence_schema  # type: ignore
+        )
+        monitor.history = pl.read_csv(
+            state_dir / "history.csv", schema=history_schema
+        ).to_dicts()
+        return monitor
+
+
+def _isoformat(value: date | None) -> str | None:
+    return None if value is None else value.isoformat()
+
+
+def _fromisoformat(value: str | None) -> date | None:
+    return None if value is None else date.fromisoformat(value)
+
+
+@click.command()
+@click.option(
+    "--start-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Date of the first daily sequence snapshot to apply (YYYY-MM-DD). Default is the day after the monitor's last snapshot, or --end-date for a new monitor.",
+)
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Date of the last daily sequence snapshot to apply (YYYY-MM-DD). Default is today.",
+)
+@click.option(
+    "--state-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=default_state_dir,
+    show_default=True,
+    help="Directory where the monitor's state and history are saved.",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=0.01,
+    show_default=True,
+    help="Weekly proportion a clade must exceed.",
+)
+@click.option(
+    "--threshold-weeks",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Number of weeks before the latest collection week to consider.",
+)
+@click.option(
+    "--max-clades",
+    type=click.IntRange(min=1),
+    default=9,
+    show_default=True,
+    help="Maximum number of clades on the list.",
+)
+@click.option(
+    "--reset",
+    is_flag=True,
+    default=False,
+    help="Discard any saved state and start a new monitor.",
+)
+def main(
+    start_date: datetime | None,
+    end_date: datetime | None,
+    state_dir: Path,
+    threshold: float,
+    threshold_weeks: int,
+    max_clades: int,
+    reset: bool,
+) -> CladePrevalenceMonitor:
+    monitor = CladePrevalenceMonitor(threshold, threshold_weeks, max_clades)
+    if (state_dir / "state.json").exists() and not reset:
+        saved = CladePrevalenceMonitor.load(state_dir)
+        if saved.params != monitor.params:
+            raise click.UsageError(
+                f"The monitor in {state_dir} uses {saved.params}; use --reset to start over with new parameters"
+            )
+        monitor = saved
+
+    end = (end_date or datetime.now(timezone.utc)).date()
+    if start_date is not None:
+        start = start_date.date()
+    elif monitor.last_snapshot is not None:
+        start = monitor.last_snapshot + timedelta(days=1)
+    else:
+        start = end
+    snapshots = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    if not snapshots:
+        logger.info(
+            f"The monitor is up to date (last snapshot {monitor.last_snapshot})"
+        )
+        return monitor
+
+    run_params = {
+        **monitor.params,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+    }
+    with RunRecorder("monitor_clade_prevalence", params=run_params) as run:
+        events = 0
+        for snapshot in snapshots:
+            with run.stage("apply_snapshot"):
+                ct = CladeTime(sequence_as_of=snapshot.isoformat())
+                events += len(
+                    monitor.update(
+                        snapshot, sequence.filter_metadata(ct.sequence_metadata)
+                    )
+                )
+            # save after each snapshot, so an interrupted catch-up resumes where it stopped
+            with run.stage("save_state"):
+                monitor.save(state_dir)
+        run.count("snapshots", len(snapshots))
+        run.count("clade_list_changes", events)
+
+    logger.info(f"Clade list as of {monitor.last_snapshot}: {monitor.clades}")
+    logger.info(f"Monitor state saved to {state_dir}")
+    return monitor
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+def get_test_snapshots(days: int = 21, seed: int = 0) -> list[pl.DataFrame]:
+    """
+    Return a series of daily snapshots of filtered sequence metadata.
+
+    Each snapshot adds sequences (some backfilled from earlier weeks), and a few
+    sequences are withdrawn or re-assigned to another clade, as happens between
+    Nextstrain runs. Clade 25C emerges partway through.
+    """
+    rng = random.Random(seed)
+    clades = ["23A", "24E", "24F", "25A", "25B"]
+    first_day = date(2025, 8, 1)
+    strains: dict[str, tuple[str, date]] = {}
+    snapshots = []
+    for day in range(days):
+        latest = first_day + timedelta(days=35 + day)
+        for _ in range(rng.randint(20, 60)):
+            collection_date = latest - timedelta(days=min(rng.expovariate(0.1), 45))
+            clade = rng.choice(clades + ["25C"] * (day // 3))
+            strains[f"USA/{len(strains)}/2025"] = (clade, collection_date)
+        for strain in rng.sample(sorted(strains), 3):
+            if rng.random() < 0.5:
+                del strains[strain]
+            else:
+                strains[strain] = (rng.choice(clades), strains[strain][1])
+        snapshots.append(
+            pl.DataFrame(
+                {
+                    "clade": [clade for clade, _ in strains.values()],
+                    "country": "USA",
+                    "date": [
+                        collection_date for _, collection_date in strains.values()
+                    ],
+                    "strain": list(strains),
+                    "host": "Homo sapiens",
+                    "location": "MA",
+                }
+            )
+        )
+    return snapshots
+
+
+def test_monitor_matches_get_clades():
+    """The monitor's clade list matches get_clades for every snapshot."""
+    snapshots = get_test_snapshots()
+    for params in [(0.01, 3, 9), (0.1, 3, 9), (0.01, 2, 3), (0.3, 1, 2)]:
+        monitor = CladePrevalenceMonitor(*params)
+        for day, snapshot in enumerate(snapshots):
+            monitor.update(date(2025, 9, 5) + timedelta(days=day), snapshot)
+            expected, _ = get_clades(snapshot.lazy(), *params)
+            assert monitor.clades == expected, (params, day)
+
+        # the weekly counts are the same as counting the last snapshot from scratch
+        recounted = CladePrevalenceMonitor(*params)
+        recounted.update(monitor.last_snapshot, snapshots[-1])
+        assert recounted.week_counts == monitor.week_counts
+        assert recounted.week_totals == monitor.week_totals
+        assert min(monitor.week_totals) >= monitor.window_start - timedelta(days=1)
+
+
+def test_monitor_history():
+    """Clades entering and leaving the list are recorded in the history."""
+    monitor = CladePrevalenceMonitor(threshold=0.2, threshold_weeks=0, max_clades=9)
+    sunday = date(2025, 10, 5)
+
+    def snapshot(clade_counts: dict[str, int]) -> pl.DataFrame:
+        clades = [clade for clade, n in clade_counts.items() for _ in range(n)]
+        return pl.DataFrame(
+            {
+                "strain": [f"{clade}/{i}" for i, clade in enumerate(clades)],
+                "clade": clades,
+                "date": sunday + timedelta(days=1),
+            }
+        )
+
+    assert monitor.update(sunday, snapshot({"24F": 9, "25A": 1})) == [
+        {
+            "snapshot": sunday,
+            "max_collection_date": sunday + timedelta(days=1),
+            "clade": "24F",
+            "change": "entered",
+            "window_sequences": 9,
+            "max_weekly_proportion": 0.9,
+        }
+    ]
+    # new sequences only: 25A crosses the threshold
+    assert [
+        (event["clade"], event["change"])
+        for event in monitor.update(sunday, snapshot({"24F": 9, "25A": 3}))
+    ] == [("25A", "entered")]
+    assert monitor.update(sunday, snapshot({"24F": 9, "25A": 3})) == []
+    # sequences reassigned from 24F to 25A push 24F under the threshold
+    assert [
+        (event["clade"], event["change"])
+        for event in monitor.update(sunday, snapshot({"24F": 2, "25A": 10}))
+    ] == [("24F", "left")]
+    assert monitor.clades == ["25A"]
+    history = monitor.get_history()
+    assert history.select("clade", "change").rows() == [
+        ("24F", "entered"),
+        ("25A", "entered"),
+        ("24F", "left"),
+    ]
+
+    # a new week moves the threshold window: last week's sequences no longer count
+    next_week = pl.DataFrame(
+        {
+            "strain": ["new/0", "new/1"],
+            "clade": ["25B", "25B"],
+            "date": sunday + timedelta(days=8),
+        }
+    )
+    events = monitor.update(
+        sunday + timedelta(days=8), pl.concat([snapshot({"25A": 10}), next_week])
+    )
+    assert [(event["clade"], event["change"]) for event in events] == [
+        ("25A", "left"),
+        ("25B", "entered"),
+    ]
+    assert monitor.week_totals == {sunday + timedelta(days=7): 2}
+    assert monitor.sequences.height == 2
+
+
+def test_monitor_save_load(tmp_path):
+    """A saved monitor continues from where it left off."""
+    snapshots = get_test_snapshots(days=10)
+    monitor = CladePrevalenceMonitor(0.05, 3, 4)
+    for day, snapshot in enumerate(snapshots[:5]):
+        monitor.update(date(2025, 9, 5) + timedelta(days=day), snapshot)
+    monitor.save(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "history.csv",
+        "sequences.parquet",
+        "state.json",
+    ]
+
+    loaded = CladePrevalenceMonitor.load(tmp_path)
+    assert loaded.params == monitor.params
+    assert loaded.week_counts == monitor.week_counts
+    assert loaded.week_totals == monitor.week_totals
+    assert loaded.get_history().equals(monitor.get_history())
+    assert loaded.sequences.equals(monitor.sequences)
+    for day, snapshot in enumerate(snapshots[5:], start=5):
+        snapshot_date = date(2025, 9, 5) + timedelta(days=day)
+        assert loaded.update(snapshot_date, snapshot) == monitor.update(
+            snapshot_date, snapshot
+        )
+    assert loaded.clades == monitor.clades
+
+
+def test_main_snapshot(cladetime_snapshot, monkeypatch, tmp_path):
+    """Run the monitor on the CladeTime test snapshot."""
+    monkeypatch.setenv("RUN_HISTORY_DIR", str(tmp_path / "run-history"))
+    state_dir = tmp_path / "monitor"
+    args = ["--state-dir", str(state_dir), "--start-date", "2025-12-01", "--end-date"]
+    monitor = main(args + ["2025-12-02"], standalone_mode=False)
+
+    expected, _ = get_clades(
+        sequence.filter_metadata(cladetime_snapshot().sequence_metadata), 0.01, 3, 9
+    )
+    assert monitor.clades == expected
+    assert monitor.last_snapshot == date(2025, 12, 2)
+    history = pl.read_csv(state_dir / "history.csv")
+    assert sorted(history["clade"]) == expected
+    assert set(history["snapshot"]) == {"2025-12-01"}
+
+    # the next run starts after the last snapshot
+    monitor = main(
+        ["--state-dir", str(state_dir), "--end-date", "2025-12-03"],
+        standalone_mode=False,
+    )
+    assert monitor.last_snapshot == date(2025, 12, 3)
+    assert pl.read_csv(state_dir / "history.csv").height == history.height
+
+    with pytest.raises(click.UsageError):
+        main(args + ["2025-12-04", "--max-clades", "2"], standalone_mode=False)
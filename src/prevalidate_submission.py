@@ -0,0 +1,685 @@
+"""
+Run fast structural checks on the model output files changed by a pull request.
+
+The hub's full validation (hubValidations, in the validate-submission
+workflow) runs in R, one file at a time. This script runs a subset of its
+checks in Python, in parallel, so that submissions with structural problems
+fail within seconds, and the R validation only runs when these checks pass:
+
+- file: the file name matches the team directory and a modeling round
+- schema: the file has the hub's columns, and their values can be cast to the
+  hub's types
+- task IDs: nowcast_date, target_date, location, output_type, and
+  output_type_id values are valid for the round, values are between 0 and 1,
+  and sample tasks have the required number of samples
+- clades: each mean and sample has exactly the round's modeled clades
+- sum to one: each mean and sample's clade proportions sum to one (within
+  the same tolerance as src/validations/R/clade_prop_sum_one.R)
+
+Files are compared to their version on the base branch (--base-ref). When a
+team resubmits a file, only the tasks that contain added, changed, or
+removed rows are checked. The file, schema, and sample count checks always
+apply to the whole file, since a sample count depends on every sample for a
+location and target date.
+
+By default, the script stops at the first file that fails (--fail-fast) and
+exits with an error after printing a concise report of the problems found.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo, on a branch with new or changed model output:
+uv run --with-requirements src/requirements.txt src/prevalidate_submission.py --base-ref=origin/main
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/prevalidate_submission.py
+"""
+
+import io
+import json
+import logging
+import os
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+
+import click
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sim_model_output import (
+    get_model_output_table,
+    get_round_tasks,
+    model_output_schema,
+)
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# rows with the same values in these columns are one mean or sample
+group_columns = ["location", "target_date", "output_type", "output_type_id"]
+
+# same tolerance as ALL_ONE in src/validations/R/clade_prop_sum_one.R
+sum_one_tolerance = 1e-3
+
+# number of example rows shown for each failed check
+max_examples = 3
+
+
+@click.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--base-ref",
+    type=str,
+    default="origin/main",
+    show_default=True,
+    help="Git ref that the pull request will be merged into. Files are compared to their version on this ref.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    show_default=True,
+    help="Number of files checked at once.",
+)
+@click.option(
+    "--fail-fast/--no-fail-fast",
+    default=True,
+    show_default=True,
+    help="Stop checking files after the first file that fails.",
+)
+def main(files: tuple[str, ...], base_ref: str, workers: int, fail_fast: bool):
+    """
+    Check model output FILES (default: the model output files that differ from
+    --base-ref).
+    """
+    if not files:
+        files = tuple(get_changed_files(base_ref))
+    if not files:
+        logger.info(f"No model output files changed since {base_ref}")
+        return
+
+    results = prevalidate_files(list(files), base_ref, workers, fail_fast)
+    report = format_report(results)
+    print(report)
+    if summary_file := os.environ.get("GITHUB_STEP_SUMMARY"):
+        with open(summary_file, "a") as f:
+            f.write(f"## Pre-validation\n\n```\n{report}\n```\n")
+
+    failed = [r for r in results if r["problems"]]
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(files)} files failed pre-validation"
+        )
+
+
+def get_changed_files(base_ref: str, repo: Path = hub_root) -> list[str]:
+    """Return model output files that were added or modified since base_ref."""
+    result = subprocess.run(
+        [
+            "git",
+            "diff",
+            "--name-only",
+            "--diff-filter=AMR",
+            f"{base_ref}...HEAD",
+            "--",
+            "model-output/*.parquet",
+        ],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [str(repo / f) for f in result.stdout.splitlines()]
+
+
+def read_base_version(file: Path, base_ref: str | None) -> pa.Table | None:
+    """
+    Return a file's contents on base_ref, or None if it doesn't exist there.
+
+    Raises subprocess.CalledProcessError if file isn't in a git repository or
+    base_ref isn't a valid ref.
+    """
+    if base_ref is None:
+        return None
+    file = file.resolve()
+    repo = Path(
+        subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=file.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    )
+    path = file.relative_to(repo).as_posix()
+
+    # ls-tree fails for an invalid ref, and lists nothing if the path isn't on it
+    listed = subprocess.run(
+        ["git", "ls-tree", "--name-only", base_ref, "--", path],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    if not listed.strip():
+        return None
+    result = subprocess.run(
+        ["git", "show", f"{base_ref}:{path}"],
+        cwd=repo,
+        capture_output=True,
+        check=True,
+    )
+    return pq.read_table(io.BytesIO(result.stdout))
+
+
+def prevalidate_files(
+    files: list[str], base_ref: str | None, workers: int, fail_fast: bool
+) -> list[dict]:
+    """
+    Check files in a process pool and return each checked file's problems.
+    With fail_fast, files that haven't started when a file fails are skipped.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(prevalidate_file, Path(f), base_ref) for f in files}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results.extend(future.result() for future in done)
+            if fail_fast and any(r["problems"] for r in results):
+                for future in pending:
+                    future.cancel()
+                break
+
+    return sorted(results, key=lambda r: r["file"])
+
+
+def prevalidate_file(
+    file: Path,
+    base_ref: str | None,
+    tasks_file: Path = hub_root / "hub-config" / "tasks.json",
+    modeled_clades_dir: Path = hub_root / "auxiliary-data" / "modeled-clades",
+) -> dict:
+    """Run the pre-validation checks on one model output file."""
+    result = {"file": str(file), "rows_checked": 0, "problems": []}
+
+    # file: model-output/<team>/<round_id>-<team>.parquet
+    team = file.parent.name
+    round_id = file.name.removesuffix(f"-{team}.parquet")
+    try:
+        date.fromisoformat(round_id)
+        round_tasks = get_round_tasks(round_id, tasks_file, modeled_clades_dir)
+    except (ValueError, FileNotFoundError):
+        result["problems"].append(
+            f"file: name must be <round_id>-{team}.parquet, with the round_id of a modeling round"
+        )
+        return result
+
+    # schema
+    try:
+        table = pq.read_table(file)
+        table = table.select(model_output_schema.names).cast(model_output_schema)
+    except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        result["problems"].append(
+            f"schema: columns must be {', '.join(model_output_schema.names)} "
+            f"with types castable to the hub's ({e})"
+        )
+        return result
+    if extra := set(table.schema.names) ^ set(pq.read_schema(file).names):
+        result["problems"].append(f"schema: unexpected columns {sorted(extra)}")
+        return result
+
+    try:
+        base = read_base_version(file, base_ref)
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode() if isinstance(e.stderr, bytes) else e.stderr
+        result["problems"].append(
+            f"base version: can't read the file on {base_ref} ({stderr.strip()})"
+        )
+        return result
+    full_output = pl.from_arrow(table)
+    model_output = get_changed_tasks(full_output, base)
+    result["rows_checked"] = model_output.height
+    if model_output.height > 0:
+        result["problems"].extend(check_task_ids(model_output, round_tasks))
+        result["problems"].extend(check_clades(model_output, round_tasks))
+        result["problems"].extend(check_sum_one(model_output))
+    result["problems"].extend(check_sample_counts(full_output, round_tasks))
+
+    return result
+
+
+def get_changed_tasks(
+    model_output: pl.DataFrame, base: pa.Table | None
+) -> pl.DataFrame:
+    """
+    Return the rows of model output that belong to a task (a mean or sample)
+    with rows that were added, changed, or removed since the base version.
+    """
+    if base is None:
+        return model_output
+    try:
+        base_output = pl.from_arrow(
+            base.select(model_output_schema.names).cast(model_output_schema)
+        )
+    except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return model_output
+
+    # mean output_type_ids are null, which joins don't match
+    model_output_ids = model_output.with_columns(pl.col("output_type_id").fill_null(""))
+    base_output = base_output.with_columns(pl.col("output_type_id").fill_null(""))
+    changed_rows = pl.concat(
+        [
+            model_output_ids.join(base_output, on=model_output.columns, how="anti"),
+            base_output.join(model_output_ids, on=model_output.columns, how="anti"),
+        ]
+    )
+    changed_tasks = model_output_ids.with_row_index().join(
+        changed_rows.select(group_columns).unique(), on=group_columns, how="semi"
+    )
+    return model_output[changed_tasks["index"]]
+
+
+def check_task_ids(model_output: pl.DataFrame, round_tasks: dict) -> list[str]:
+    """Check that task IDs and values are valid for the round."""
+    problems = []
+    checks = {
+        "nowcast_date": pl.col("nowcast_date") == round_tasks["nowcast_date"],
+        "target_date": pl.col("target_date").is_in(round_tasks["target_dates"]),
+        "location": pl.col("location").is_in(round_tasks["locations"]),
+        "output_type": pl.col("output_type").is_in(["mean", "sample"]),
+        "output_type_id": pl.when(pl.col("output_type") == "mean")
+        .then(pl.col("output_type_id").is_null())
+        .otherwise(pl.col("output_type_id").str.len_chars().is_between(1, 15)),
+        "value": pl.col("value").is_between(0, 1),
+    }
+    for column, valid in checks.items():
+        invalid = model_output.filter(~valid.fill_null(False))
+        if invalid.height > 0:
+            problems.append(
+                f"task IDs: {invalid.height} rows with invalid {column} "
+                f"(e.g., {format_examples(invalid, [column])})"
+            )
+
+    return problems
+
+
+def check_sample_counts(model_output: pl.DataFrame, round_tasks: dict) -> list[str]:
+    """
+    Check that each location/target_date has the round's number of samples.
+
+    Run on the whole file: a resubmission that changes or removes one sample
+    only changes that sample's rows.
+    """
+    problems = []
+    samples = (
+        model_output.filter(output_type="sample")
+        .group_by("location", "target_date")
+        .agg(samples=pl.col("output_type_id").n_unique())
+        .filter(pl.col("samples") != round_tasks["samples"])
+    )
+    if samples.height > 0:
+        problems.append(
+            f"task IDs: {samples.height} location/target_dates without "
+            f"{round_tasks['samples']} samples "
+            f"(e.g., {format_examples(samples, ['location', 'target_date', 'samples'])})"
+        )
+
+    return problems
+
+
+def check_clades(model_output: pl.DataFrame, round_tasks: dict) -> list[str]:
+    """Check that each mean and sample has exactly the round's modeled clades."""
+    problems = []
+    unknown = model_output.filter(~pl.col("clade").is_in(round_tasks["clades"]))
+    if unknown.height > 0:
+        problems.append(
+            f"clades: {unknown.height} rows with clades that aren't modeled this round "
+            f"(e.g., {format_examples(unknown, ['clade'])})"
+        )
+
+    clade_counts = (
+        model_output.group_by(group_columns)
+        .agg(
+            clades=pl.col("clade").n_unique(),
+            rows=pl.len(),
+        )
+        .filter(
+            (pl.col("clades") != len(round_tasks["clades"]))
+            | (pl.col("rows") != pl.col("clades"))
+        )
+    )
+    if clade_counts.height > 0:
+        problems.append(
+            f"clades: {clade_counts.height} means or samples without exactly one row "
+            f"for each of the {len(round_tasks['clades'])} modeled clades "
+            f"(e.g., {format_examples(clade_counts, group_columns + ['rows'])})"
+        )
+
+    return problems
+
+
+def check_sum_one(model_output: pl.DataFrame) -> list[str]:
+    """Check that each mean and sample's clade proportions sum to one."""
+    sums = (
+        model_output.group_by(group_columns)
+        .agg(sum=pl.col("value").sum())
+        .filter((pl.col("sum") - 1).abs() > sum_one_tolerance)
+    )
+    if sums.height == 0:
+        return []
+    return [
+        f"sum to one: {sums.height} means or samples with values that don't sum to one "
+        f"(e.g., {format_examples(sums, group_columns + ['sum'])})"
+    ]
+
+
+def format_examples(rows: pl.DataFrame, columns: list[str]) -> str:
+    """Return the first few rows' values as a short string."""
+    examples = rows.select(columns).unique().sort(columns).head(max_examples)
+    return "; ".join(
+        " ".join(f"{v:.4g}" if isinstance(v, float) else str(v) for v in row)
+        for row in examples.iter_rows()
+    )
+
+
+def format_report(results: list[dict]) -> str:
+    """Return a concise report of each checked file's problems."""
+    lines = []
+    for result in results:
+        status = "FAILED" if result["problems"] else "passed"
+        lines.append(
+            f"{status}: {result['file']} ({result['rows_checked']} rows checked)"
+        )
+        lines.extend(f"  - {problem}" for problem in result["problems"])
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+@pytest.fixture
+def test_hub(tmp_path) -> dict:
+    """A hub config with one round and a valid submission for it."""
+    round_id = "2025-01-08"
+    tasks = {
+        "rounds": [
+            {
+                "model_tasks": [
+                    {
+                        "task_ids": {
+                            "nowcast_date": {"required": [round_id], "optional": None},
+                            "target_date": {
+                                "required": None,
+                                "optional": ["2025-01-07", "2025-01-08"],
+                            },
+                            "location": {"required": None, "optional": ["MA", "NY"]},
+                        },
+                        "output_type": {
+                            "sample": {
+                                "output_type_id_params": {"min_samples_per_task": 3}
+                            }
+                        },
+                    }
+                ]
+            }
+        ]
+    }
+    tasks_file = tmp_path / "tasks.json"
+    tasks_file.write_text(json.dumps(tasks))
+    clades_dir = tmp_path / "modeled-clades"
+    clades_dir.mkdir()
+    (clades_dir / f"{round_id}.json").write_text(
+        json.dumps({"clades": ["24A", "other"]})
+    )
+
+    round_tasks = get_round_tasks(round_id, tasks_file, clades_dir)
+    proportions = pl.DataFrame({"p": [0.25, 0.75]})["p"].to_numpy()
+    proportions = proportions.reshape(1, 1, 1, 2).repeat(2, 0).repeat(2, 1).repeat(3, 2)
+    table = get_model_output_table(round_tasks, ["MA", "NY"], proportions)
+
+    file = tmp_path / "model-output" / "team-a" / f"{round_id}-team-a.parquet"
+    file.parent.mkdir(parents=True)
+    pq.write_table(table, file)
+
+    return {"file": file, "tasks_file": tasks_file, "clades_dir": clades_dir}
+
+
+def run_prevalidate(test_hub) -> dict:
+    """Run prevalidate_file on the test hub's file, without a base version."""
+    return prevalidate_file(
+        test_hub["file"], None, test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+
+
+def rewrite(test_hub, model_output: pl.DataFrame):
+    """Replace the test hub's file."""
+    model_output.write_parquet(test_hub["file"])
+
+
+def test_prevalidate_valid(test_hub):
+    """A valid submission passes every check."""
+    result = run_prevalidate(test_hub)
+    assert result["problems"] == []
+    # 2 locations x 2 target dates x (1 mean + 3 samples) x 2 clades
+    assert result["rows_checked"] == 32
+
+
+def test_prevalidate_problems(test_hub):
+    """Structural problems are reported by check."""
+    model_output = pl.read_parquet(test_hub["file"])
+    rewrite(
+        test_hub,
+        model_output.with_columns(
+            location=pl.when(pl.col("location") == "NY")
+            .then(pl.lit("XX"))
+            .otherwise("location"),
+            value=pl.when(
+                (pl.col("output_type_id") == "MA01") & (pl.col("clade") == "24A")
+            )
+            .then(0.5)
+            .otherwise("value"),
+        ),
+    )
+    problems = run_prevalidate(test_hub)["problems"]
+    assert len(problems) == 2
+    assert problems[0].startswith("task IDs: 16 rows with invalid location (e.g., XX)")
+    assert problems[1].startswith("sum to one: 2 means or samples")
+
+    rewrite(test_hub, model_output.filter(pl.col("clade") != "other"))
+    problems = run_prevalidate(test_hub)["problems"]
+    assert problems == [
+        "clades: 16 means or samples without exactly one row for each of the 2 modeled clades "
+        "(e.g., MA 2025-01-07 mean None 1; MA 2025-01-07 sample MA00 1; MA 2025-01-07 sample MA01 1)",
+        "sum to one: 16 means or samples with values that don't sum to one "
+        "(e.g., MA 2025-01-07 mean None 0.25; MA 2025-01-07 sample MA00 0.25; MA 2025-01-07 sample MA01 0.25)",
+    ]
+
+    rewrite(test_hub, model_output.drop("clade"))
+    problems = run_prevalidate(test_hub)["problems"]
+    assert len(problems) == 1 and problems[0].startswith("schema:")
+
+    renamed = test_hub["file"].with_name("2025-01-15-team-a.parquet")
+    test_hub["file"].rename(renamed)
+    test_hub["file"] = renamed
+    problems = run_prevalidate(test_hub)["problems"]
+    assert len(problems) == 1 and problems[0].startswith("file:")
+
+
+def test_get_changed_tasks(test_hub):
+    """Only tasks with added, changed, or removed rows are checked."""
+    model_output = pl.read_parquet(test_hub["file"])
+    assert get_changed_tasks(model_output, model_output.to_arrow()).height == 0
+
+    changed = model_output.with_columns(
+        value=pl.when(
+            (pl.col("location") == "MA")
+            & (pl.col("output_type_id") == "MA02")
+            & (pl.col("target_date") == date(2025, 1, 8))
+        )
+        .then(1 - pl.col("value"))
+        .otherwise("value")
+    )
+    assert get_changed_tasks(changed, model_output.to_arrow()).height == 2
+
+    # a removed row changes its task; a new task is checked in full
+    removed = model_output.filter(
+        ~((pl.col("location") == "NY") & (pl.col("output_type") == "mean"))
+        | (pl.col("clade") == "24A")
+    )
+    assert get_changed_tasks(removed, model_output.to_arrow()).height == 2
+    assert get_changed_tasks(model_output, removed.to_arrow()).height == 4
+
+
+def test_prevalidate_git(test_hub, tmp_path):
+    """Changed files are found with git and compared to the base branch."""
+    repo = tmp_path
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=repo,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    git("add", "model-output")
+    git("commit", "-q", "-m", "base")
+    assert get_changed_files("main", repo) == []
+
+    model_output = pl.read_parquet(test_hub["file"])
+    git("checkout", "-q", "-b", "resubmit")
+    rewrite(
+        test_hub,
+        model_output.with_columns(
+            value=pl.when(pl.col("location") == "NY")
+            .then(pl.col("value") + 0.1)
+            .otherwise("value")
+        ),
+    )
+    git("commit", "-q", "-am", "resubmit")
+    assert get_changed_files("main", repo) == [str(test_hub["file"])]
+
+    result = prevalidate_file(
+        test_hub["file"], "main", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == 16
+    assert result["problems"] == [
+        "sum to one: 8 means or samples with values that don't sum to one "
+        "(e.g., NY 2025-01-07 mean None 1.2; NY 2025-01-07 sample NY00 1.2; NY 2025-01-07 sample NY01 1.2)"
+    ]
+
+
+def test_prevalidate_git_one_sample(test_hub, tmp_path):
+    """Sample counts are checked for the whole file when one sample changes."""
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    git("add", "model-output")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "resubmit")
+    model_output = pl.read_parquet(test_hub["file"])
+    one_sample = (
+        (pl.col("location") == "MA")
+        & (pl.col("target_date") == date(2025, 1, 8))
+        & (pl.col("output_type_id") == "MA01")
+    )
+
+    # a valid change to one sample passes
+    rewrite(
+        test_hub,
+        model_output.with_columns(
+            value=pl.when(one_sample).then(1 - pl.col("value")).otherwise("value")
+        ),
+    )
+    result = prevalidate_file(
+        test_hub["file"], "main", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == 2
+    assert result["problems"] == []
+
+    # a removed sample is reported
+    rewrite(test_hub, model_output.filter(~one_sample))
+    result = prevalidate_file(
+        test_hub["file"], "main", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == 0
+    assert result["problems"] == [
+        "task IDs: 1 location/target_dates without 3 samples " "(e.g., MA 2025-01-08 2)"
+    ]
+
+
+def test_read_base_version(test_hub, tmp_path):
+    """Files new on base_ref are None, and git errors are reported as problems."""
+    file = test_hub["file"]
+
+    # not in a git repository
+    with pytest.raises(subprocess.CalledProcessError):
+        read_base_version(file, "main")
+    result = prevalidate_file(
+        file, "main", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == 0
+    assert len(result["problems"]) == 1
+    assert result["problems"][0].startswith("base version: can't read the file on main")
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    git("add", "tasks.json")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "submission")
+    git("add", "model-output")
+    git("commit", "-q", "-m", "submission")
+
+    # a file that's new on the branch has no base version, so every row is checked
+    assert read_base_version(file, "main") is None
+    assert read_base_version(file, "submission").equals(pq.read_table(file))
+    result = prevalidate_file(
+        file, "main", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == pq.read_metadata(file).num_rows
+    assert result["problems"] == []
+
+    # an unknown base ref isn't treated as a new file
+    with pytest.raises(subprocess.CalledProcessError):
+        read_base_version(file, "no-such-branch")
+    result = prevalidate_file(
+        file, "no-such-branch", test_hub["tasks_file"], test_hub["clades_dir"]
+    )
+    assert result["rows_checked"] == 0
+    assert result["problems"][0].startswith(
+        "base version: can't read the file on no-such-branch"
+    )
@@ -0,0 +1,443 @@
+"""
+Repack model output submissions into a canonical Parquet layout.
+
+Teams' tooling writes submissions with different column orders, row orders,
+row group sizes, and compression. This script rewrites each submission with:
+
+- columns in the hub's order and types (see sim_model_output.model_output_schema)
+- rows sorted by task ID, output type, and output type ID, so that each
+  sample's clade proportions are contiguous and Parquet column statistics
+  can be used to skip row groups when filtering by location
+- dictionary encoding for the location, clade, output_type, and
+  output_type_id columns, whichever of dictionary or byte stream split
+  encoding is smaller for the value column, and zstd compression
+- optionally (--float32), single-precision values
+
+Before a repacked file replaces the original, it is read back and compared to
+the original. Every column other than value must match exactly. Values must
+match exactly, or, with --float32, must be within --max-error of the
+original. Files are only replaced when the repacked file is smaller.
+
+Note that float32 values do not match the "double" value type that the hub's
+R validations expect, so --float32 is meant for copies of model output used for
+analysis (use --output-dir), not for files in the hub's model-output folder.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo (use --dry-run to report space savings without
+   replacing any files):
+uv run --with-requirements src/requirements.txt src/repack_model_output.py --dry-run
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/repack_model_output.py
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+import numpy as np
+import polars as pl
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+from atomic_files import write_atomic
+from sim_model_output import model_output_schema
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+sort_keys = [
+    "nowcast_date",
+    "location",
+    "target_date",
+    "output_type",
+    "output_type_id",
+    "clade",
+]
+dictionary_columns = ["location", "clade", "output_type", "output_type_id"]
+row_group_size = 1_048_576
+zstd_level = 9
+
+
+def set_model_output_dir(ctx, param, value):
+    """Set the model_output_dir default value to the hub's model-output directory."""
+    if value is None:
+        value = hub_root / "model-output"
+    else:
+        value = Path(value)
+
+    return value
+
+
+def set_output_dir(ctx, param, value):
+    """Set the output_dir default value to model_output_dir (i.e., repack in place)."""
+    if value is None:
+        value = ctx.params["model_output_dir"]
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--model-output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_output_dir,
+    is_eager=True,
+    help="Path to the model output submissions. Default is the hub's model-output directory.",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_output_dir,
+    help="Directory where repacked submissions are saved. Default is --model-output-dir (repack in place).",
+)
+@click.option(
+    "--team",
+    "teams",
+    type=str,
+    multiple=True,
+    help="Only repack this team's submissions (model_id). Can be used more than once. Default is all teams.",
+)
+@click.option(
+    "--float32",
+    is_flag=True,
+    default=False,
+    help="Write values as single-precision floats.",
+)
+@click.option(
+    "--max-error",
+    type=click.FloatRange(min=0),
+    default=1e-6,
+    show_default=True,
+    help="Largest absolute difference allowed between original and float32 values.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    help="Number of files repacked at once. Default is the number of CPUs.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Repack to temporary files and report the space saved without replacing any files.",
+)
+def main(
+    model_output_dir: Path,
+    output_dir: Path,
+    teams: tuple[str, ...],
+    float32: bool,
+    max_error: float,
+    workers: int,
+    dry_run: bool,
+) -> pl.DataFrame:
+    submissions = sorted(
+        path
+        for path in model_output_dir.glob("*/*.parquet")
+        if not teams or path.parent.name in teams
+    )
+    logger.info(f"Repacking {len(submissions)} submissions in {model_output_dir}")
+
+    def repack(path: Path) -> dict:
+        output_path = output_dir / path.relative_to(model_output_dir)
+        return repack_file(path, output_path, float32, max_error, dry_run)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(repack, submissions))
+
+    report = summarize_repack(results)
+    with pl.Config(tbl_rows=-1, tbl_hide_dataframe_shape=True):
+        logger.info(f"Space saved by team{' (dry run)' if dry_run else ''}:\n{report}")
+
+    return report
+
+
+def repack_table(table: pa.Table, float32: bool = False) -> pa.Table:
+    """Return a model output table with the hub's column order and types, sorted by task."""
+    schema = model_output_schema
+    if float32:
+        schema = schema.set(
+            schema.get_field_index("value"), pa.field("value", pa.float32())
+        )
+    table = table.select(schema.names).cast(schema)
+    return table.sort_by([(key, "ascending") for key in sort_keys])
+
+
+def encode_repacked(table: pa.Table) -> pa.Buffer:
+    """
+    Return a repacked model output table encoded as a Parquet file.
+
+    The value column is written with both dictionary encoding (best when
+    values repeat, for example when a team rounds its values or uses the same
+    samples for every location) and byte stream split encoding (best for
+    values that don't repeat), and the smaller file is kept.
+    """
+    value_encodings = [
+        {"use_dictionary": dictionary_columns + ["value"]},
+        {
+            "use_dictionary": dictionary_columns,
+            "column_encoding": {"value": "BYTE_STREAM_SPLIT"},
+        },
+    ]
+    candidates = []
+    for encoding_options in value_encodings:
+        sink = pa.BufferOutputStream()
+        pq.write_table(
+            table,
+            sink,
+            row_group_size=row_group_size,
+            compression="zstd",
+            compression_level=zstd_level,
+            **encoding_options,
+        )
+        candidates.append(sink.getvalue())
+
+    return min(candidates, key=lambda buffer: buffer.size)
+
+
+def check_round_trip(expected: pa.Table, repacked: pa.Table, path: Path) -> float:
+    """
+    Compare a repacked table (as read back from Parquet) to the sorted original
+    table (see repack_table) and return the largest absolute difference between
+    values. Raise a ValueError if any other column differs. path is the
+    submission, for error messages.
+    """
+    if repacked.num_rows != expected.num_rows:
+        raise ValueError(
+            f"{path} has {repacked.num_rows} rows (expected {expected.num_rows})"
+        )
+    for name in model_output_schema.names:
+        if name != "value" and not repacked[name].equals(expected[name]):
+            raise ValueError(f"{path} column {name} does not match the original")
+
+    values = expected["value"].to_numpy()
+    repacked_values = repacked["value"].cast(pa.float64()).to_numpy()
+    if not np.array_equal(np.isnan(values), np.isnan(repacked_values)):
+        raise ValueError(f"{path} missing values do not match the original")
+    if np.isnan(values).all():
+        return 0.0
+
+    return float(np.nanmax(np.abs(values - repacked_values)))
+
+
+def repack_file(
+    path: Path,
+    output_path: Path,
+    float32: bool = False,
+    max_error: float = 1e-6,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Repack a submission and return its size before and after repacking.
+
+    The repacked file is verified against the original before it is saved to
+    output_path. If output_path is the original file, it is only replaced when
+    the repacked file is smaller.
+    """
+    table = pq.read_table(path)
+    expected = repack_table(table)
+    repacked = encode_repacked(repack_table(table, float32) if float32 else expected)
+    result = {
+        "team": path.parent.name,
+        "file": path.name,
+        "bytes_before": path.stat().st_size,
+        "bytes_after": repacked.size,
+    }
+    in_place = output_path.resolve() == path.resolve()
+    result["replaced"] = not dry_run and (
+        not in_place or result["bytes_after"] < result["bytes_before"]
+    )
+
+    def check(source) -> float:
+        error = check_round_trip(expected, pq.read_table(source), path)
+        if error > (max_error if float32 else 0):
+            raise ValueError(
+                f"{path} repacked values differ from the original by up to {error}"
+            )
+        return error
+
+    def write_checked(tmp_path: Path):
+        # the written file is checked before write_atomic renames it into place
+        tmp_path.write_bytes(repacked)
+        result["max_error"] = check(tmp_path)
+
+    if result["replaced"]:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(output_path, write_checked)
+    else:
+        result["max_error"] = check(repacked)
+
+    return result
+
+
+def summarize_repack(results: list[dict]) -> pl.DataFrame:
+    """Return the space saved by repacking, by team."""
+    if not results:
+        return pl.DataFrame()
+
+    return (
+        pl.DataFrame(results)
+        .group_by("team")
+        .agg(
+            files=pl.len(),
+            replaced=pl.col("replaced").sum(),
+            mb_before=pl.col("bytes_before").sum() / 1e6,
+            mb_after=pl.col("bytes_after").sum() / 1e6,
+            max_error=pl.col("max_error").max(),
+        )
+        .with_columns(
+            saved_pct=(1 - pl.col("mb_after") / pl.col("mb_before")) * 100,
+        )
+        .sort("team")
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def make_submission(path: Path, seed: int = 1) -> pa.Table:
+    """Write an unsorted submission with a non-standard column order."""
+    rng = np.random.default_rng(seed)
+    rows = [
+        (location, target_date, clade, output_type, output_type_id)
+        for location in ["PA", "MA"]
+        for target_date in ["2024-10-02", "2024-10-01"]
+        for output_type, output_type_id in [("mean", None), ("sample", "s1")]
+        for clade in ["24A", "other"]
+    ]
+    rng.shuffle(rows)
+    location, target_date, clade, output_type, output_type_id = zip(*rows)
+    table = pa.table(
+        {
+            "value": rng.uniform(size=len(rows)),
+            "location": location,
+            "clade": clade,
+            "output_type_id": output_type_id,
+            "output_type": output_type,
+            "target_date": pa.array(target_date).cast(pa.date32()),
+            "nowcast_date": pa.array(["2024-10-09"] * len(rows)).cast(pa.date32()),
+        }
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path, compression="none", use_dictionary=False)
+    return table
+
+
+def test_repack_file(tmp_path):
+    """Repacked files are sorted, use the hub's schema, and match the original."""
+    path = tmp_path / "team-model" / "2024-10-09-team-model.parquet"
+    original = make_submission(path)
+    result = repack_file(path, path)
+    assert result["replaced"]
+    assert result["max_error"] == 0
+
+    repacked = pq.read_table(path)
+    assert repacked.schema == model_output_schema
+    assert repacked.column("location").to_pylist()[:8] == ["MA"] * 8
+    assert repacked.column("output_type_id").null_count == 8
+    metadata = pq.read_metadata(path).row_group(0)
+    assert metadata.column(2).compression == "ZSTD"
+    assert "RLE_DICTIONARY" in metadata.column(2).encodings
+
+    # repacking is lossless and repeatable
+    expected = pl.from_arrow(original).sort(sort_keys, nulls_last=True)
+    assert pl.from_arrow(repacked).select(expected.columns).equals(expected)
+    assert not repack_file(path, path)["replaced"]
+
+
+def test_repack_file_mode(tmp_path):
+    """Repacked files keep the original's mode, and new files get the default mode."""
+    path = tmp_path / "team-model" / "2024-10-09-team-model.parquet"
+    make_submission(path)
+    path.chmod(0o644)
+    assert repack_file(path, path)["replaced"]
+    assert path.stat().st_mode & 0o777 == 0o644
+
+    umask = os.umask(0o022)
+    try:
+        output_path = tmp_path / "repacked" / path.name
+        assert repack_file(path, output_path)["replaced"]
+    finally:
+        os.umask(umask)
+    assert output_path.stat().st_mode & 0o777 == 0o644
+    assert [p.name for p in output_path.parent.iterdir()] == [path.name]
+
+
+def test_repack_float32(tmp_path):
+    """float32 values are checked against the error bound."""
+    path = tmp_path / "team-model" / "2024-10-09-team-model.parquet"
+    make_submission(path)
+    output_path = tmp_path / "repacked" / path.name
+
+    result = repack_file(path, output_path, float32=True)
+    assert result["replaced"]
+    assert 0 < result["max_error"] < 1e-7
+    assert pq.read_schema(output_path).field("value").type == pa.float32()
+
+    try:
+        repack_file(path, output_path, float32=True, max_error=1e-12)
+    except ValueError as e:
+        assert "differ from the original" in str(e)
+    else:
+        raise AssertionError("values outside of max_error should raise a ValueError")
+
+
+def test_repack_model_output_cli(tmp_path):
+    """The CLI reports space saved by team and leaves files alone with --dry-run."""
+    from click.testing import CliRunner
+
+    model_output_dir = tmp_path / "model-output"
+    for team, seed in [("team-a", 1), ("team-b", 2)]:
+        make_submission(model_output_dir / team / f"2024-10-09-{team}.parquet", seed)
+    before = {p: p.read_bytes() for p in model_output_dir.glob("*/*.parquet")}
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [f"--model-output-dir={model_output_dir}", "--team=team-a", "--dry-run"],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    report = result.return_value
+    assert report["team"].to_list() == ["team-a"]
+    assert report["replaced"].to_list() == [0]
+    assert {p: p.read_bytes() for p in before} == before
+
+    output_dir = tmp_path / "repacked"
+    result = runner.invoke(
+        main,
+        [f"--model-output-dir={model_output_dir}", f"--output-dir={output_dir}"],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.return_value["files"].to_list() == [1, 1]
+    assert sorted(p.name for p in output_dir.glob("*/*.parquet")) == [
+        "2024-10-09-team-a.parquet",
+        "2024-10-09-team-b.parquet",
+    ]
@@ -0,0 +1,427 @@
+"""
+Record and summarize run history for the hub's scheduled Python jobs.
+
+Each instrumented entry point (get_clades_to_model.py, get_location_date_counts.py,
+get_target_data.py) appends a run record to a local, append-only Parquet store. A
+record holds the run's parameters, input sizes (e.g., rows scanned, sequences
+assigned, partitions written), stage durations, and peak memory. Every run is
+written to its own file, Hive-partitioned by job name:
+
+    <history_dir>/job=<job name>/<run start time>-<run id>.parquet
+
+The default history directory is ~/.variant-nowcast-hub/run-history. Set the
+RUN_HISTORY_DIR environment variable to use a different location.
+
+This script is also a small CLI that summarizes run durations over time and flags
+runs (and run stages) that were more than --threshold percent slower than the
+median of the preceding --window runs.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/run_history.py --threshold=25
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/run_history.py
+"""
+
+import json
+import logging
+import os
+import resource
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+import polars as pl
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+run_history_schema = {
+    "run_id": pl.String,
+    "started_at": pl.Datetime("us", "UTC"),
+    "duration_seconds": pl.Float64,
+    "status": pl.String,
+    "peak_memory_mb": pl.Float64,
+    "params": pl.String,
+    "stages": pl.List(pl.Struct({"stage": pl.String, "seconds": pl.Float64})),
+    "counts": pl.List(pl.Struct({"name": pl.String, "value": pl.Int64})),
+}
+
+
+def get_history_dir() -> Path:
+    """Return the run history directory."""
+    history_dir = os.environ.get("RUN_HISTORY_DIR")
+    if history_dir:
+        return Path(history_dir)
+    return Path.home() / ".variant-nowcast-hub" / "run-history"
+
+
+def get_peak_memory_mb() -> float:
+    """Return the peak resident memory of this process and its children (MB)."""
+    # ru_maxrss is in kilobytes on Linux
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak_kb / 1024
+
+
+class RunRecorder:
+    """
+    Collect stage durations and input sizes for a job and save them as a run record.
+
+    Use as a context manager around a job's work. The record is written when the
+    context exits, with a status of "error" if an exception was raised. Problems
+    writing the record are logged and never interrupt the job.
+
+    Example
+    -------
+    >>> with RunRecorder("get_target_data", params={"nowcast_date": "2024-10-09"}) as run:
+    >>>     with run.stage("assign_clades"):
+    >>>         assignments = assign_clades(...)
+    >>>     run.count("sequences_assigned", assignments.meta["sequences_assigned"])
+    """
+
+    def __init__(
+        self, job: str, params: dict | None = None, history_dir: Path | None = None
+    ):
+        self.job = job
+        self.params = params or {}
+        self.history_dir = history_dir or get_history_dir()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages: list[dict] = []
+        self.counts: dict[str, int] = {}
+        self.record_path: Path | None = None
+
+    def __enter__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        status = "success" if exc_type is None else "error"
+        # a sys.exit(0) is a graceful stop, not a failure
+        if exc_type is SystemExit and not exc_value.code:
+            status = "success"
+        duration = time.perf_counter() - self._start
+        try:
+            self.record_path = self.write(status, duration)
+        except Exception as e:
+            logger.warning(f"Unable to save run history record: {e}")
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the job."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({"stage": name, "seconds": time.perf_counter() - start})
+
+    def count(self, name: str, value: int | None):
+        """Record an input or output size (e.g., rows scanned)."""
+        if value is not None:
+            self.counts[name] = int(value)
+
+    def write(self, status: str, duration: float) -> Path:
+        """Append the run record to the run history store."""
+        record = pl.DataFrame(
+            {
+                "run_id": [self.run_id],
+                "started_at": [self.started_at],
+                "duration_seconds": [duration],
+                "status": [status],
+                "peak_memory_mb": [get_peak_memory_mb()],
+                "params": [json.dumps(self.params, default=str, sort_keys=True)],
+                "stages": [self.stages],
+                "counts": [[{"name": k, "value": v} for k, v in self.counts.items()]],
+            },
+            schema=run_history_schema,
+        )
+
+        job_dir = self.history_dir / f"job={self.job}"
+        job_dir.mkdir(exist_ok=True, parents=True)
+        started_at = self.started_at.strftime("%Y%m%dT%H%M%S")
+        record_path = job_dir / f"{started_at}-{self.run_id}.parquet"
+        # write to a temporary file and rename it, so a half-written record is
+        # never read as part of the history
+        tmp_path = job_dir / f".{record_path.name}.tmp"
+        record.write_parquet(tmp_path)
+        os.replace(tmp_path, record_path)
+
+        logger.info(f"Run history record saved to {record_path}")
+        return record_path
+
+
+def read_run_history(history_dir: Path) -> pl.DataFrame:
+    """Return all run records in history_dir, ordered by job and start time."""
+    if not any(history_dir.glob("job=*/*.parquet")):
+        return pl.DataFrame(schema={"job": pl.String, **run_history_schema})
+
+    return (
+        pl.scan_parquet(
+            history_dir / "job=*" / "*.parquet",
+            hive_partitioning=True,
+            hive_schema={"job": pl.String},
+        )
+        .sort("job", "started_at")
+        .collect()
+    )
+
+
+def flag_slow_runs(
+    history: pl.DataFrame, threshold: float, window: int
+) -> pl.DataFrame:
+    """
+    Compare each successful run's duration (total and per stage) to the median
+    of the same job's preceding `window` successful runs.
+
+    Returns a row per job/run/metric, where metric is "total" or a stage name.
+    A run is flagged as slow when it took more than `threshold` percent longer
+    than the trailing median. A job's first run is never flagged.
+    """
+    runs = history.filter(pl.col("status") == "success")
+    totals = runs.select(
+        "job",
+        "run_id",
+        "started_at",
+        pl.lit("total").alias("metric"),
+        pl.col("duration_seconds").alias("seconds"),
+    )
+    stages = (
+        runs.select("job", "run_id", "started_at", "stages")
+        .explode("stages")
+        .drop_nulls("stages")
+        .unnest("stages")
+        # stages that run more than once in a job are summed
+        .group_by("job", "run_id", "started_at", "stage")
+        .agg(pl.col("seconds").sum())
+        .rename({"stage": "metric"})
+    )
+
+    return (
+        pl.concat([totals, stages])
+        .sort("job", "metric", "started_at")
+        .with_columns(
+            trailing_median=pl.col("seconds")
+            .shift(1)
+            .rolling_median(window_size=window, min_samples=1)
+            .over("job", "metric")
+        )
+        .with_columns(
+            pct_change=(pl.col("seconds") / pl.col("trailing_median") - 1) * 100
+        )
+        .with_columns(slow=pl.col("pct_change").fill_null(0) > threshold)
+    )
+
+
+def summarize_run_history(history: pl.DataFrame) -> pl.DataFrame:
+    """Return a summary of run durations, memory, and counts per job."""
+    latest_counts = (
+        history.sort("started_at")
+        .group_by("job")
+        .agg(pl.col("counts").last())
+        .explode("counts")
+        .drop_nulls("counts")
+        .unnest("counts")
+        .group_by("job")
+        .agg(
+            pl.concat_str(pl.col("name"), pl.col("value"), separator="=")
+            .sort()
+            .str.join(", ")
+            .alias("latest_counts")
+        )
+    )
+    return (
+        history.group_by("job")
+        .agg(
+            pl.len().alias("runs"),
+            (pl.col("status") == "error").sum().alias("errors"),
+            pl.col("started_at").max().alias("last_run"),
+            pl.col("duration_seconds")
+            .sort_by("started_at")
+            .last()
+            .alias("last_seconds"),
+            pl.col("duration_seconds").median().alias("median_seconds"),
+            pl.col("peak_memory_mb").max().alias("max_peak_memory_mb"),
+        )
+        .join(latest_counts, on="job", how="left")
+        .sort("job")
+    )
+
+
+@click.command()
+@click.option(
+    "--history-dir",
+    type=Path,
+    required=False,
+    default=None,
+    help="Run history directory. Default is $RUN_HISTORY_DIR or ~/.variant-nowcast-hub/run-history.",
+)
+@click.option(
+    "--threshold",
+    type=click.FloatRange(min=0),
+    required=False,
+    default=25.0,
+    help="Flag runs that are more than this percent slower than the trailing median. Default is 25.",
+)
+@click.option(
+    "--window",
+    type=click.IntRange(min=1),
+    required=False,
+    default=5,
+    help="Number of preceding runs used to compute the trailing median. Default is 5.",
+)
+@click.option(
+    "--job",
+    type=str,
+    required=False,
+    default=None,
+    help="Only summarize runs of this job (e.g., get_target_data).",
+)
+def main(
+    history_dir: Path | None, threshold: float, window: int, job: str | None
+) -> pl.DataFrame:
+    history_dir = history_dir or get_history_dir()
+    history = read_run_history(history_dir)
+    if job is not None:
+        history = history.filter(pl.col("job") == job)
+    if history.is_empty():
+        logger.info(f"No run history found in {history_dir}")
+        return pl.DataFrame()
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, fmt_str_lengths=80):
+        print(summarize_run_history(history))
+
+        flagged = flag_slow_runs(history, threshold, window).filter("slow")
+        if flagged.is_empty():
+            logger.info(
+                f"No runs more than {threshold}% slower than the trailing median"
+            )
+        else:
+            logger.info(
+                f"{flagged.height} run(s)/stage(s) more than {threshold}% slower than the trailing median"
+            )
+            print(
+                flagged.select(
+                    "job",
+                    "started_at",
+                    "run_id",
+                    "metric",
+                    pl.col("seconds").round(1),
+                    pl.col("trailing_median").round(1),
+                    pl.col("pct_change").round(1),
+                )
+            )
+
+    return flagged
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_run_recorder(tmp_path):
+    """Run records are appended to the history store."""
+    for status in ["success", "error"]:
+        try:
+            with RunRecorder(
+                "test_job", params={"nowcast_date": "2024-10-09"}, history_dir=tmp_path
+            ) as run:
+                with run.stage("stage_one"):
+                    run.count("rows_scanned", 100)
+                with run.stage("stage_two"):
+                    if status == "error":
+                        raise ValueError("job failed")
+        except ValueError:
+            pass
+
+    history = read_run_history(tmp_path)
+    assert history.height == 2
+    assert history["job"].to_list() == ["test_job", "test_job"]
+    assert history["status"].to_list() == ["success", "error"]
+    assert json.loads(history["params"][0]) == {"nowcast_date": "2024-10-09"}
+    assert [s["stage"] for s in history["stages"][0]] == ["stage_one", "stage_two"]
+    assert history["counts"][0].to_list() == [{"name": "rows_scanned", "value": 100}]
+    assert history["peak_memory_mb"][0] > 0
+    # no temporary files are left behind
+    assert len(list((tmp_path / "job=test_job").iterdir())) == 2
+
+
+def test_graceful_exit_is_success(tmp_path):
+    """A sys.exit(0) inside the recorder is recorded as a successful run."""
+    try:
+        with RunRecorder("test_job", history_dir=tmp_path):
+            raise SystemExit(0)
+    except SystemExit:
+        pass
+    assert read_run_history(tmp_path)["status"].to_list() == ["success"]
+
+
+def test_flag_slow_runs():
+    """Runs slower than the trailing median by more than the threshold are flagged."""
+    durations = [10.0, 11.0, 9.0, 10.0, 16.0, 10.5]
+    history = pl.DataFrame(
+        {
+            "job": ["test_job"] * 6,
+            "run_id": [str(i) for i in range(6)],
+            "started_at": [
+                datetime(2025, 1, i + 1, tzinfo=timezone.utc) for i in range(6)
+            ],
+            "duration_seconds": durations,
+            "status": ["success"] * 6,
+            "stages": [[{"stage": "assign", "seconds": d / 2}] for d in durations],
+        }
+    )
+
+    flagged = flag_slow_runs(history, threshold=25, window=3)
+    slow = flagged.filter("slow")
+    assert slow["run_id"].to_list() == ["4", "4"]
+    assert set(slow["metric"].to_list()) == {"total", "assign"}
+    # trailing median of runs 1-3 (11, 9, 10)
+    total = slow.filter(pl.col("metric") == "total")
+    assert total["trailing_median"].item() == 10.0
+    assert round(total["pct_change"].item(), 6) == 60.0
+    # first run has nothing to compare to
+    first = flagged.filter(pl.col("run_id") == "0")
+    assert first["trailing_median"].null_count() == 2
+    assert not first["slow"].any()
+
+
+def test_cli(tmp_path):
+    """The summary CLI returns flagged runs."""
+    from click.testing import CliRunner
+
+    for seconds in [1, 1, 1]:
+        with RunRecorder("test_job", history_dir=tmp_path) as run:
+            with run.stage("sleep"):
+                time.sleep(seconds * 0.01)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ["--history-dir", str(tmp_path), "--threshold", "100000"],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert result.return_value.is_empty()
+    assert "test_job" in result.output
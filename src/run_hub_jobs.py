@@ -0,0 +1,747 @@
+"""
+Run the hub's Nextstrain-based jobs as soon as the sequence metadata they need is available.
+
+The hub's GitHub workflows run get_clades_to_model.py (Mondays), get_location_date_counts.py,
+and get_target_data.py (after the Wednesday submission deadline) on fixed schedules, so a late
+Nextstrain release means a job runs against the previous day's metadata and an early one sits
+unused until the scheduled time. This script polls a source of Nextstrain sequence metadata
+versions instead, and starts each job when its inputs can be satisfied:
+
+- get_clades_to_model.py for the next round, from the Monday before it. The job uses the latest
+  metadata, so it starts when Monday's metadata is published (or at the Monday as_of time,
+  11:59:59 UTC, if no metadata has been published that day).
+- get_location_date_counts.py for the latest round, when the round closes (8 PM US/Eastern on
+  the nowcast date), which is its sequence_as_of time.
+- get_target_data.py for the rounds scored with the latest round's target data (the round
+  and the 13 rounds before it, as in run-post-submission-jobs.yaml), with sequence_as_of the
+  day before the latest round's nowcast date. Target data includes sequences collected while
+  the latest round is open, so these jobs also wait for the round to close. Each round's
+  tree_as_of is read from its modeled-clades file, so rounds without one are skipped.
+
+A job runs when it hasn't already written its output file and hasn't already succeeded, and the
+metadata version it would use is final: either its sequence_as_of time has passed, or a version
+was published earlier on the same (UTC) day. Jobs run as separate processes on a pool of
+--workers threads; at most --max-queue jobs are queued or running at once, and a job that is
+queued, running, or waiting to retry is never queued again. A failed job is retried after
+--retry-delay minutes (doubling after each failure), up to --max-attempts times. The state of
+each job is saved to --state-dir/state.json after every poll, so a restarted runner doesn't
+repeat finished jobs.
+
+Sequence metadata versions come from Nextstrain's S3 bucket, or from --versions-dir, a directory
+in which each file is a metadata version published at the file's modification time (used in
+tests and to replay a schedule of releases).
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo: uv run --with-requirements src/requirements.txt src/run_hub_jobs.py
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/run_hub_jobs.py
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+from zoneinfo import ZoneInfo
+
+import boto3  # type: ignore
+import click
+from botocore import UNSIGNED  # type: ignore
+from botocore.config import Config as BotoConfig  # type: ignore
+from cladetime.util.config import Config  # type: ignore
+
+from atomic_files import write_atomic
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+default_state_dir = Path.home() / ".variant-nowcast-hub" / "job-runner"
+
+# rounds scored with each week's target data (see run-post-submission-jobs.yaml)
+target_data_weeks = 13
+
+
+class MetadataVersion(NamedTuple):
+    """A published version of Nextstrain's sequence metadata."""
+
+    version_id: str
+    published: datetime
+
+
+class MetadataSource:
+    """A source of Nextstrain sequence metadata versions."""
+
+    def get_versions(self) -> list[MetadataVersion]:
+        """Return the available metadata versions, oldest first."""
+        raise NotImplementedError
+
+
+class NextstrainSource(MetadataSource):
+    """Versions of the sequence metadata file in Nextstrain's public S3 bucket."""
+
+    def __init__(self):
+        config = Config()
+        self.bucket = config.nextstrain_ncov_bucket
+        self.key = config.nextstrain_genome_metadata_key
+        self.client = boto3.client("s3", config=BotoConfig(signature_version=UNSIGNED))
+
+    def get_versions(self) -> list[MetadataVersion]:
+        versions = []
+        paginator = self.client.get_paginator("list_object_versions")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.key):
+            for version in page.get("Versions", []):
+                if version["Key"] == self.key:
+                    versions.append(
+                        MetadataVersion(version["VersionId"], version["LastModified"])
+                    )
+        return sorted(versions, key=lambda version: version.published)
+
+
+class DirectorySource(MetadataSource):
+    """
+    A stand-in for Nextstrain's S3 bucket: each file in a directory is a metadata version.
+
+    A file's name is its version ID, and its modification time is when it was published.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def get_versions(self) -> list[MetadataVersion]:
+        versions = [
+            MetadataVersion(
+                file.name,
+                datetime.fromtimestamp(file.stat().st_mtime, tz=timezone.utc),
+            )
+            for file in self.path.iterdir()
+            if file.is_file()
+        ]
+        return sorted(versions, key=lambda version: version.published)
+
+
+class Job(NamedTuple):
+    """
+    A run of one of the hub's scripts.
+
+    as_of is the sequence_as_of time of the metadata the job uses (UTC), and the job
+    doesn't start before not_before. A job is done when output exists.
+    """
+
+    script: str
+    args: tuple[str, ...]
+    as_of: datetime
+    not_before: datetime
+    output: Path
+
+    @property
+    def key(self) -> str:
+        """Identifies the job: the script and its arguments."""
+        return " ".join((self.script,) + self.args)
+
+
+def get_as_of(day: date) -> datetime:
+    """Return the sequence_as_of time that cladetime uses for a YYYY-MM-DD date."""
+    return datetime(day.year, day.month, day.day, 11, 59, 59, tzinfo=timezone.utc)
+
+
+def get_round_close(nowcast_date: date) -> datetime:
+    """Return the time (UTC) that submissions for a round close: 8 PM US/Eastern."""
+    close = datetime(
+        nowcast_date.year,
+        nowcast_date.month,
+        nowcast_date.day,
+        20,
+        tzinfo=ZoneInfo("US/Eastern"),
+    )
+    return close.astimezone(timezone.utc)
+
+
+def get_jobs(
+    now: datetime, root: Path = hub_root, lookback_weeks: int = 1
+) -> list[Job]:
+    """
+    Return the jobs for the next round and the latest rounds as of now.
+
+    The latest round is the most recent Wednesday on or before now (UTC). Location/date
+    counts and target data are included for the latest round and for lookback_weeks
+    rounds before it, so a runner that was stopped catches up on missed jobs.
+    """
+    today = now.astimezone(timezone.utc).date()
+    latest_round = today - timedelta(days=(today.weekday() - 2) % 7)
+    next_round = latest_round + timedelta(days=7)
+    clades_dir = root / "auxiliary-data" / "modeled-clades"
+
+    monday = next_round - timedelta(days=2)
+    jobs = [
+        Job(
+            "get_clades_to_model.py",
+            (),
+            get_as_of(monday),
+            datetime(monday.year, monday.month, monday.day, tzinfo=timezone.utc),
+            clades_dir / f"{next_round.isoformat()}.json",
+        )
+    ]
+
+    for weeks_ago in range(lookback_weeks + 1):
+        nowcast_date = latest_round - timedelta(weeks=weeks_ago)
+        round_close = get_round_close(nowcast_date)
+        jobs.append(
+            Job(
+                "get_location_date_counts.py",
+                ("--nowcast-date", nowcast_date.isoformat()),
+                round_close,
+                round_close,
+                root
+                / "auxiliary-data"
+                / "unscored-location-dates"
+                / f"{nowcast_date.isoformat()}.csv",
+            )
+        )
+
+        # sequence_as_of is 90 days after the oldest round scored with this target data
+        sequence_as_of = (
+            nowcast_date - timedelta(weeks=target_data_weeks) + timedelta(days=90)
+        )
+        for round_weeks_ago in range(target_data_weeks + 1):
+            round_id = (nowcast_date - timedelta(weeks=round_weeks_ago)).isoformat()
+            if not (clades_dir / f"{round_id}.json").exists():
+                continue
+            jobs.append(
+                Job(
+                    "get_target_data.py",
+                    (
+                        "--nowcast-date",
+                        round_id,
+                        "--sequence-as-of",
+                        sequence_as_of.isoformat(),
+                        "--rollups",
+                    ),
+                    get_as_of(sequence_as_of),
+                    round_close,
+                    root
+                    / "target-data"
+                    / "time-series"
+                    / f"as_of={sequence_as_of.isoformat()}"
+                    / f"nowcast_date={round_id}"
+                    / "timeseries.parquet",
+                )
+            )
+
+    return jobs
+
+
+def resolve_version(
+    job: Job, versions: list[MetadataVersion], now: datetime
+) -> MetadataVersion | None:
+    """
+    Return the metadata version that job would use if it started now, if it's final.
+
+    A job uses the latest version published on or before its as_of time. That version
+    is final once as_of has passed, or once a version has been published on the same
+    day as as_of (Nextstrain publishes sequence metadata once a day). Returns None if
+    the job can't start yet.
+    """
+    if now < job.not_before:
+        return None
+    published = [
+        version for version in versions if version.published <= min(now, job.as_of)
+    ]
+    if not published:
+        return None
+    version = max(published, key=lambda version: version.published)
+    if now >= job.as_of or version.published.date() == job.as_of.date():
+        return version
+    return None
+
+
+def run_script(job: Job):
+    """Run a job's script in a new Python process, raising an error if it fails."""
+    result = subprocess.run(
+        [sys.executable, job.script, *job.args],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        output = result.stderr.strip().splitlines()[-5:]
+        raise RuntimeError(
+            f"{job.script} exited with status {result.returncode}: {' / '.join(output)}"
+        )
+
+
+class JobRunner:
+    """
+    Start the hub's jobs when their sequence metadata is available.
+
+    Each call to poll() checks the source for metadata versions, records the jobs that
+    have finished, and submits ready jobs to a pool of worker threads, which call
+    run_job(job) (default: run_script). state maps each job's key to its status
+    ("succeeded", "retrying", or "failed"), number of attempts, the metadata version
+    of its last attempt, and (for "retrying" jobs) when it can be retried.
+
+    Example
+    -------
+    >>> runner = JobRunner(DirectorySource(Path("versions")), Path("state"))
+    >>> runner.poll()  # submits ready jobs
+    >>> runner.drain()  # waits for submitted jobs to finish
+    """
+
+    def __init__(
+        self,
+        source: MetadataSource,
+        state_dir: Path,
+        root: Path = hub_root,
+        workers: int = 1,
+        max_queue: int = 4,
+        max_attempts: int = 3,
+        retry_delay: timedelta = timedelta(minutes=10),
+        lookback_weeks: int = 1,
+        run_job: Callable[[Job], object] = run_script,
+    ):
+        if max_queue < workers:
+            raise ValueError(
+                f"max_queue ({max_queue}) is less than workers ({workers})"
+            )
+        self.source = source
+        self.state_dir = state_dir
+        self.root = root
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lookback_weeks = lookback_weeks
+        self.run_job = run_job
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending: dict[str, tuple[Job, MetadataVersion, Future]] = {}
+
+        state_file = state_dir / "state.json"
+        self.state: dict[str, dict] = (
+            json.loads(state_file.read_text())["jobs"] if state_file.exists() else {}
+        )
+
+    def poll(self, now: datetime | None = None) -> list[Job]:
+        """Record finished jobs, then submit ready jobs. Returns the submitted jobs."""
+        now = now or datetime.now(timezone.utc)
+        self._collect(now)
+
+        versions = self.source.get_versions()
+        submitted = []
+        for job in get_jobs(now, self.root, self.lookback_weeks):
+            if len(self.pending) >= self.max_queue:
+                break
+            if job.key in self.pending or job.output.exists():
+                continue
+            state = self.state.get(job.key, {})
+            if state.get("status") in ("succeeded", "failed"):
+                continue
+            if (
+                state.get("retry_at")
+                and datetime.fromisoformat(state["retry_at"]) > now
+            ):
+                continue
+            version = resolve_version(job, versions, now)
+            if version is None:
+                continue
+            logger.info(f"Starting {job.key} (metadata version {version.version_id})")
+            self.pending[job.key] = (
+                job,
+                version,
+                self.executor.submit(self.run_job, job),
+            )
+            submitted.append(job)
+
+        self.save()
+        return submitted
+
+    def drain(self, now: datetime | None = None):
+        """Wait for submitted jobs to finish and record them."""
+        for _, _, future in list(self.pending.values()):
+            future.exception()
+        self._collect(now or datetime.now(timezone.utc))
+        self.save()
+
+    def _collect(self, now: datetime):
+        for key, (job, version, future) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[key]
+            state = self.state.setdefault(key, {"attempts": 0})
+            state["attempts"] += 1
+            state["version"] = version.version_id
+            state["updated_at"] = now.isoformat(timespec="seconds")
+            error = future.exception()
+            if error is None:
+                state.update(status="succeeded", retry_at=None, error=None)
+                logger.info(f"{key} succeeded")
+            elif state["attempts"] >= self.max_attempts:
+                state.update(status="failed", retry_at=None, error=str(error))
+                logger.error(f"{key} failed {state['attempts']} times: {error}")
+            else:
+                retry_at = now + self.retry_delay * 2 ** (state["attempts"] - 1)
+                state.update(
+                    status="retrying",
+                    retry_at=retry_at.isoformat(timespec="seconds"),
+                    error=str(error),
+                )
+                logger.warning(f"{key} failed (retrying at {retry_at}): {error}")
+
+    def save(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = json.dumps({"jobs": self.state}, indent=4, sort_keys=True)
+        write_atomic(self.state_dir / "state.json", lambda path: path.write_text(state))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+@click.command()
+@click.option(
+    "--versions-dir",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help="Read metadata versions from the files in this directory (for testing). Default is Nextstrain's S3 bucket.",
+)
+@click.option(
+    "--state-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=default_state_dir,
+    show_default=True,
+    help="Directory where the state of the runner's jobs is saved.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of jobs to run at once.",
+)
+@click.option(
+    "--max-queue",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Maximum number of jobs queued or running at once.",
+)
+@click.option(
+    "--max-attempts",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Number of times to try a job before giving up on it.",
+)
+@click.option(
+    "--retry-delay",
+    type=click.FloatRange(min=0),
+    default=10,
+    show_default=True,
+    help="Minutes to wait before retrying a failed job (doubled after each failure).",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0),
+    default=5,
+    show_default=True,
+    help="Minutes between checks for new metadata versions.",
+)
+@click.option(
+    "--lookback-weeks",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Number of previous rounds to catch up on jobs for.",
+)
+@click.option(
+    "--once",
+    is_flag=True,
+    default=False,
+    help="Check for ready jobs once, wait for them to finish, and exit.",
+)
+def main(
+    versions_dir: Path | None,
+    state_dir: Path,
+    workers: int,
+    max_queue: int,
+    max_attempts: int,
+    retry_delay: float,
+    poll_interval: float,
+    lookback_weeks: int,
+    once: bool,
+) -> JobRunner:
+    if max_queue < workers:
+        raise click.UsageError("--max-queue must be at least --workers")
+    source = (
+        NextstrainSource() if versions_dir is None else DirectorySource(versions_dir)
+    )
+    runner = JobRunner(
+        source,
+        state_dir,
+        workers=workers,
+        max_queue=max_queue,
+        max_attempts=max_attempts,
+        retry_delay=timedelta(minutes=retry_delay),
+        lookback_weeks=lookback_weeks,
+    )
+    logger.info(f"Polling for sequence metadata every {poll_interval} minutes")
+    try:
+        while True:
+            runner.poll()
+            if once:
+                runner.drain()
+                break
+            time.sleep(poll_interval * 60)
+    finally:
+        runner.close()
+    return runner
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def add_version(versions_dir: Path, version_id: str, published: datetime):
+    """Add a metadata version to a DirectorySource directory."""
+    file = versions_dir / version_id
+    file.write_text(version_id)
+    os.utime(file, (published.timestamp(), published.timestamp()))
+
+
+@pytest.fixture
+def test_hub(tmp_path) -> Path:
+    """A hub with modeled-clades files for the rounds of 2026-08-05 and 2026-08-12."""
+    clades_dir = tmp_path / "hub" / "auxiliary-data" / "modeled-clades"
+    clades_dir.mkdir(parents=True)
+    for round_id in ["2026-08-05", "2026-08-12"]:
+        (clades_dir / f"{round_id}.json").write_text("{}")
+    return tmp_path / "hub"
+
+
+def test_directory_source(tmp_path):
+    add_version(tmp_path, "b", utc(2026, 8, 18, 6))
+    add_version(tmp_path, "a", utc(2026, 8, 17, 6))
+    assert DirectorySource(tmp_path).get_versions() == [
+        MetadataVersion("a", utc(2026, 8, 17, 6)),
+        MetadataVersion("b", utc(2026, 8, 18, 6)),
+    ]
+
+
+def test_nextstrain_source(live):
+    versions = NextstrainSource().get_versions()
+    assert len(versions) > 0
+    assert versions == sorted(versions, key=lambda version: version.published)
+    assert versions[-1].published.tzinfo is not None
+
+
+def test_get_jobs(test_hub):
+    # Thursday, after the 2026-08-12 round closed
+    jobs = {job.key: job for job in get_jobs(utc(2026, 8, 13, 3), test_hub, 0)}
+    assert list(jobs) == [
+        "get_clades_to_model.py",
+        "get_location_date_counts.py --nowcast-date 2026-08-12",
+        "get_target_data.py --nowcast-date 2026-08-12 --sequence-as-of 2026-08-11 --rollups",
+        "get_target_data.py --nowcast-date 2026-08-05 --sequence-as-of 2026-08-11 --rollups",
+    ]
+
+    clades = jobs["get_clades_to_model.py"]
+    assert clades.not_before == utc(2026, 8, 17)
+    assert clades.as_of == utc(2026, 8, 17, 11, 59, 59)
+    assert clades.output == test_hub / "auxiliary-data/modeled-clades/2026-08-19.json"
+
+    # the round closes at 8 PM EDT
+    counts = jobs["get_location_date_counts.py --nowcast-date 2026-08-12"]
+    assert counts.as_of == counts.not_before == utc(2026, 8, 13, 0)
+
+    target_data = jobs[
+        "get_target_data.py --nowcast-date 2026-08-05 --sequence-as-of 2026-08-11 --rollups"
+    ]
+    assert target_data.as_of == utc(2026, 8, 11, 11, 59, 59)
+    assert target_data.not_before == utc(2026, 8, 13, 0)
+    assert target_data.output == (
+        test_hub
+        / "target-data/time-series/as_of=2026-08-11/nowcast_date=2026-08-05/timeseries.parquet"
+    )
+
+    # on Wednesday, the latest round is that day's round
+    jobs = get_jobs(utc(2026, 8, 19, 12), test_hub, 1)
+    assert [
+        job.args for job in jobs if job.script == "get_location_date_counts.py"
+    ] == [
+        ("--nowcast-date", "2026-08-19"),
+        ("--nowcast-date", "2026-08-12"),
+    ]
+    assert [job.script for job in jobs].count("get_target_data.py") == 4
+
+
+def test_resolve_version():
+    job = Job("job.py", (), utc(2026, 8, 17, 11, 59, 59), utc(2026, 8, 17), Path("x"))
+    sunday = MetadataVersion("sunday", utc(2026, 8, 16, 8))
+    monday = MetadataVersion("monday", utc(2026, 8, 17, 8))
+    late_monday = MetadataVersion("late", utc(2026, 8, 17, 14))
+
+    # not before not_before
+    assert resolve_version(job, [sunday], utc(2026, 8, 16, 23)) is None
+    # Monday's version isn't published yet, and as_of hasn't passed
+    assert resolve_version(job, [sunday], utc(2026, 8, 17, 9)) is None
+    # Monday's version starts the job right away
+    assert resolve_version(job, [sunday, monday], utc(2026, 8, 17, 9)) == monday
+    # Monday's version was late, so the job uses Sunday's once as_of passes
+    assert resolve_version(job, [sunday], utc(2026, 8, 17, 12)) == sunday
+    assert resolve_version(job, [sunday, late_monday], utc(2026, 8, 17, 15)) == sunday
+    # no version published before as_of
+    assert resolve_version(job, [late_monday], utc(2026, 8, 18)) is None
+
+
+def test_runner(test_hub, tmp_path):
+    """Ready jobs are run once, failures are retried, and state is saved."""
+    versions_dir = tmp_path / "versions"
+    versions_dir.mkdir()
+    state_dir = tmp_path / "state"
+    calls = []
+
+    def run_job(job: Job):
+        calls.append(job.key)
+        if job.script == "get_location_date_counts.py" and calls.count(job.key) < 3:
+            raise RuntimeError("S3 timeout")
+        if job.script == "get_target_data.py":
+            job.output.parent.mkdir(parents=True)
+            job.output.write_text("")
+
+    def get_runner() -> JobRunner:
+        return JobRunner(
+            DirectorySource(versions_dir),
+            state_dir,
+            test_hub,
+            workers=2,
+            max_queue=2,
+            max_attempts=3,
+            retry_delay=timedelta(minutes=10),
+            lookback_weeks=0,
+            run_job=run_job,
+        )
+
+    runner = get_runner()
+    # no metadata versions yet
+    assert runner.poll(utc(2026, 8, 13, 1)) == []
+
+    # three jobs are ready, and the queue holds two at a time
+    add_version(versions_dir, "tuesday", utc(2026, 8, 11, 6))
+    submitted = runner.poll(utc(2026, 8, 13, 1))
+    assert [job.script for job in submitted] == [
+        "get_location_date_counts.py",
+        "get_target_data.py",
+    ]
+    runner.drain(utc(2026, 8, 13, 1))
+    assert runner.state[submitted[0].key]["status"] == "retrying"
+    assert runner.state[submitted[0].key]["retry_at"] == "2026-08-13T01:10:00+00:00"
+    assert runner.state[submitted[1].key]["status"] == "succeeded"
+
+    # the second target data job starts; counts wait for their retry time
+    submitted = runner.poll(utc(2026, 8, 13, 1, 5))
+    assert [job.args[1] for job in submitted] == ["2026-08-05"]
+    runner.drain(utc(2026, 8, 13, 1, 5))
+
+    # retries wait twice as long after each failure
+    assert [job.key for job in runner.poll(utc(2026, 8, 13, 1, 10))] == [
+        "get_location_date_counts.py --nowcast-date 2026-08-12"
+    ]
+    runner.drain(utc(2026, 8, 13, 1, 10))
+    counts_key = "get_location_date_counts.py --nowcast-date 2026-08-12"
+    assert runner.state[counts_key]["retry_at"] == "2026-08-13T01:30:00+00:00"
+    assert runner.poll(utc(2026, 8, 13, 1, 20)) == []
+    assert len(runner.poll(utc(2026, 8, 13, 1, 30))) == 1
+    runner.drain(utc(2026, 8, 13, 1, 30))
+    assert runner.state[counts_key] == {
+        "attempts": 3,
+        "error": None,
+        "retry_at": None,
+        "status": "succeeded",
+        "updated_at": "2026-08-13T01:30:00+00:00",
+        "version": "tuesday",
+    }
+    runner.close()
+
+    # a new runner reads the saved state, and runs the clade list job when Monday's
+    # metadata is published
+    runner = get_runner()
+    assert runner.poll(utc(2026, 8, 17, 2)) == []
+    add_version(versions_dir, "monday", utc(2026, 8, 17, 3))
+    assert [job.key for job in runner.poll(utc(2026, 8, 17, 4))] == [
+        "get_clades_to_model.py"
+    ]
+    runner.drain(utc(2026, 8, 17, 4))
+    assert runner.poll(utc(2026, 8, 17, 5)) == []
+    runner.close()
+    assert calls.count(counts_key) == 3
+    assert calls.count("get_clades_to_model.py") == 1
+
+
+def test_runner_gives_up(test_hub, tmp_path):
+    """A job that fails max_attempts times isn't retried."""
+    calls = []
+
+    def run_job(job: Job):
+        calls.append(job.key)
+        raise RuntimeError("no space left on device")
+
+    versions_dir = tmp_path / "versions"
+    versions_dir.mkdir()
+    add_version(versions_dir, "monday", utc(2026, 8, 17, 3))
+    runner = JobRunner(
+        DirectorySource(versions_dir),
+        tmp_path / "state",
+        test_hub,
+        max_attempts=2,
+        retry_delay=timedelta(0),
+        run_job=run_job,
+    )
+    for _ in range(3):
+        runner.poll(utc(2026, 8, 17, 4))
+        runner.drain(utc(2026, 8, 17, 4))
+    runner.close()
+    assert calls == ["get_clades_to_model.py"] * 2
+    assert runner.state["get_clades_to_model.py"]["status"] == "failed"
+    assert runner.state["get_clades_to_model.py"]["error"] == "no space left on device"
+
+    with pytest.raises(ValueError, match="max_queue"):
+        JobRunner(DirectorySource(versions_dir), tmp_path, workers=2, max_queue=1)
+
+
+def test_main(tmp_path):
+    """With no metadata versions, the runner has nothing to do."""
+    runner = main(
+        [
+            "--versions-dir",
+            str(tmp_path),
+            "--state-dir",
+            str(tmp_path / "state"),
+            "--once",
+        ],
+        standalone_mode=False,
+    )
+    assert runner.state == {}
+    assert json.loads((tmp_path / "state" / "state.json").read_text()) == {"jobs": {}}
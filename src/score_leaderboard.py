@@ -0,0 +1,672 @@
+"""
+Keep leaderboard tables of the hub's scores, folding in only new score partitions.
+
+score_nowcasts_script.R writes each model's scores for a round to its own partition:
+
+    auxiliary-data/scores/team=<model_id>/nowcast_date=YYYY-MM-DD/scored_nowcast.parquet
+
+(or an error.log in the same directory if scoring failed). combine_scores_tsv and
+energy_summary read every partition again each time a round is added. This script keeps
+sums and counts of energy, brier_point, and brier_dist in two small tables instead:
+
+    by_location.parquet   one row per model_id, nowcast_date, location, and scored
+    by_horizon.parquet    one row per model_id, nowcast_date, horizon, and scored
+
+where horizon is target_date - nowcast_date, in days. Each run compares the partitions in
+--scores-dir to the ones already counted (by modification time and size), reads only the
+new or changed partitions, and replaces their rows in the tables. Leaderboards (overall,
+by location, or by horizon) are then aggregated from the tables, which have a few hundred
+rows per model and round, rather than from the scores.
+
+A model's relative skill is its mean score divided by the baseline model's mean score,
+over the location/target dates that both models have a score for (lower is better). To
+pair scores task by task, the tables also keep sums of the model's and the baseline's
+scores over those shared tasks. So when the baseline's partition for a round is added or
+changed, every partition of that round is read again.
+
+The tables are saved to --state-dir:
+
+    state.json              parameters of the tables (the baseline model)
+    partitions.parquet      the score partitions that are counted in the tables
+    by_location.parquet
+    by_horizon.parquet
+
+Folding in a partition replaces all of its rows, so an interrupted run is repaired by the
+next one.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/score_leaderboard.py --by=location --metric=brier_point
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/score_leaderboard.py
+"""
+
+import json
+import logging
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import click
+import polars as pl
+
+from atomic_files import write_atomic
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+default_state_dir = Path.home() / ".variant-nowcast-hub" / "score-leaderboard"
+
+metrics = ["energy", "brier_point", "brier_dist"]
+
+partition_schema = {
+    "model_id": pl.String,
+    "nowcast_date": pl.Date,
+    "status": pl.String,
+    "modified_ns": pl.Int64,
+    "size": pl.Int64,
+}
+
+score_schema = {
+    "location": pl.String,
+    "target_date": pl.Date,
+    "scored": pl.Boolean,
+    **{metric: pl.Float64 for metric in metrics},
+}
+
+
+def get_table_schema(key: str) -> dict:
+    """Return the schema of the table of partial sums by key (location or horizon)."""
+    schema = {
+        "model_id": pl.String,
+        "nowcast_date": pl.Date,
+        key: pl.String if key == "location" else pl.Int32,
+        "scored": pl.Boolean,
+    }
+    for metric in metrics:
+        schema[f"{metric}_sum"] = pl.Float64
+        schema[f"{metric}_n"] = pl.UInt32
+        schema[f"{metric}_paired_sum"] = pl.Float64
+        schema[f"{metric}_baseline_sum"] = pl.Float64
+        schema[f"{metric}_paired_n"] = pl.UInt32
+    return schema
+
+
+def list_partitions(scores_dir: Path) -> pl.DataFrame:
+    """
+    Return the score partitions in scores_dir.
+
+    A partition's status is "success" if it has a scored_nowcast.parquet file and "error"
+    if it has an error.log file. Directories with neither (e.g., scoring is still
+    running) are left out.
+    """
+    rows = []
+    for partition_dir in sorted(scores_dir.glob("team=*/nowcast_date=*")):
+        for file_name, status in [
+            ("scored_nowcast.parquet", "success"),
+            ("error.log", "error"),
+        ]:
+            path = partition_dir / file_name
+            if path.is_file():
+                stat = path.stat()
+                rows.append(
+                    (
+                        partition_dir.parent.name.removeprefix("team="),
+                        date.fromisoformat(
+                            partition_dir.name.removeprefix("nowcast_date=")
+                        ),
+                        status,
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    )
+                )
+                break
+    return pl.DataFrame(rows, schema=partition_schema, orient="row")
+
+
+def read_partition(scores_dir: Path, model_id: str, nowcast_date: date) -> pl.DataFrame:
+    """Return a model's location/target date scores for a round."""
+    path = (
+        scores_dir
+        / f"team={model_id}"
+        / f"nowcast_date={nowcast_date.isoformat()}"
+        / "scored_nowcast.parquet"
+    )
+    return (
+        pl.read_parquet(path, hive_partitioning=False)
+        .select(score_schema.keys())
+        .cast(score_schema)  # type: ignore
+    )
+
+
+def sum_scores(
+    scores: pl.DataFrame,
+    baseline_scores: pl.DataFrame | None,
+    model_id: str,
+    nowcast_date: date,
+) -> dict[str, pl.DataFrame]:
+    """
+    Return the partial sums of a model's scores for a round, by location and by horizon.
+
+    baseline_scores are the baseline model's scores for the same round (None if there
+    are none); the paired sums only count location/target dates scored for both models.
+    """
+    if baseline_scores is None:
+        baseline_scores = pl.DataFrame(schema=score_schema)
+    joined = scores.join(
+        baseline_scores.select(
+            "location",
+            "target_date",
+            *[pl.col(metric).alias(f"baseline_{metric}") for metric in metrics],
+        ),
+        on=["location", "target_date"],
+        how="left",
+    ).with_columns(
+        model_id=pl.lit(model_id),
+        nowcast_date=pl.lit(nowcast_date),
+        horizon=(pl.col("target_date") - pl.lit(nowcast_date))
+        .dt.total_days()
+        .cast(pl.Int32),
+    )
+    aggs = []
+    for metric in metrics:
+        paired = (
+            pl.col(metric).is_not_null() & pl.col(f"baseline_{metric}").is_not_null()
+        )
+        aggs += [
+            pl.col(metric).sum().alias(f"{metric}_sum"),
+            pl.col(metric).count().alias(f"{metric}_n"),
+            pl.col(metric).filter(paired).sum().alias(f"{metric}_paired_sum"),
+            pl.col(f"baseline_{metric}")
+            .filter(paired)
+            .sum()
+            .alias(f"{metric}_baseline_sum"),
+            paired.sum().alias(f"{metric}_paired_n"),
+        ]
+    tables = {}
+    for key in ["location", "horizon"]:
+        schema = get_table_schema(key)
+        tables[key] = (
+            joined.group_by("model_id", "nowcast_date", key, "scored")
+            .agg(aggs)
+            .select(schema.keys())
+            .cast(schema)  # type: ignore
+        )
+    return tables
+
+
+class ScoreLeaderboard:
+    """
+    Partial sums of the hub's scores, by model, round, and location or horizon.
+
+    update() folds new and changed score partitions into the sums, and get_leaderboard()
+    aggregates them into a leaderboard.
+    """
+
+    def __init__(self, baseline: str = "Hub-baseline"):
+        self.baseline = baseline
+        self.partitions = pl.DataFrame(schema=partition_schema)
+        self.tables = {
+            key: pl.DataFrame(schema=get_table_schema(key))
+            for key in ["location", "horizon"]
+        }
+
+    @property
+    def params(self) -> dict:
+        return {"baseline": self.baseline}
+
+    def update(self, scores_dir: Path) -> int:
+        """
+        Fold new, changed, and removed partitions in scores_dir into the sums.
+
+        Returns the number of partitions that were read.
+        """
+        current = list_partitions(scores_dir)
+        changed = current.join(self.partitions, on=partition_schema.keys(), how="anti")
+        removed = self.partitions.join(
+            current, on=["model_id", "nowcast_date"], how="anti"
+        )
+        # a change to the baseline's scores changes every model's paired sums for the round
+        baseline_rounds = pl.concat([changed, removed]).filter(model_id=self.baseline)[
+            "nowcast_date"
+        ]
+        refold = current.filter(
+            pl.col("nowcast_date").is_in(baseline_rounds.implode())
+            | pl.struct("model_id", "nowcast_date").is_in(
+                changed.select(pl.struct("model_id", "nowcast_date"))
+                .to_series()
+                .implode()
+            )
+        )
+        replaced = pl.concat([refold, removed]).select("model_id", "nowcast_date")
+        if replaced.is_empty():
+            logger.info(f"The leaderboard is up to date ({current.height} partitions)")
+            return 0
+
+        to_read = refold.filter(status="success")
+        new_rows: dict[str, list[pl.DataFrame]] = {"location": [], "horizon": []}
+        for (nowcast_date,), partitions in to_read.group_by(
+            "nowcast_date", maintain_order=True
+        ):
+            baseline_scores = None
+            if current.filter(
+                model_id=self.baseline, nowcast_date=nowcast_date, status="success"
+            ).height:
+                baseline_scores = read_partition(
+                    scores_dir, self.baseline, nowcast_date
+                )
+            for model_id in partitions["model_id"]:
+                if model_id == self.baseline and baseline_scores is not None:
+                    scores = baseline_scores
+                else:
+                    scores = read_partition(scores_dir, model_id, nowcast_date)
+                for key, sums in sum_scores(
+                    scores, baseline_scores, model_id, nowcast_date
+                ).items():
+                    new_rows[key].append(sums)
+
+        for key, table in self.tables.items():
+            self.tables[key] = pl.concat(
+                [
+                    table.join(replaced, on=["model_id", "nowcast_date"], how="anti"),
+                    *new_rows[key],
+                ]
+            ).sort("model_id", "nowcast_date", key, "scored")
+        self.partitions = current
+        logger.info(
+            f"Read {to_read.height} score partitions "
+            f"({changed.height} new or changed, {removed.height} removed)"
+        )
+        return to_read.height
+
+    def get_leaderboard(
+        self,
+        metric: str = "energy",
+        by: str | None = None,
+        include_unscored: bool = False,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> pl.DataFrame:
+        """
+        Return each model's mean score and relative skill, overall or by location or horizon.
+
+        Only location/target dates with scored = TRUE are counted, unless include_unscored
+        is True. start_date and end_date limit the rounds (nowcast dates) counted.
+        relative_skill is null when a model has no scores in common with the baseline.
+        Models are ranked by relative skill, then by mean score.
+        """
+        if metric not in metrics:
+            raise ValueError(f"Unknown metric {metric}; expected one of {metrics}")
+        if by not in [None, "location", "horizon"]:
+            raise ValueError(
+                f"Unknown leaderboard grouping {by}; expected location or horizon"
+            )
+        keys = ["model_id"] + ([by] if by else [])
+        table = self.tables["horizon" if by == "horizon" else "location"].lazy()
+        if not include_unscored:
+            table = table.filter("scored")
+        if start_date is not None:
+            table = table.filter(pl.col("nowcast_date") >= start_date)
+        if end_date is not None:
+            table = table.filter(pl.col("nowcast_date") <= end_date)
+
+        paired_n = pl.col(f"{metric}_paired_n").sum()
+        return (
+            table.group_by(keys)
+            .agg(
+                rounds=pl.col("nowcast_date")
+                .filter(pl.col(f"{metric}_n") > 0)
+                .n_unique()
+                .cast(pl.UInt32),
+                n=pl.col(f"{metric}_n").sum(),
+                mean=pl.col(f"{metric}_sum").sum() / pl.col(f"{metric}_n").sum(),
+                paired_n=paired_n,
+                relative_skill=pl.when(paired_n > 0).then(
+                    pl.col(f"{metric}_paired_sum").sum()
+                    / pl.col(f"{metric}_baseline_sum").sum()
+                ),
+            )
+            .filter(pl.col("n") > 0)
+            .sort([*keys[1:], "relative_skill", "mean", "model_id"], nulls_last=True)
+            .collect()
+        )
+
+    def save(self, state_dir: Path):
+        """Save the partial sums and the partitions they count to state_dir."""
+        state_dir.mkdir(parents=True, exist_ok=True)
+        for key, table in self.tables.items():
+            write_atomic(
+                state_dir / f"by_{key}.parquet",
+                lambda path: table.write_parquet(path),
+            )
+        write_atomic(
+            state_dir / "partitions.parquet",
+            lambda path: self.partitions.write_parquet(path),
+        )
+        # state.json is written last: it's what load() checks for
+        write_atomic(
+            state_dir / "state.json",
+            lambda path: path.write_text(json.dumps({"params": self.params}, indent=4)),
+        )
+
+    @classmethod
+    def load(cls, state_dir: Path) -> "ScoreLeaderboard":
+        """Return a leaderboard with the state saved in state_dir."""
+        state = json.loads((state_dir / "state.json").read_text())
+        leaderboard = cls(**state["params"])
+        leaderboard.partitions = pl.read_parquet(state_dir / "partitions.parquet").cast(
+            partition_schema  # type: ignore
+        )
+        for key in leaderboard.tables:
+            leaderboard.tables[key] = pl.read_parquet(
+                state_dir / f"by_{key}.parquet"
+            ).cast(
+                get_table_schema(key)  # type: ignore
+            )
+        return leaderboard
+
+
+@click.command()
+@click.option(
+    "--scores-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=hub_root / "auxiliary-data" / "scores",
+    show_default=True,
+    help="Directory of team=*/nowcast_date=* score partitions.",
+)
+@click.option(
+    "--state-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=default_state_dir,
+    show_default=True,
+    help="Directory where the leaderboard's partial sums are saved.",
+)
+@click.option(
+    "--baseline",
+    type=str,
+    default="Hub-baseline",
+    show_default=True,
+    help="Model that relative skill is measured against.",
+)
+@click.option(
+    "--metric",
+    type=click.Choice(metrics),
+    default="energy",
+    show_default=True,
+    help="Score to rank models by.",
+)
+@click.option(
+    "--by",
+    type=click.Choice(["overall", "location", "horizon"]),
+    default="overall",
+    show_default=True,
+    help="Report one leaderboard, or one per location or horizon (target_date - nowcast_date, in days).",
+)
+@click.option(
+    "--include-unscored",
+    is_flag=True,
+    default=False,
+    help="Also count location/target dates with scored = FALSE.",
+)
+@click.option(
+    "--start-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="First round (nowcast date) to count (YYYY-MM-DD).",
+)
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="Last round (nowcast date) to count (YYYY-MM-DD).",
+)
+@click.option(
+    "--output-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help="Save the leaderboard to this .csv or .parquet file.",
+)
+@click.option(
+    "--reset",
+    is_flag=True,
+    default=False,
+    help="Discard the saved partial sums and read every partition again.",
+)
+def main(
+    scores_dir: Path,
+    state_dir: Path,
+    baseline: str,
+    metric: str,
+    by: str,
+    include_unscored: bool,
+    start_date,
+    end_date,
+    output_file: Path | None,
+    reset: bool,
+) -> pl.DataFrame:
+    if output_file is not None and output_file.suffix not in [".csv", ".parquet"]:
+        raise click.UsageError("--output-file must be a .csv or .parquet file")
+
+    leaderboard = ScoreLeaderboard(baseline)
+    if (state_dir / "state.json").exists() and not reset:
+        saved = ScoreLeaderboard.load(state_dir)
+        if saved.params != leaderboard.params:
+            raise click.UsageError(
+                f"The leaderboard in {state_dir} uses {saved.params}; use --reset to start over with new parameters"
+            )
+        leaderboard = saved
+
+    if leaderboard.update(scores_dir):
+        leaderboard.save(state_dir)
+
+    result = leaderboard.get_leaderboard(
+        metric,
+        by=None if by == "overall" else by,
+        include_unscored=include_unscored,
+        start_date=start_date.date() if start_date else None,
+        end_date=end_date.date() if end_date else None,
+    )
+    with pl.Config(tbl_rows=-1, tbl_hide_dataframe_shape=True):
+        logger.info(f"{metric} leaderboard ({by}):\n{result}")
+    if output_file is not None:
+        if output_file.suffix == ".csv":
+            result.write_csv(output_file)
+        else:
+            result.write_parquet(output_file)
+        logger.info(f"Leaderboard saved to {output_file}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+def write_test_partition(
+    scores_dir: Path,
+    model_id: str,
+    nowcast_date: date,
+    scale: float = 1.0,
+    missing_energy: bool = False,
+    seed: int = 0,
+):
+    """Write scores for two locations and three target dates (the last one unscored)."""
+    rows = []
+    for i, location in enumerate(["MA", "TX"]):
+        for horizon in [-1, 0, 1]:
+            value = scale * (1 + i + horizon + 10 + seed % 7)
+            rows.append(
+                (
+                    location,
+                    nowcast_date + timedelta(days=horizon),
+                    horizon < 1,
+                    None if missing_energy and location == "TX" else value,
+                    value / 10,
+                    value / 5,
+                )
+            )
+    partition_dir = (
+        scores_dir / f"team={model_id}" / f"nowcast_date={nowcast_date.isoformat()}"
+    )
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame(rows, schema=score_schema, orient="row").write_parquet(
+        partition_dir / "scored_nowcast.parquet"
+    )
+    # a rewritten partition must look changed even within the file system's mtime resolution
+    path = partition_dir / "scored_nowcast.parquet"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + seed))
+
+
+def read_all_scores(scores_dir: Path) -> pl.DataFrame:
+    """Return every successful partition's scores, as combine_scores_tsv does."""
+    partitions = list_partitions(scores_dir).filter(status="success")
+    return pl.concat(
+        read_partition(scores_dir, model_id, nowcast_date).with_columns(
+            model_id=pl.lit(model_id), nowcast_date=pl.lit(nowcast_date)
+        )
+        for model_id, nowcast_date in partitions.select(
+            "model_id", "nowcast_date"
+        ).iter_rows()
+    )
+
+
+round_1 = date(2025, 1, 1)
+round_2 = date(2025, 1, 8)
+
+
+def test_leaderboard(tmp_path):
+    """Means and relative skill match the scores they are folded from."""
+    write_test_partition(tmp_path, "Hub-baseline", round_1, scale=2.0)
+    write_test_partition(tmp_path, "team-a", round_1, missing_energy=True)
+    write_test_partition(tmp_path, "team-b", round_1, scale=3.0)
+    leaderboard = ScoreLeaderboard()
+    assert leaderboard.update(tmp_path) == 3
+
+    overall = leaderboard.get_leaderboard("energy")
+    assert overall["model_id"].to_list() == ["team-a", "Hub-baseline", "team-b"]
+    scores = read_all_scores(tmp_path).filter("scored")
+    expected_mean = scores.group_by("model_id").agg(pl.mean("energy"))
+    assert overall.join(expected_mean, on="model_id").select(
+        (pl.col("mean") - pl.col("energy")).abs().max()
+    ).item() == pytest.approx(0)
+
+    # team-a has no TX energy scores, so it is compared to the baseline on MA only
+    team_a = overall.filter(model_id="team-a").row(0, named=True)
+    assert (team_a["n"], team_a["paired_n"], team_a["rounds"]) == (2, 2, 1)
+    assert team_a["relative_skill"] == pytest.approx(0.5)
+    assert overall.filter(model_id="team-b")["relative_skill"].item() == pytest.approx(
+        1.5
+    )
+    assert overall.filter(model_id="Hub-baseline")[
+        "relative_skill"
+    ].item() == pytest.approx(1.0)
+
+    # unscored target dates are left out unless asked for
+    assert overall.filter(model_id="team-b")["n"].item() == 4
+    with_unscored = leaderboard.get_leaderboard("energy", include_unscored=True)
+    assert with_unscored.filter(model_id="team-b")["n"].item() == 6
+
+    by_location = leaderboard.get_leaderboard("brier_point", by="location")
+    assert by_location.select("location", "model_id").rows() == [
+        ("MA", "team-a"),
+        ("MA", "Hub-baseline"),
+        ("MA", "team-b"),
+        ("TX", "team-a"),
+        ("TX", "Hub-baseline"),
+        ("TX", "team-b"),
+    ]
+    by_horizon = leaderboard.get_leaderboard("brier_dist", by="horizon")
+    assert sorted(set(by_horizon["horizon"].to_list())) == [-1, 0]
+
+    with pytest.raises(ValueError, match="Unknown metric"):
+        leaderboard.get_leaderboard("wis")
+
+
+def test_incremental_update(tmp_path):
+    """Folding in partitions one run at a time gives the same tables as a full read."""
+    write_test_partition(tmp_path, "team-a", round_1)
+    write_test_partition(tmp_path, "team-b", round_1, scale=2.0)
+    leaderboard = ScoreLeaderboard()
+    assert leaderboard.update(tmp_path) == 2
+    assert leaderboard.get_leaderboard()["relative_skill"].is_null().all()
+    assert leaderboard.update(tmp_path) == 0
+
+    # a new round is read on its own
+    write_test_partition(tmp_path, "team-a", round_2, seed=1)
+    assert leaderboard.update(tmp_path) == 1
+
+    # the baseline arrives late: every partition of its round is read again
+    write_test_partition(tmp_path, "Hub-baseline", round_1, scale=4.0)
+    assert leaderboard.update(tmp_path) == 3
+    assert leaderboard.get_leaderboard().filter(model_id="team-a")[
+        "relative_skill"
+    ].item() == pytest.approx(0.25)
+
+    # a rescored partition replaces its rows, and a failed one is left out
+    write_test_partition(tmp_path, "team-b", round_1, scale=3.0, seed=2)
+    error_dir = tmp_path / "team=team-c" / f"nowcast_date={round_2.isoformat()}"
+    error_dir.mkdir(parents=True)
+    (error_dir / "error.log").write_text("validation failed")
+    assert leaderboard.update(tmp_path) == 1
+    assert leaderboard.partitions.filter(status="error").height == 1
+
+    full = ScoreLeaderboard()
+    full.update(tmp_path)
+    for key in ["location", "horizon"]:
+        assert leaderboard.tables[key].equals(full.tables[key])
+
+    # removing a partition removes its rows
+    (tmp_path / "team=team-a" / f"nowcast_date={round_2.isoformat()}").joinpath(
+        "scored_nowcast.parquet"
+    ).unlink()
+    assert leaderboard.update(tmp_path) == 0
+    assert leaderboard.get_leaderboard().filter(model_id="team-a")["rounds"].item() == 1
+    assert leaderboard.get_leaderboard(start_date=round_2).is_empty()
+
+
+def test_main(tmp_path):
+    """The CLI saves the partial sums and reads only new partitions on the next run."""
+    scores_dir = tmp_path / "scores"
+    state_dir = tmp_path / "state"
+    write_test_partition(scores_dir, "Hub-baseline", round_1)
+    write_test_partition(scores_dir, "team-a", round_1, scale=0.5)
+    args = ["--scores-dir", str(scores_dir), "--state-dir", str(state_dir)]
+
+    result = main(args, standalone_mode=False)
+    assert result["model_id"].to_list() == ["team-a", "Hub-baseline"]
+    assert (state_dir / "by_location.parquet").exists()
+
+    write_test_partition(scores_dir, "team-b", round_2)
+    output_file = tmp_path / "leaderboard.csv"
+    result = main(
+        args + ["--by", "horizon", "--output-file", str(output_file)],
+        standalone_mode=False,
+    )
+    assert ScoreLeaderboard.load(state_dir).partitions.height == 3
+    assert pl.read_csv(output_file).height == result.height == 6
+
+    with pytest.raises(click.UsageError, match="--reset"):
+        main(args + ["--baseline", "team-a"], standalone_mode=False)
+    result = main(args + ["--baseline", "team-a", "--reset"], standalone_mode=False)
+    assert result.filter(model_id="Hub-baseline")[
+        "relative_skill"
+    ].item() == pytest.approx(2.0)
@@ -0,0 +1,385 @@
+"""
+Generate synthetic model output submissions for a modeling round.
+
+This script creates full-size, schema-valid submissions for a set of synthetic
+teams, for load-testing the hub's validation, ensembling, and scoring code. It
+is a faster, round-aware version of sim_model_output.R.
+
+The round's locations, target dates, and number of samples per task are read
+from hub-config/tasks.json, and its clades are read from
+auxiliary-data/modeled-clades/<round_id>.json. For each team, clade
+proportions for every location, target date, and sample are drawn from a
+Dirichlet distribution (one batch of draws per location chunk, normalized
+gamma variates), and the mean of the samples is included as the mean output
+type. Each team gets its own Dirichlet concentration parameters so that
+submissions differ between teams.
+
+Submissions are written in the hub's model-output layout:
+
+    <output-dir>/<model_id>/<round_id>-<model_id>.parquet
+
+where model_id is sim-team01, sim-team02, and so on. The script does not
+create model-metadata files.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/sim_model_output.py --nowcast-date=2026-08-19 --teams=10
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/sim_model_output.py
+"""
+
+import json
+import logging
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import click
+import numpy as np
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+from atomic_files import write_atomic
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# number of locations simulated (and written as one row group) at a time
+locations_per_batch = 8
+
+model_output_schema = pa.schema(
+    [
+        ("nowcast_date", pa.date32()),
+        ("target_date", pa.date32()),
+        ("clade", pa.string()),
+        ("location", pa.string()),
+        ("output_type", pa.string()),
+        ("output_type_id", pa.string()),
+        ("value", pa.float64()),
+    ]
+)
+
+
+def set_output_dir(ctx, param, value):
+    """Set the output_dir default value to sim-model-output in the current working directory."""
+    if value is None:
+        value = Path.cwd() / "sim-model-output"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=True,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--teams",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of synthetic teams to create submissions for.",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_output_dir,
+    help="Directory where submissions are saved. Default is sim-model-output in the current working directory.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=42,
+    show_default=True,
+    help="Random seed.",
+)
+def main(nowcast_date: datetime, teams: int, output_dir: Path, seed: int) -> list[Path]:
+    round_id = nowcast_date.strftime("%Y-%m-%d")
+    round_tasks = get_round_tasks(round_id)
+    rng = np.random.default_rng(seed)
+
+    output_files = []
+    start = time.perf_counter()
+    rows = 0
+    for team in range(1, teams + 1):
+        model_id = f"sim-team{team:02}"
+        alpha = rng.uniform(0.5, 5, len(round_tasks["clades"]))
+        output_file = output_dir / model_id / f"{round_id}-{model_id}.parquet"
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        rows += write_model_output(output_file, round_tasks, alpha, rng)
+        output_files.append(output_file)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Wrote {rows:,} rows for {teams} teams to {output_dir} "
+        f"in {elapsed:.1f} seconds ({rows / elapsed:,.0f} rows/second)"
+    )
+
+    return output_files
+
+
+def get_round_tasks(
+    round_id: str,
+    tasks_file: Path = hub_root / "hub-config" / "tasks.json",
+    modeled_clades_dir: Path = hub_root / "auxiliary-data" / "modeled-clades",
+) -> dict:
+    """
+    Return the locations, target dates, clades, and number of samples per task
+    for a modeling round.
+    """
+    with open(tasks_file) as f:
+        tasks = json.load(f)
+
+    for round_config in tasks["rounds"]:
+        model_task = round_config["model_tasks"][0]
+        task_ids = model_task["task_ids"]
+        if task_ids["nowcast_date"]["required"] == [round_id]:
+            break
+    else:
+        raise ValueError(f"Round {round_id} not found in {tasks_file}")
+
+    with open(modeled_clades_dir / f"{round_id}.json") as f:
+        clades = json.load(f)["clades"]
+
+    return {
+        "nowcast_date": date.fromisoformat(round_id),
+        "locations": task_ids["location"]["optional"],
+        "target_dates": [
+            date.fromisoformat(d) for d in task_ids["target_date"]["optional"]
+        ],
+        "clades": clades,
+        "samples": model_task["output_type"]["sample"]["output_type_id_params"][
+            "min_samples_per_task"
+        ],
+    }
+
+
+def simulate_model_output(
+    round_tasks: dict,
+    locations: list[str],
+    alpha: np.ndarray,
+    rng: np.random.Generator,
+) -> pa.Table:
+    """Return simulated sample and mean model output for a set of locations."""
+    n_dates = len(round_tasks["target_dates"])
+    n_samples = round_tasks["samples"]
+    n_clades = len(round_tasks["clades"])
+
+    # Dirichlet draws as normalized gamma variates: (location, date, sample, clade)
+    proportions = rng.standard_gamma(
+        alpha, size=(len(locations), n_dates, n_samples, n_clades)
+    )
+    proportions /= proportions.sum(axis=3, keepdims=True)
+
+    return get_model_output_table(round_tasks, locations, proportions)
+
+
+def get_model_output_table(
+    round_tasks: dict, locations: list[str], proportions: np.ndarray
+) -> pa.Table:
+    """
+    Return hub-formatted sample and mean model output for a set of locations.
+
+    proportions holds clade proportions for each location, target date, and
+    sample, with shape (location, target date, sample, clade); the mean output
+    type is the mean of the samples. Rows are ordered by output type, location,
+    target date, sample, and clade. Sample output_type_ids are the location
+    followed by a two-digit sample number (e.g., AL00), so each sample is a
+    trajectory across a location's target dates.
+    """
+    n_locations, n_dates, n_samples, n_clades = proportions.shape
+    means = proportions.mean(axis=2)
+
+    days = np.array(round_tasks["target_dates"], dtype="datetime64[D]").astype(np.int32)
+    clades = pa.array(round_tasks["clades"], pa.string())
+    locations_array = pa.array(locations, pa.string())
+    sample_ids = pa.array(
+        [
+            f"{location}{sample:02}"
+            for location in locations
+            for sample in range(n_samples)
+        ],
+        pa.string(),
+    )
+
+    n_rows = proportions.size
+    sample_table = pa.table(
+        {
+            "target_date": pa.array(
+                np.tile(np.repeat(days, n_samples * n_clades), n_locations), pa.date32()
+            ),
+            "clade": clades.take(np.tile(np.arange(n_clades), n_rows // n_clades)),
+            "location": locations_array.take(
+                np.repeat(np.arange(n_locations), n_rows // n_locations)
+            ),
+            "output_type": pa.repeat("sample", n_rows),
+            "output_type_id": sample_ids.take(
+                np.tile(
+                    np.repeat(np.arange(n_samples), n_clades), n_locations * n_dates
+                )
+                + np.repeat(np.arange(n_locations) * n_samples, n_rows // n_locations)
+            ),
+            "value": proportions.ravel(),
+        }
+    )
+
+    n_mean_rows = means.size
+    mean_table = pa.table(
+        {
+            "target_date": pa.array(
+                np.tile(np.repeat(days, n_clades), n_locations), pa.date32()
+            ),
+            "clade": clades.take(np.tile(np.arange(n_clades), n_mean_rows // n_clades)),
+            "location": locations_array.take(
+                np.repeat(np.arange(n_locations), n_mean_rows // n_locations)
+            ),
+            "output_type": pa.repeat("mean", n_mean_rows),
+            "output_type_id": pa.nulls(n_mean_rows, pa.string()),
+            "value": means.ravel(),
+        }
+    )
+
+    table = pa.concat_tables([mean_table, sample_table])
+    table = table.add_column(
+        0,
+        "nowcast_date",
+        pa.repeat(pa.scalar(round_tasks["nowcast_date"], pa.date32()), table.num_rows),
+    )
+
+    return table.cast(model_output_schema)
+
+
+def write_model_output(
+    output_file: Path, round_tasks: dict, alpha: np.ndarray, rng: np.random.Generator
+) -> int:
+    """
+    Write a synthetic submission to output_file, one row group per batch of
+    locations, and return the number of rows written.
+    """
+    locations = round_tasks["locations"]
+    rows = 0
+
+    def write(path: Path):
+        nonlocal rows
+        with pq.ParquetWriter(path, model_output_schema) as writer:
+            for start in range(0, len(locations), locations_per_batch):
+                table = simulate_model_output(
+                    round_tasks,
+                    locations[start : start + locations_per_batch],
+                    alpha,
+                    rng,
+                )
+                writer.write_table(table)
+                rows += table.num_rows
+
+    write_atomic(output_file, write)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def test_get_round_tasks():
+    """Round tasks are read from the hub's tasks.json and modeled-clades files."""
+    round_tasks = get_round_tasks("2024-10-09")
+    assert round_tasks["nowcast_date"] == date(2024, 10, 9)
+    assert round_tasks["samples"] == 100
+    assert "MA" in round_tasks["locations"]
+    assert round_tasks["clades"][-1] == "other"
+    assert len(round_tasks["target_dates"]) == 42
+
+    try:
+        get_round_tasks("2024-10-10")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("an unknown round should raise a ValueError")
+
+
+def test_simulate_model_output():
+    """Simulated output has the hub's schema and valid proportions."""
+    import polars as pl
+
+    round_tasks = {
+        "nowcast_date": date(2024, 10, 9),
+        "locations": ["AL", "MA", "PR"],
+        "target_dates": [date(2024, 10, 1), date(2024, 10, 2)],
+        "clades": ["24A", "24B", "other"],
+        "samples": 4,
+    }
+    table = simulate_model_output(
+        round_tasks, ["MA", "PR"], np.array([1.0, 2.0, 3.0]), np.random.default_rng(1)
+    )
+    assert table.schema == model_output_schema
+
+    output = pl.from_arrow(table)
+    samples = output.filter(output_type="sample")
+    means = output.filter(output_type="mean")
+    assert samples.height == 2 * 2 * 4 * 3
+    assert means.height == 2 * 2 * 3
+    assert means["output_type_id"].is_null().all()
+    assert set(samples["output_type_id"]) == {
+        f"{loc}0{s}" for loc in ["MA", "PR"] for s in range(4)
+    }
+    assert samples.filter(pl.col("output_type_id").str.starts_with("PR"))[
+        "location"
+    ].unique().to_list() == ["PR"]
+    assert samples["value"].is_between(0, 1).all()
+
+    # each sample's proportions sum to 1 and means are the mean of the samples
+    sums = samples.group_by("location", "target_date", "output_type_id").agg(
+        pl.sum("value")
+    )
+    assert np.allclose(sums["value"], 1)
+    expected_means = samples.group_by("location", "target_date", "clade").agg(
+        expected=pl.mean("value")
+    )
+    means = means.join(expected_means, on=["location", "target_date", "clade"])
+    assert np.allclose(means["value"], means["expected"])
+
+
+def test_sim_model_output_cli(tmp_path):
+    """The CLI writes a submission for each synthetic team."""
+    from click.testing import CliRunner
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ["--nowcast-date=2024-10-09", "--teams=2", f"--output-dir={tmp_path}"],
+        standalone_mode=False,
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert [path.name for path in result.return_value] == [
+        "2024-10-09-sim-team01.parquet",
+        "2024-10-09-sim-team02.parquet",
+    ]
+
+    round_tasks = get_round_tasks("2024-10-09")
+    metadata = pq.read_metadata(result.return_value[0])
+    assert metadata.schema.to_arrow_schema() == model_output_schema
+    n_cells = len(round_tasks["locations"]) * len(round_tasks["target_dates"])
+    assert metadata.num_rows == n_cells * len(round_tasks["clades"]) * 101
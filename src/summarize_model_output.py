@@ -0,0 +1,588 @@
+"""
+Summarize the model output submitted for one or all modeling rounds.
+
+This is a Python version of model_output_summary.R, which reads every
+submission in full. The summary's facts (row counts, locations, clades,
+output types, and the range of target dates) are read from Parquet metadata
+instead, wherever possible:
+
+- row counts come from the file footer
+- target date ranges come from column statistics in the footer
+- distinct locations, clades, and output types come from each column chunk's
+  statistics (when a row group has a single value) or its dictionary page
+
+A dictionary page is only trusted when every data page in the column chunk is
+dictionary-encoded (only the page headers are read to check this) and the
+writer built the dictionary from the data (not from a pre-existing Arrow
+dictionary, such as an R factor, which can have unused levels). Otherwise,
+and when statistics are missing, the column itself is read.
+
+Files are summarized concurrently in a thread pool, and the run logs how
+many bytes were read compared to the size of the files.
+
+The summary for each round is saved to model_output_summary_[round_id].txt,
+in the same format as model_output_summary.R.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo:
+uv run --with-requirements src/requirements.txt src/summarize_model_output.py --all-rounds
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/summarize_model_output.py
+"""
+
+import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+import click
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import yaml
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# same locations as model_output_summary.R (state.abb, PR, and DC)
+all_locations = [
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL",
+    "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT",
+    "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI",
+    "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY", "PR", "DC",
+]  # fmt: skip
+
+# columns summarized by their distinct values
+value_columns = ["location", "clade", "output_type"]
+
+# Parquet page types and encodings (from the Parquet format's Thrift definitions)
+dictionary_page = 2
+dictionary_encodings = {2, 8}  # PLAIN_DICTIONARY, RLE_DICTIONARY
+
+
+def set_model_output_dir(ctx, param, value):
+    """Set the model output directory default value to the hub's model-output directory."""
+    return Path(value) if value else hub_root / "model-output"
+
+
+def set_model_metadata_dir(ctx, param, value):
+    """Set the model metadata directory default value to the hub's model-metadata directory."""
+    return Path(value) if value else hub_root / "model-metadata"
+
+
+@click.command()
+@click.option(
+    "--nowcast-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    required=False,
+    default=None,
+    help="The modeling round nowcast date (i.e., round_id) (YYYY-MM-DD).",
+)
+@click.option(
+    "--all-rounds",
+    is_flag=True,
+    default=False,
+    help="Summarize every round with model output.",
+)
+@click.option(
+    "--model-output-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_output_dir,
+    help="Directory of model output submissions. Default is the hub's model-output directory.",
+)
+@click.option(
+    "--model-metadata-dir",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_model_metadata_dir,
+    help="Directory of model metadata files. Default is the hub's model-metadata directory.",
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path.cwd(),
+    help="Directory where summaries are saved. Default is the current directory.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of files summarized at once.",
+)
+def main(
+    nowcast_date: datetime | None,
+    all_rounds: bool,
+    model_output_dir: Path,
+    model_metadata_dir: Path,
+    output_dir: Path,
+    workers: int,
+):
+    if (nowcast_date is not None) == all_rounds:
+        raise click.UsageError("Use either --nowcast-date or --all-rounds")
+
+    pattern = f"{nowcast_date.date()}-*.parquet" if nowcast_date else "*.parquet"
+    files = sorted(model_output_dir.glob(f"*/{pattern}"))
+    summaries = summarize_files(files, workers)
+    logger.info(
+        f"Summarized {len(files)} files: read {summaries['bytes_read'].sum():,} "
+        f"of {summaries['file_bytes'].sum():,} bytes"
+    )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    team_names = get_team_names(model_metadata_dir)
+    for (round_id,), round_summaries in summaries.group_by(
+        "nowcast_date", maintain_order=True
+    ):
+        output_file = output_dir / f"model_output_summary_{round_id}.txt"
+        output_file.write_text(
+            format_round_summary(round_id, round_summaries, team_names)
+        )
+        logger.info(f"Summary saved to {output_file}")
+
+
+def summarize_files(files: list[Path], workers: int) -> pl.DataFrame:
+    """Summarize model output files in a thread pool."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(summarize_file, files))
+
+    return pl.DataFrame(
+        summaries,
+        schema={
+            "model_id": pl.String,
+            "nowcast_date": pl.Date,
+            "rows": pl.Int64,
+            "location": pl.List(pl.String),
+            "clade": pl.List(pl.String),
+            "output_type": pl.List(pl.String),
+            "min_target_date": pl.Date,
+            "max_target_date": pl.Date,
+            "columns_read": pl.List(pl.String),
+            "bytes_read": pl.Int64,
+            "file_bytes": pl.Int64,
+        },
+        orient="row",
+    ).sort("nowcast_date", "model_id")
+
+
+def summarize_file(file: Path) -> dict:
+    """Return the facts in one model output file's summary, reading as little as possible."""
+    model_id = file.parent.name
+    parquet_file = pq.ParquetFile(file)
+    metadata = parquet_file.metadata
+    arrow_schema = parquet_file.schema_arrow
+    column_index = {
+        metadata.schema.column(i).path: i for i in range(metadata.num_columns)
+    }
+    summary = {
+        "model_id": model_id,
+        "nowcast_date": date.fromisoformat(
+            file.name.removesuffix(f"-{model_id}.parquet")
+        ),
+        "rows": metadata.num_rows,
+        "columns_read": [],
+        # footer and its length/magic bytes
+        "bytes_read": metadata.serialized_size + 8,
+        "file_bytes": file.stat().st_size,
+    }
+
+    with open(file, "rb") as f:
+        for column in value_columns:
+            values = set()
+            for rg in range(metadata.num_row_groups):
+                chunk = metadata.row_group(rg).column(column_index[column])
+                chunk_values = None
+                if chunk.is_stats_set and chunk.statistics.has_min_max:
+                    if chunk.statistics.min == chunk.statistics.max:
+                        chunk_values = [chunk.statistics.min]
+                if chunk_values is None and not pa.types.is_dictionary(
+                    arrow_schema.field(column).type
+                ):
+                    chunk_values, bytes_read = read_dictionary_values(f, chunk)
+                    summary["bytes_read"] += bytes_read
+                if chunk_values is None:
+                    break
+                values.update(chunk_values)
+            else:
+                summary[column] = sorted(values)
+                continue
+
+            # no usable statistics or dictionary pages: read the column
+            values = parquet_file.read(columns=[column])[column].cast(pa.string())
+            summary[column] = sorted(pc.unique(values).drop_null().to_pylist())
+            summary["columns_read"].append(column)
+            summary["bytes_read"] += sum(
+                metadata.row_group(rg)
+                .column(column_index[column])
+                .total_compressed_size
+                for rg in range(metadata.num_row_groups)
+            )
+
+    target_dates = [
+        metadata.row_group(rg).column(column_index["target_date"]).statistics
+        for rg in range(metadata.num_row_groups)
+    ]
+    if all(s is not None and s.has_min_max for s in target_dates):
+        summary["min_target_date"] = min(s.min for s in target_dates)
+        summary["max_target_date"] = max(s.max for s in target_dates)
+    else:
+        dates = parquet_file.read(columns=["target_date"])["target_date"]
+        summary["min_target_date"] = pc.min(dates).as_py()
+        summary["max_target_date"] = pc.max(dates).as_py()
+        summary["columns_read"].append("target_date")
+        summary["bytes_read"] += sum(
+            metadata.row_group(rg)
+            .column(column_index["target_date"])
+            .total_compressed_size
+            for rg in range(metadata.num_row_groups)
+        )
+
+    return summary
+
+
+def read_dictionary_values(f, chunk) -> tuple[list[str] | None, int]:
+    """
+    Return the values in a string column chunk's dictionary page and the number of
+    bytes read, reading only the page headers and the dictionary page.
+
+    Returns None for the values if the chunk has no dictionary page, if any of its
+    data pages are not dictionary-encoded, or if the dictionary can't be decoded.
+    """
+    # some writers don't set dictionary_page_offset, but still write a
+    # dictionary page before the data pages
+    start = (
+        chunk.dictionary_page_offset
+        if chunk.has_dictionary_page
+        else chunk.data_page_offset
+    )
+    end = start + chunk.total_compressed_size
+    position = start
+    bytes_read = 0
+    values = None
+    while position < end:
+        f.seek(position)
+        buffer = f.read(min(256, end - position))
+        try:
+            header, header_size = read_thrift_struct(buffer)
+        except IndexError:
+            # header is longer than the buffer (e.g., large page statistics)
+            buffer += f.read(min(64 * 1024, end - position - len(buffer)))
+            header, header_size = read_thrift_struct(buffer)
+        bytes_read += len(buffer)
+        page_type, uncompressed_size, compressed_size = header[1], header[2], header[3]
+
+        if page_type == dictionary_page:
+            if values is not None:
+                return None, bytes_read
+            f.seek(position + header_size)
+            page = f.read(compressed_size)
+            bytes_read += compressed_size
+            try:
+                values = decode_plain_strings(
+                    page, chunk.compression, uncompressed_size
+                )
+            except (ValueError, UnicodeDecodeError, pa.ArrowException):
+                return None, bytes_read
+        else:
+            # data page (v1: field 5) or data page v2 (field 8); encoding is field
+            # 2 or 4 of their headers
+            data_header = header.get(5) or header.get(8) or {}
+            encoding = data_header.get(2) if 5 in header else data_header.get(4)
+            if encoding not in dictionary_encodings:
+                return None, bytes_read
+
+        position += header_size + compressed_size
+
+    return values, bytes_read
+
+
+def decode_plain_strings(
+    page: bytes, compression: str, uncompressed_size: int
+) -> list[str]:
+    """Return the strings in a PLAIN-encoded BYTE_ARRAY dictionary page."""
+    if compression != "UNCOMPRESSED":
+        page = (
+            pa.Codec(compression.lower())
+            .decompress(page, decompressed_size=uncompressed_size)
+            .to_pybytes()
+        )
+    values = []
+    position = 0
+    while position < len(page):
+        (length,) = struct.unpack_from("<I", page, position)
+        position += 4
+        if position + length > len(page):
+            raise ValueError("Truncated dictionary page")
+        values.append(page[position : position + length].decode())
+        position += length
+    return values
+
+
+def read_varint(buffer: bytes, position: int) -> tuple[int, int]:
+    """Return an unsigned LEB128 varint and the position after it."""
+    result = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def read_thrift_value(buffer: bytes, position: int, thrift_type: int):
+    """Return a Thrift compact protocol value and the position after it."""
+    if thrift_type in (1, 2):  # boolean stored in the field type
+        return thrift_type == 1, position
+    if thrift_type == 3:  # byte
+        return buffer[position], position + 1
+    if thrift_type in (4, 5, 6):  # zigzag i16, i32, i64
+        value, position = read_varint(buffer, position)
+        return (value >> 1) ^ -(value & 1), position
+    if thrift_type == 7:  # double
+        return struct.unpack_from("<d", buffer, position)[0], position + 8
+    if thrift_type == 8:  # binary
+        length, position = read_varint(buffer, position)
+        if position + length > len(buffer):
+            raise IndexError("Binary value is longer than the buffer")
+        return buffer[position : position + length], position + length
+    if thrift_type in (9, 10):  # list, set
+        size_type = buffer[position]
+        position += 1
+        size, element_type = size_type >> 4, size_type & 0x0F
+        if size == 15:
+            size, position = read_varint(buffer, position)
+        values = []
+        for _ in range(size):
+            if element_type in (1, 2):
+                value, position = buffer[position] == 1, position + 1
+            else:
+                value, position = read_thrift_value(buffer, position, element_type)
+            values.append(value)
+        return values, position
+    if thrift_type == 11:  # map
+        size, position = read_varint(buffer, position)
+        values = {}
+        if size:
+            key_type, value_type = buffer[position] >> 4, buffer[position] & 0x0F
+            position += 1
+            for _ in range(size):
+                key, position = read_thrift_value(buffer, position, key_type)
+                values[key], position = read_thrift_value(buffer, position, value_type)
+        return values, position
+    if thrift_type == 12:  # struct
+        fields, size = read_thrift_struct(buffer[position:])
+        return fields, position + size
+    raise ValueError(f"Unknown Thrift type {thrift_type}")
+
+
+def read_thrift_struct(buffer: bytes) -> tuple[dict, int]:
+    """
+    Return a Thrift compact protocol struct (as a dict of field ID to value) at the
+    start of buffer, and its size in bytes. Raises IndexError if buffer ends first.
+    """
+    fields = {}
+    position = 0
+    field_id = 0
+    while True:
+        field_header = buffer[position]
+        position += 1
+        if field_header == 0:  # stop
+            return fields, position
+        delta, thrift_type = field_header >> 4, field_header & 0x0F
+        if delta:
+            field_id += delta
+        else:
+            field_id, position = read_thrift_value(buffer, position, 4)
+        fields[field_id], position = read_thrift_value(buffer, position, thrift_type)
+
+
+def get_team_names(model_metadata_dir: Path) -> dict[str, str]:
+    """Return each model's team_name from its model metadata file."""
+    team_names = {}
+    for file in sorted(model_metadata_dir.glob("*.y*ml")):
+        metadata = yaml.safe_load(file.read_text(encoding="utf-8")) or {}
+        team_names[file.stem] = metadata.get("team_name", file.stem)
+    return team_names
+
+
+def format_round_summary(
+    round_id: date, summaries: pl.DataFrame, team_names: dict[str, str]
+) -> str:
+    """Return a round's summary in the format of model_output_summary.R."""
+    lines = [
+        f"Summary of submissions for {round_id} ",
+        f"Clades modeled: {', '.join(summaries['clade'][0])} ",
+    ]
+    for summary in summaries.iter_rows(named=True):
+        locations = summary["location"]
+        not_modeled = [loc for loc in all_locations if loc not in locations]
+        lines += [
+            "",
+            f"Model creators: {team_names.get(summary['model_id'], summary['model_id'])} ",
+            f"Model name: {summary['model_id']} ",
+            f"Output types: {', '.join(summary['output_type'])} ",
+            f"Rows: {summary['rows']} ",
+            f"Target dates: {summary['min_target_date']} to {summary['max_target_date']} ",
+            f"Number of locations modeled: {len(locations)} ",
+            f"Locations modeled: {', '.join(locations)} ",
+            "Locations not modeled: "
+            + (",".join(not_modeled) if not_modeled else "All locations modeled")
+            + " ",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+import pytest
+
+
+@pytest.fixture
+def model_output() -> pa.Table:
+    """Model output with a few locations, clades, and output types."""
+    n = 600
+    return pa.table(
+        {
+            "nowcast_date": pa.array([date(2025, 1, 8)] * n, pa.date32()),
+            "target_date": pa.array(
+                [date(2024, 12, 1 + i % 30) for i in range(n)], pa.date32()
+            ),
+            "location": pa.array([["MA", "NY", "PR"][i % 3] for i in range(n)]),
+            "clade": pa.array([["24A", "other"][i % 2] for i in range(n)]),
+            "output_type": pa.array(["mean"] * 200 + ["sample"] * 400),
+            "output_type_id": pa.array([None] * 200 + [str(i % 7) for i in range(400)]),
+            "value": pa.array([i / n for i in range(n)], pa.float64()),
+        }
+    )
+
+
+def full_summary(table: pa.Table) -> dict:
+    """Summarize by reading every row, for comparison."""
+    return {
+        "rows": table.num_rows,
+        "location": sorted(set(table["location"].to_pylist())),
+        "clade": sorted(set(table["clade"].to_pylist())),
+        "output_type": sorted(set(table["output_type"].to_pylist())),
+        "min_target_date": min(table["target_date"].to_pylist()),
+        "max_target_date": max(table["target_date"].to_pylist()),
+    }
+
+
+@pytest.mark.parametrize(
+    "write_options",
+    [
+        {},
+        {"compression": "zstd", "row_group_size": 100},
+        {"compression": "none", "data_page_version": "2.0"},
+        {"use_dictionary": False},
+        {"write_statistics": False},
+    ],
+)
+def test_summarize_file(tmp_path, model_output, write_options):
+    """Summaries match a full read, for files written with different options."""
+    file = tmp_path / "team-a" / "2025-01-08-team-a.parquet"
+    file.parent.mkdir()
+    pq.write_table(model_output, file, **write_options)
+
+    summary = summarize_file(file)
+    expected = full_summary(model_output)
+    assert {k: summary[k] for k in expected} == expected
+    assert summary["nowcast_date"] == date(2025, 1, 8)
+
+    if write_options.get("use_dictionary") is False:
+        assert "location" in summary["columns_read"]
+    elif write_options.get("write_statistics") is False:
+        assert summary["columns_read"] == ["target_date"]
+    else:
+        assert summary["columns_read"] == []
+        assert summary["bytes_read"] < summary["file_bytes"]
+
+
+def test_summarize_file_arrow_dictionary(tmp_path, model_output):
+    """Columns written from Arrow dictionaries (e.g., R factors) are read, since they can have unused values."""
+    location = model_output["location"].combine_chunks().dictionary_encode()
+    location = pa.DictionaryArray.from_arrays(
+        location.indices, pa.array(["MA", "NY", "PR", "TX"])
+    )
+    table = model_output.set_column(
+        model_output.schema.get_field_index("location"), "location", location
+    )
+    file = tmp_path / "team-a" / "2025-01-08-team-a.parquet"
+    file.parent.mkdir()
+    pq.write_table(table, file)
+
+    summary = summarize_file(file)
+    assert summary["location"] == ["MA", "NY", "PR"]
+    assert summary["columns_read"] == ["location"]
+
+
+def test_summarize_file_polars(tmp_path, model_output):
+    """Files written by polars, which doesn't set dictionary page offsets, are summarized from metadata."""
+    file = tmp_path / "team-a" / "2025-01-08-team-a.parquet"
+    file.parent.mkdir()
+    pl.from_arrow(model_output).write_parquet(file)
+
+    summary = summarize_file(file)
+    expected = full_summary(model_output)
+    assert {k: summary[k] for k in expected} == expected
+    assert summary["columns_read"] == []
+
+
+def test_summarize_model_output_cli(tmp_path, model_output):
+    """The CLI writes a summary in the format of model_output_summary.R."""
+    from click.testing import CliRunner
+
+    for team in ["team-a", "team-b"]:
+        (tmp_path / "model-output" / team).mkdir(parents=True)
+        pq.write_table(
+            model_output,
+            tmp_path / "model-output" / team / f"2025-01-08-{team}.parquet",
+        )
+    (tmp_path / "model-metadata").mkdir()
+    (tmp_path / "model-metadata" / "team-a.yml").write_text('team_name: "Team A"\n')
+
+    result = CliRunner().invoke(
+        main,
+        [
+            "--nowcast-date=2025-01-08",
+            f"--model-output-dir={tmp_path / 'model-output'}",
+            f"--model-metadata-dir={tmp_path / 'model-metadata'}",
+            f"--output-dir={tmp_path / 'summaries'}",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    summary = (
+        tmp_path / "summaries" / "model_output_summary_2025-01-08.txt"
+    ).read_text()
+    assert summary.startswith(
+        "Summary of submissions for 2025-01-08 \nClades modeled: 24A, other \n\n"
+        "Model creators: Team A \nModel name: team-a \nOutput types: mean, sample \n"
+    )
+    assert "Model creators: team-b \n" in summary
+    assert (
+        "Number of locations modeled: 3 \nLocations modeled: MA, NY, PR \n" in summary
+    )
@@ -0,0 +1,646 @@
+"""
+Sync the hub's data directories to an S3-compatible object store, uploading
+only new or changed files.
+
+The hub's data is synced to the bucket named in hub-config/admin.json, using
+the same layout as the hubverse-aws-upload workflow: auxiliary-data,
+hub-config, model-abstracts, model-metadata, and target-data are synced to
+top-level prefixes of the same name, and model-output is synced to
+raw/model-output.
+
+To decide what to upload and delete, the script lists the objects under each
+prefix and compares their ETags to the ETags of the local files (which are
+computed the way S3 computes them). A file is uploaded if its object is
+missing or has a different ETag, so objects changed or removed outside of a
+sync are re-uploaded, and --delete removes every object under the prefixes
+that doesn't have a local file. Like rclone sync, the bucket is the source of
+truth for what's already there. Directories that don't exist locally are
+skipped, so their prefixes are never listed or deleted.
+
+Hashing every file on every run is the slow part, so the script also keeps a
+local manifest (a JSON file) of the size, modification time, SHA-256 hash,
+and ETag of every file it has synced. A file is hashed only if its size or
+modification time differs from the manifest. The manifest is only an
+optimisation: a missing or stale manifest means more hashing, not a different
+result.
+
+Uploads run concurrently, larger files are sent as multipart uploads, and the
+number of connections to the object store is bounded by --workers. After each
+upload, the object's ETag is checked against the ETag computed from the local
+file.
+
+To run the script manually:
+1. Install uv on your machine: https://docs.astral.sh/uv/getting-started/installation/
+2. From the root of this repo (with AWS credentials for the hub's bucket):
+uv run --with-requirements src/requirements.txt src/sync_hub_data.py --dry-run
+
+To run the included tests manually (from the root of the repo):
+uv run --with-requirements src/requirements.txt --module pytest src/sync_hub_data.py
+"""
+
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import boto3  # type: ignore
+import click
+from boto3.exceptions import S3UploadFailedError  # type: ignore
+from boto3.s3.transfer import TransferConfig  # type: ignore
+from botocore.config import Config  # type: ignore
+from botocore.exceptions import ClientError  # type: ignore
+
+from atomic_files import write_atomic
+
+# Log to stdout
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter(
+    "%(asctime)s -  %(levelname)s - %(message)s", datefmt="%m/%d/%Y %I:%M:%S %p"
+)
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+hub_root = Path(__file__).parents[1]
+
+# local hub directory -> object store prefix
+sync_prefixes = {
+    "auxiliary-data": "auxiliary-data",
+    "hub-config": "hub-config",
+    "model-abstracts": "model-abstracts",
+    "model-metadata": "model-metadata",
+    "target-data": "target-data",
+    # model output is transformed before it's presented to users
+    "model-output": "raw/model-output",
+}
+
+# files at least this size are sent as multipart uploads, in parts of this size
+default_chunk_size = 8 * 1024 * 1024
+
+
+def set_bucket(ctx, param, value):
+    """Set the bucket default value to the storage location in hub-config/admin.json."""
+    if value is None:
+        admin = json.loads((hub_root / "hub-config" / "admin.json").read_text())
+        value = admin["cloud"]["host"]["storage_location"]
+
+    return value
+
+
+def set_manifest(ctx, param, value):
+    """Set the manifest default value to ~/.variant-nowcast-hub/s3-sync/<bucket>.json."""
+    if value is None:
+        bucket = ctx.params.get("bucket") or "hub"
+        value = Path.home() / ".variant-nowcast-hub" / "s3-sync" / f"{bucket}.json"
+    else:
+        value = Path(value)
+
+    return value
+
+
+@click.command()
+@click.option(
+    "--bucket",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_bucket,
+    is_eager=True,
+    help="Bucket to sync to. Default is the storage location in hub-config/admin.json.",
+)
+@click.option(
+    "--endpoint-url",
+    type=str,
+    required=False,
+    default=None,
+    help="Endpoint URL of an S3-compatible object store (e.g., MinIO). Default is AWS S3.",
+)
+@click.option(
+    "--manifest",
+    type=str,
+    required=False,
+    default=None,
+    callback=set_manifest,
+    help="Path to the sync manifest. Default is ~/.variant-nowcast-hub/s3-sync/<bucket>.json.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of files uploaded at once (and the size of the connection pool).",
+)
+@click.option(
+    "--chunk-size-mb",
+    type=click.IntRange(min=5),
+    default=default_chunk_size // (1024 * 1024),
+    show_default=True,
+    help="Multipart upload part size (MB). Files at least this size are uploaded in parts.",
+)
+@click.option(
+    "--delete",
+    is_flag=True,
+    default=False,
+    help="Delete objects under the synced prefixes that don't exist locally.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Report what would be uploaded without uploading anything.",
+)
+def main(
+    bucket: str,
+    endpoint_url: str | None,
+    manifest: Path,
+    workers: int,
+    chunk_size_mb: int,
+    delete: bool,
+    dry_run: bool,
+) -> dict:
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=workers),
+    )
+    report = sync_hub_data(
+        hub_root,
+        client,
+        bucket,
+        manifest,
+        workers=workers,
+        chunk_size=chunk_size_mb * 1024 * 1024,
+        delete=delete,
+        dry_run=dry_run,
+    )
+    if report["files_failed"]:
+        raise click.ClickException(f"{report['files_failed']} files failed to upload")
+
+    return report
+
+
+def get_local_prefixes(hub_dir: Path) -> dict[str, str]:
+    """
+    Return the synced directories that exist in hub_dir, mapped to their object
+    store prefixes. Prefixes of missing directories are left alone in the bucket.
+    """
+    return {
+        directory: prefix
+        for directory, prefix in sync_prefixes.items()
+        if (hub_dir / directory).is_dir()
+    }
+
+
+def list_local_files(hub_dir: Path) -> dict[str, Path]:
+    """Return the files to sync, keyed by object key."""
+    local_files = {}
+    for directory, prefix in get_local_prefixes(hub_dir).items():
+        local_dir = hub_dir / directory
+        for path in sorted(local_dir.rglob("*")):
+            if path.is_file():
+                key = f"{prefix}/{path.relative_to(local_dir).as_posix()}"
+                local_files[key] = path
+
+    return local_files
+
+
+def hash_file(path: Path, chunk_size: int) -> tuple[str, str]:
+    """
+    Return a file's SHA-256 hash and the ETag S3 assigns to it when uploaded
+    with the given multipart chunk size.
+
+    Files smaller than chunk_size are uploaded in a single request, and their
+    ETag is the MD5 hash of the file. Larger files are uploaded in parts, and
+    their ETag is the MD5 hash of the concatenated part MD5s, followed by the
+    number of parts.
+    """
+    sha256 = hashlib.sha256()
+    part_md5s = []
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+            part_md5s.append(hashlib.md5(chunk).digest())
+
+    size = path.stat().st_size
+    if size < chunk_size:
+        etag = part_md5s[0].hex() if part_md5s else hashlib.md5(b"").hexdigest()
+    else:
+        etag = f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+    return sha256.hexdigest(), etag
+
+
+def read_manifest(manifest_path: Path) -> dict[str, dict]:
+    """Return the sync manifest, or an empty manifest if it doesn't exist."""
+    if not manifest_path.is_file():
+        return {}
+    return json.loads(manifest_path.read_text())
+
+
+def write_manifest(manifest_path: Path, manifest: dict[str, dict]):
+    """Save the sync manifest."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(
+        manifest_path,
+        lambda path: path.write_text(json.dumps(manifest, indent=1, sort_keys=True)),
+    )
+
+
+def list_remote_etags(client, bucket: str, prefixes: list[str]) -> dict[str, str]:
+    """Return the ETags of objects in the bucket under the given prefixes."""
+    etags = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for prefix in prefixes:
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+            for obj in page.get("Contents", []):
+                etags[obj["Key"]] = obj["ETag"].strip('"')
+
+    return etags
+
+
+def plan_sync(
+    local_files: dict[str, Path],
+    manifest: dict[str, dict],
+    remote_etags: dict[str, str],
+    chunk_size: int,
+) -> tuple[dict[str, dict], dict[str, dict]]:
+    """
+    Return the files that need to be uploaded and the files that are unchanged,
+    each keyed by object key, with the manifest entry for the local file.
+
+    A file is unchanged if the bucket has an object with the file's ETag. The
+    file's manifest entry is used instead of hashing the file if the file's size
+    and modification time (and the chunk size) match it.
+    """
+    uploads = {}
+    unchanged = {}
+    for key, path in local_files.items():
+        stat = path.stat()
+        entry = manifest.get(key)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+            or entry.get("chunk_size") != chunk_size
+        ):
+            sha256, etag = hash_file(path, chunk_size)
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "chunk_size": chunk_size,
+                "sha256": sha256,
+                "etag": etag,
+            }
+        if remote_etags.get(key) == entry["etag"]:
+            unchanged[key] = entry
+        else:
+            uploads[key] = entry
+
+    return uploads, unchanged
+
+
+def upload_file(client, bucket: str, key: str, path: Path, transfer_config) -> str:
+    """Upload a file and return the stored object's ETag."""
+    client.upload_file(str(path), bucket, key, Config=transfer_config)
+    return client.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+
+
+def sync_hub_data(
+    hub_dir: Path,
+    client,
+    bucket: str,
+    manifest_path: Path,
+    workers: int = 8,
+    chunk_size: int = default_chunk_size,
+    delete: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Upload new and changed hub files to a bucket and return a summary of the sync.
+
+    Uploads and deletes are decided by comparing local files to the objects in
+    the bucket. The manifest is updated with every file that was uploaded (or
+    found to be unchanged), even if other uploads fail.
+    """
+    manifest = read_manifest(manifest_path)
+    local_files = list_local_files(hub_dir)
+
+    remote_etags = list_remote_etags(
+        client, bucket, list(get_local_prefixes(hub_dir).values())
+    )
+    uploads, unchanged = plan_sync(local_files, manifest, remote_etags, chunk_size)
+    deletes = sorted(set(remote_etags) - set(local_files)) if delete else []
+
+    report = {
+        "files_uploaded": 0,
+        "bytes_uploaded": 0,
+        "files_skipped": len(unchanged),
+        "bytes_skipped": sum(entry["size"] for entry in unchanged.values()),
+        "files_deleted": 0,
+        "files_failed": 0,
+    }
+    if dry_run:
+        report["files_uploaded"] = len(uploads)
+        report["bytes_uploaded"] = sum(entry["size"] for entry in uploads.values())
+        report["files_deleted"] = len(deletes)
+        logger.info(f"Dry run, nothing uploaded: {report}")
+        return report
+
+    new_manifest = dict(unchanged)
+
+    transfer_config = TransferConfig(
+        multipart_threshold=chunk_size,
+        multipart_chunksize=chunk_size,
+        # files are uploaded concurrently, so the parts of each file are not
+        max_concurrency=1,
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    upload_file,
+                    client,
+                    bucket,
+                    key,
+                    local_files[key],
+                    transfer_config,
+                ): key
+                for key in uploads
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    remote_etag = future.result()
+                except (ClientError, S3UploadFailedError) as e:
+                    logger.error(f"Failed to upload {key}: {e}")
+                    report["files_failed"] += 1
+                    continue
+                if remote_etag != uploads[key]["etag"]:
+                    logger.error(
+                        f"ETag mismatch for {key}: expected {uploads[key]['etag']}, "
+                        f"object store has {remote_etag}"
+                    )
+                    report["files_failed"] += 1
+                    continue
+                new_manifest[key] = uploads[key]
+                report["files_uploaded"] += 1
+                report["bytes_uploaded"] += uploads[key]["size"]
+
+        for start in range(0, len(deletes), 1000):
+            batch = deletes[start : start + 1000]
+            client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            report["files_deleted"] += len(batch)
+    finally:
+        write_manifest(manifest_path, new_manifest)
+
+    logger.info(
+        f"Uploaded {report['files_uploaded']} files ({report['bytes_uploaded']:,} bytes), "
+        f"skipped {report['files_skipped']} unchanged files ({report['bytes_skipped']:,} bytes), "
+        f"deleted {report['files_deleted']} objects, {report['files_failed']} failures"
+    )
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
+
+
+##############################################################
+# Tests                                                      #
+##############################################################
+
+
+def make_test_hub(hub_dir: Path):
+    """Create a small hub directory for tests."""
+    (hub_dir / "target-data" / "oracle-output").mkdir(parents=True)
+    (hub_dir / "target-data" / "oracle-output" / "oracle.parquet").write_bytes(
+        b"PAR1" * 1000
+    )
+    (hub_dir / "model-output" / "team-model").mkdir(parents=True)
+    (hub_dir / "model-output" / "team-model" / "2025-01-01-team-model.csv").write_text(
+        "a,b\n1,2\n"
+    )
+    (hub_dir / "hub-config").mkdir()
+    (hub_dir / "hub-config" / "tasks.json").write_text("{}")
+
+
+def test_hash_file(tmp_path):
+    """ETags match S3's single-part and multipart conventions."""
+    import math
+
+    path = tmp_path / "data.bin"
+    data = bytes(range(256)) * 100
+    path.write_bytes(data)
+
+    sha256, etag = hash_file(path, chunk_size=len(data) + 1)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert etag == hashlib.md5(data).hexdigest()
+
+    chunk_size = 10000
+    sha256, etag = hash_file(path, chunk_size=chunk_size)
+    parts = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+    assert len(parts) == math.ceil(len(data) / chunk_size)
+    expected = hashlib.md5(b"".join(hashlib.md5(part).digest() for part in parts))
+    assert etag == f"{expected.hexdigest()}-{len(parts)}"
+    assert sha256 == hashlib.sha256(data).hexdigest()
+
+    empty = tmp_path / "empty.json"
+    empty.write_bytes(b"")
+    assert hash_file(empty, chunk_size)[1] == hashlib.md5(b"").hexdigest()
+
+
+def test_list_local_files(tmp_path):
+    make_test_hub(tmp_path)
+    local_files = list_local_files(tmp_path)
+    assert sorted(local_files) == [
+        "hub-config/tasks.json",
+        "raw/model-output/team-model/2025-01-01-team-model.csv",
+        "target-data/oracle-output/oracle.parquet",
+    ]
+
+
+def test_sync_hub_data(tmp_path):
+    """Only new and changed files are uploaded to the object store."""
+    import os
+
+    from moto import mock_aws
+
+    hub_dir = tmp_path / "hub"
+    make_test_hub(hub_dir)
+    manifest_path = tmp_path / "manifest.json"
+    chunk_size = 5 * 1024 * 1024
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-hub")
+
+        report = sync_hub_data(
+            hub_dir, client, "test-hub", manifest_path, workers=2, chunk_size=chunk_size
+        )
+        assert report["files_uploaded"] == 3
+        assert report["files_skipped"] == 0
+        assert report["files_failed"] == 0
+        keys = [
+            obj["Key"] for obj in client.list_objects_v2(Bucket="test-hub")["Contents"]
+        ]
+        assert "raw/model-output/team-model/2025-01-01-team-model.csv" in keys
+
+        # nothing changed
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path)
+        assert report["files_uploaded"] == 0
+        assert report["files_skipped"] == 3
+        assert report["bytes_skipped"] == sum(
+            path.stat().st_size for path in list_local_files(hub_dir).values()
+        )
+
+        # a touched file with the same contents isn't uploaded, a changed
+        # file and a new multipart-sized file are
+        tasks = hub_dir / "hub-config" / "tasks.json"
+        os.utime(tasks, ns=(0, 0))
+        (
+            hub_dir / "model-output" / "team-model" / "2025-01-01-team-model.csv"
+        ).write_text("a,b\n3,4\n")
+        large = hub_dir / "target-data" / "time-series.parquet"
+        large.write_bytes(os.urandom(chunk_size + 1024))
+        dry_run = sync_hub_data(
+            hub_dir, client, "test-hub", manifest_path, dry_run=True
+        )
+        assert dry_run["files_uploaded"] == 2
+        report = sync_hub_data(
+            hub_dir, client, "test-hub", manifest_path, chunk_size=chunk_size
+        )
+        assert report["files_uploaded"] == 2
+        assert report["bytes_uploaded"] == large.stat().st_size + 8
+        assert report["files_skipped"] == 2
+        head = client.head_object(
+            Bucket="test-hub", Key="target-data/time-series.parquet"
+        )
+        assert head["ETag"].strip('"').endswith("-2")
+
+        # with a new manifest, objects already in the bucket aren't re-uploaded
+        report = sync_hub_data(
+            hub_dir,
+            client,
+            "test-hub",
+            tmp_path / "new-manifest.json",
+            chunk_size=chunk_size,
+        )
+        assert report["files_uploaded"] == 0
+        assert report["files_skipped"] == 4
+
+        # files deleted locally are deleted from the bucket with delete=True
+        tasks.unlink()
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path, delete=True)
+        assert report["files_deleted"] == 1
+        keys = [
+            obj["Key"] for obj in client.list_objects_v2(Bucket="test-hub")["Contents"]
+        ]
+        assert "hub-config/tasks.json" not in keys
+        assert "hub-config/tasks.json" not in read_manifest(manifest_path)
+
+
+def test_sync_hub_data_reconciles_bucket(tmp_path):
+    """Uploads and deletes are decided by the bucket's contents, not the manifest."""
+    from moto import mock_aws
+
+    hub_dir = tmp_path / "hub"
+    make_test_hub(hub_dir)
+    manifest_path = tmp_path / "manifest.json"
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-hub")
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path)
+        assert report["files_uploaded"] == 3
+
+        # objects changed or removed outside of a sync are re-uploaded, even
+        # though the manifest says they're unchanged
+        client.put_object(
+            Bucket="test-hub", Key="hub-config/tasks.json", Body=b'{"a": 1}'
+        )
+        client.delete_object(
+            Bucket="test-hub", Key="target-data/oracle-output/oracle.parquet"
+        )
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path)
+        assert report["files_uploaded"] == 2
+        assert report["files_skipped"] == 1
+        body = client.get_object(Bucket="test-hub", Key="hub-config/tasks.json")
+        assert body["Body"].read() == b"{}"
+
+        # with a new manifest, objects that only exist in the bucket are
+        # deleted, and objects outside the synced prefixes are left alone
+        client.put_object(Bucket="test-hub", Key="target-data/old.parquet", Body=b"")
+        client.put_object(Bucket="test-hub", Key="other/file.txt", Body=b"")
+        report = sync_hub_data(
+            hub_dir, client, "test-hub", tmp_path / "new-manifest.json", delete=True
+        )
+        assert report["files_uploaded"] == 0
+        assert report["files_deleted"] == 1
+        keys = [
+            obj["Key"] for obj in client.list_objects_v2(Bucket="test-hub")["Contents"]
+        ]
+        assert "target-data/old.parquet" not in keys
+        assert "other/file.txt" in keys
+
+
+def test_sync_hub_data_missing_directory(tmp_path):
+    """Prefixes of directories that don't exist locally aren't deleted."""
+    from moto import mock_aws
+
+    hub_dir = tmp_path / "hub"
+    make_test_hub(hub_dir)
+    manifest_path = tmp_path / "manifest.json"
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-hub")
+        client.put_object(
+            Bucket="test-hub", Key="model-abstracts/team-model.md", Body=b"abstract"
+        )
+        assert not (hub_dir / "model-abstracts").exists()
+
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path, delete=True)
+        assert report["files_uploaded"] == 3
+        assert report["files_deleted"] == 0
+        keys = [
+            obj["Key"] for obj in client.list_objects_v2(Bucket="test-hub")["Contents"]
+        ]
+        assert "model-abstracts/team-model.md" in keys
+
+        # an empty directory that exists is synced, so its objects are deleted
+        (hub_dir / "model-abstracts").mkdir()
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path, delete=True)
+        assert report["files_deleted"] == 1
+
+
+def test_sync_hub_data_upload_error(tmp_path, monkeypatch):
+    """Failed uploads are reported and left out of the manifest."""
+    from moto import mock_aws
+
+    hub_dir = tmp_path / "hub"
+    make_test_hub(hub_dir)
+    manifest_path = tmp_path / "manifest.json"
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="test-hub")
+
+        def upload_file(filename, bucket, key, **kwargs):
+            if key == "hub-config/tasks.json":
+                raise ClientError(
+                    {"Error": {"Code": "AccessDenied", "Message": "Access Denied"}},
+                    "PutObject",
+                )
+            client.put_object(Bucket=bucket, Key=key, Body=Path(filename).read_bytes())
+
+        monkeypatch.setattr(client, "upload_file", upload_file)
+        report = sync_hub_data(hub_dir, client, "test-hub", manifest_path)
+        assert report["files_uploaded"] == 2
+        assert report["files_failed"] == 1
+        assert "hub-config/tasks.json" not in read_manifest(manifest_path)